@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import asyncio
+import numpy as np
 
 class AgentOpinion(BaseModel):
     agent_name: str
@@ -17,6 +18,9 @@ class AgentOpinion(BaseModel):
     weight: float = 1.0  # ← ADD THIS LINE
 
 class BaseTradingAgent(ABC):
+    # Context sections the agent reads; the orchestrator memoizes opinions on a hash of them
+    CONTEXT_KEYS: Tuple[str, ...] = ()
+    
     def __init__(self, name: str, weight: float = 1.0):
         self.name = name
         self.weight = weight
@@ -25,6 +29,17 @@ class BaseTradingAgent(ABC):
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
         pass
     
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
+        """Opinions for many tickers at once; rule-based agents implement this with NumPy"""
+        raise NotImplementedError
+    
+    @staticmethod
+    def _column(sections: List[Dict[str, Any]], key: str, default: Optional[float]) -> np.ndarray:
+        """One input across tickers as float64; missing and non-finite values take `default` (NaN when None)"""
+        values = [s.get(key) for s in sections]
+        column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return np.where(np.isfinite(column), column, np.nan if default is None else default)
+    
     async def run_with_timeout(self, ticker: str, context: Dict, timeout: int = 5):
         try:
             return await asyncio.wait_for(
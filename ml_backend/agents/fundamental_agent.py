@@ -1,62 +1,67 @@
 from agents.base_agent import BaseTradingAgent, AgentOpinion
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import numpy as np
 
 class FundamentalAnalystAgent(BaseTradingAgent):
+    CONTEXT_KEYS = ('fundamentals',)
+
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
+        return self.evaluate([ticker], [context])[0]
+
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
         # Get fundamental data
-        fundamentals = context.get('fundamentals', {})
-        pe_ratio = fundamentals.get('pe_ratio', 20)
-        earnings_growth = fundamentals.get('earnings_growth', 0)
-        insider_trades = fundamentals.get('insider_trades', 0)
-        
-        # Simple analysis logic
-        score = 0
-        factors = []
-        
-        # P/E analysis
-        if pe_ratio < 15:
-            score += 1
-            factors.append(f"Low P/E: {pe_ratio}")
-        elif pe_ratio > 25:
-            score -= 1
-            factors.append(f"High P/E: {pe_ratio}")
-            
-        # Earnings growth
-        if earnings_growth > 10:
-            score += 1
-            factors.append(f"Strong growth: {earnings_growth}%")
-        elif earnings_growth < 0:
-            score -= 1
-            factors.append("Negative growth")
-            
-        # Insider trades
-        if insider_trades > 0:
-            score += 1
-            factors.append("Insider buying")
-        elif insider_trades < 0:
-            score -= 1
-            factors.append("Insider selling")
-        
+        fundamentals = [c.get('fundamentals', {}) for c in contexts]
+        pe_ratio = self._column(fundamentals, 'pe_ratio', 20)
+        earnings_growth = self._column(fundamentals, 'earnings_growth', 0)
+        revenue_growth = self._column(fundamentals, 'revenue_growth', 0)
+        insider_trades = self._column(fundamentals, 'insider_trades', 0)
+
+        # Simple analysis logic: P/E, earnings growth, revenue growth, insider trades
+        low_pe, high_pe = pe_ratio < 15, pe_ratio > 25
+        strong_growth, negative_growth = earnings_growth > 10, earnings_growth < 0
+        revenue_up, revenue_down = revenue_growth > 10, revenue_growth < 0
+        insider_buying, insider_selling = insider_trades > 0, insider_trades < 0
+        score = ((low_pe.astype(int) - high_pe) + (strong_growth.astype(int) - negative_growth)
+                 + (revenue_up.astype(int) - revenue_down) + (insider_buying.astype(int) - insider_selling))
+
         # Determine direction
-        if score >= 2:
-            direction = "bullish"
-            confidence = 70 + score * 5
-        elif score <= -1:
-            direction = "bearish"
-            confidence = 60 + abs(score) * 10
-        else:
-            direction = "neutral"
-            confidence = 40
-            
-        return AgentOpinion(
-            agent_name=self.name,
-            ticker=ticker,
-            timestamp=datetime.now(),
-            direction=direction,
-            confidence=min(confidence, 100),
-            reasoning=f"Fundamental score: {score}",
-            key_factors=factors or ["Mixed fundamentals"],
-            suggested_action="buy" if direction == "bullish" and confidence > 70 else "wait",
-            suggested_position_size=0.04 if direction == "bullish" else 0.01
-        )
\ No newline at end of file
+        direction = np.where(score >= 2, 'bullish', np.where(score <= -1, 'bearish', 'neutral'))
+        confidence = np.where(score >= 2, 70 + score * 5, np.where(score <= -1, 60 + np.abs(score) * 10, 40))
+        confidence = np.minimum(confidence, 100)
+
+        opinions = []
+        now = datetime.now()
+        for i, ticker in enumerate(tickers):
+            f = fundamentals[i]
+            factors = []
+            if low_pe[i]:
+                factors.append(f"Low P/E: {f.get('pe_ratio')}")
+            elif high_pe[i]:
+                factors.append(f"High P/E: {f.get('pe_ratio')}")
+            if strong_growth[i]:
+                factors.append(f"Strong growth: {f.get('earnings_growth')}%")
+            elif negative_growth[i]:
+                factors.append("Negative growth")
+            if revenue_up[i]:
+                factors.append(f"Revenue growth: {f.get('revenue_growth')}%")
+            elif revenue_down[i]:
+                factors.append("Shrinking revenue")
+            if insider_buying[i]:
+                factors.append("Insider buying")
+            elif insider_selling[i]:
+                factors.append("Insider selling")
+
+            d, conf = str(direction[i]), int(confidence[i])
+            opinions.append(AgentOpinion(
+                agent_name=self.name,
+                ticker=ticker,
+                timestamp=now,
+                direction=d,
+                confidence=conf,
+                reasoning=f"Fundamental score: {int(score[i])}",
+                key_factors=factors or (["Mixed fundamentals"] if f else ["No fundamental data"]),
+                suggested_action="buy" if d == "bullish" and conf > 70 else "wait",
+                suggested_position_size=0.04 if d == "bullish" else 0.01
+            ))
+        return opinions
@@ -1,61 +1,62 @@
 from agents.base_agent import BaseTradingAgent, AgentOpinion
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import numpy as np
 
 class MacroEconomistAgent(BaseTradingAgent):
+    CONTEXT_KEYS = ('macro',)
+
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
+        return self.evaluate([ticker], [context])[0]
+
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
         # Get macro data
-        macro = context.get('macro', {})
-        interest_rate = macro.get('interest_rate', 5)
-        inflation = macro.get('inflation', 3)
-        market_regime = macro.get('market_regime', 'neutral')
-        
-        score = 0
-        factors = []
-        
-        # Interest rates
-        if interest_rate < 3:
-            score += 1
-            factors.append("Low rates (bullish)")
-        elif interest_rate > 5:
-            score -= 1
-            factors.append("High rates (bearish)")
-            
-        # Inflation
-        if inflation < 2:
-            score += 1
-            factors.append("Low inflation")
-        elif inflation > 4:
-            score -= 1
-            factors.append("High inflation")
-            
-        # Market regime
-        if market_regime == 'bullish':
-            score += 1
-            factors.append("Bullish market regime")
-        elif market_regime == 'bearish':
-            score -= 1
-            factors.append("Bearish market regime")
-        
+        macro = [c.get('macro', {}) for c in contexts]
+        interest_rate = self._column(macro, 'interest_rate', 5)
+        inflation = self._column(macro, 'inflation', 3)
+        market_regime = np.array([m.get('market_regime', 'neutral') for m in macro], dtype=object)
+        vix = self._column(macro, 'vix', None)
+
+        # Interest rates, inflation, market regime, volatility (a missing VIX compares False)
+        low_rates, high_rates = interest_rate < 3, interest_rate > 5
+        low_inflation, high_inflation = inflation < 2, inflation > 4
+        bull_regime, bear_regime = market_regime == 'bullish', market_regime == 'bearish'
+        high_vix = vix > 25
+        score = ((low_rates.astype(int) - high_rates) + (low_inflation.astype(int) - high_inflation)
+                 + (bull_regime.astype(int) - bear_regime) - high_vix)
+
         # Determine direction
-        if score >= 2:
-            direction = "bullish"
-            confidence = 75
-        elif score <= -1:
-            direction = "bearish"
-            confidence = 70
-        else:
-            direction = "neutral"
-            confidence = 50
-            
-        return AgentOpinion(
-            agent_name=self.name,
-            ticker=ticker,
-            timestamp=datetime.now(),
-            direction=direction,
-            confidence=confidence,
-            reasoning=f"Macro score: {score}",
-            key_factors=factors or ["Mixed macro"],
-            suggested_action="wait",
-            suggested_position_size=0.02
-        )
\ No newline at end of file
+        direction = np.where(score >= 2, 'bullish', np.where(score <= -1, 'bearish', 'neutral'))
+        confidence = np.where(score >= 2, 75, np.where(score <= -1, 70, 50))
+
+        opinions = []
+        now = datetime.now()
+        for i, ticker in enumerate(tickers):
+            factors = []
+            if low_rates[i]:
+                factors.append("Low rates (bullish)")
+            elif high_rates[i]:
+                factors.append("High rates (bearish)")
+            if low_inflation[i]:
+                factors.append("Low inflation")
+            elif high_inflation[i]:
+                factors.append("High inflation")
+            if bull_regime[i]:
+                factors.append("Bullish market regime")
+            elif bear_regime[i]:
+                factors.append("Bearish market regime")
+            if high_vix[i]:
+                factors.append(f"Elevated VIX: {macro[i].get('vix')}")
+
+            opinions.append(AgentOpinion(
+                agent_name=self.name,
+                ticker=ticker,
+                timestamp=now,
+                direction=str(direction[i]),
+                confidence=int(confidence[i]),
+                reasoning=f"Macro score: {int(score[i])}",
+                key_factors=factors or ["Mixed macro"],
+                suggested_action="wait",
+                suggested_position_size=0.02
+            ))
+        return opinions
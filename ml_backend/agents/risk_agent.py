@@ -1,43 +1,54 @@
 from agents.base_agent import BaseTradingAgent, AgentOpinion
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import numpy as np
 
 class RiskManagerAgent(BaseTradingAgent):
+    CONTEXT_KEYS = ('risk',)
+
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
+        return self.evaluate([ticker], [context])[0]
+
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
         # Get risk data
-        risk_data = context.get('risk', {})
-        volatility = risk_data.get('volatility', 20)
-        max_drawdown = risk_data.get('max_drawdown', 15)
-        var = risk_data.get('value_at_risk', 5)
-        
+        risk_data = [c.get('risk', {}) for c in contexts]
+        volatility = self._column(risk_data, 'volatility', 20)
+        max_drawdown = self._column(risk_data, 'max_drawdown', 15)
+        var = self._column(risk_data, 'value_at_risk', 5)
+        cvar = self._column(risk_data, 'cvar', None)
+        beta = self._column(risk_data, 'beta', None)
+
         # Calculate risk score (0-100, higher = riskier)
-        risk_score = (volatility * 0.4 + max_drawdown * 0.3 + var * 0.3)
-        
-        factors = []
-        if volatility > 30:
-            factors.append(f"High volatility: {volatility}%")
-        if max_drawdown > 20:
-            factors.append(f"Large drawdown risk: {max_drawdown}%")
-        
-        # Determine position sizing based on risk
-        if risk_score < 20:
-            max_position = 10  # 10% of portfolio
-            risk_level = "low"
-        elif risk_score < 40:
-            max_position = 5   # 5% of portfolio
-            risk_level = "medium"
-        else:
-            max_position = 2   # 2% of portfolio
-            risk_level = "high"
-        
-        return AgentOpinion(
-            agent_name=self.name,
-            ticker=ticker,
-            timestamp=datetime.now(),
-            direction="neutral",  # Risk manager doesn't predict direction
-            confidence=int(100 - risk_score),
-            reasoning=f"Risk score: {risk_score:.1f} - {risk_level.upper()} risk",
-            key_factors=factors or [f"Volatility: {volatility}%"],
-            suggested_action="wait",
-            suggested_position_size=max_position / 100  # Convert to decimal
-        )
\ No newline at end of file
+        risk_score = volatility * 0.4 + max_drawdown * 0.3 + var * 0.3
+
+        # Determine position sizing based on risk: 10% / 5% / 2% of portfolio
+        max_position = np.where(risk_score < 20, 10, np.where(risk_score < 40, 5, 2))
+        risk_level = np.where(risk_score < 20, 'low', np.where(risk_score < 40, 'medium', 'high'))
+        confidence = np.clip(np.trunc(100 - risk_score), 0, 100).astype(int)
+
+        opinions = []
+        now = datetime.now()
+        for i, ticker in enumerate(tickers):
+            r = risk_data[i]
+            factors = []
+            if volatility[i] > 30:
+                factors.append(f"High volatility: {r.get('volatility')}%")
+            if max_drawdown[i] > 20:
+                factors.append(f"Large drawdown risk: {r.get('max_drawdown')}%")
+            if cvar[i] > 5:
+                factors.append(f"Heavy tail: 95% CVaR {r.get('cvar')}%")
+            if beta[i] > 1.5:
+                factors.append(f"High beta: {r.get('beta')}")
+
+            opinions.append(AgentOpinion(
+                agent_name=self.name,
+                ticker=ticker,
+                timestamp=now,
+                direction="neutral",  # Risk manager doesn't predict direction
+                confidence=int(confidence[i]),
+                reasoning=f"Risk score: {risk_score[i]:.1f} - {str(risk_level[i]).upper()} risk",
+                key_factors=factors or [f"Volatility: {r.get('volatility', 20)}%"],
+                suggested_action="wait",
+                suggested_position_size=int(max_position[i]) / 100  # Convert to decimal
+            ))
+        return opinions
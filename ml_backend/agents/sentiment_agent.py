@@ -1,46 +1,56 @@
 from agents.base_agent import BaseTradingAgent, AgentOpinion
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import numpy as np
 
 class SentimentAnalystAgent(BaseTradingAgent):
+    SOURCE_WEIGHTS = {'finbert': 0.5, 'reddit': 0.3, 'news': 0.2}
+    CONTEXT_KEYS = ('sentiment_scores',)
+
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
-        # Get sentiment scores from context
-        sentiment = context.get('sentiment_scores', {})
-        finbert = sentiment.get('finbert', 0)
-        reddit = sentiment.get('reddit', 0)
-        news = sentiment.get('news', 0)
-        
-        # Calculate composite score
-        composite = (finbert * 0.5 + reddit * 0.3 + news * 0.2)
-        
+        return self.evaluate([ticker], [context])[0]
+
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
+        # Get sentiment scores from context; absent sources are NaN
+        sentiment = [c.get('sentiment_scores', {}) for c in contexts]
+        scores = np.column_stack([self._column(sentiment, k, None) for k in self.SOURCE_WEIGHTS])
+        weights = np.array(list(self.SOURCE_WEIGHTS.values()))
+
+        # Calculate composite score, renormalizing weights over the sources present
+        # (accumulated source by source, so rounding at the ±0.2 thresholds matches a plain sum)
+        present = ~np.isnan(scores)
+        total_weight = sum(np.where(present[:, j], w, 0.0) for j, w in enumerate(weights))
+        weighted = sum(np.where(present[:, j], scores[:, j] * w, 0.0) for j, w in enumerate(weights))
+        composite = np.divide(weighted, total_weight, out=np.zeros(len(tickers)), where=total_weight > 0)
+
         # Determine direction
-        if composite > 0.2:
-            direction = "bullish"
-            confidence = int(50 + composite * 40)
-        elif composite < -0.2:
-            direction = "bearish"
-            confidence = int(50 + abs(composite) * 40)
-        else:
-            direction = "neutral"
-            confidence = 30
-            
-        # Generate reasoning
-        factors = []
-        if finbert > 0.3:
-            factors.append(f"FinBERT positive: {finbert:.2f}")
-        if reddit > 0.4:
-            factors.append("Reddit sentiment strong")
-        if news < -0.2:
-            factors.append("News negative")
-            
-        return AgentOpinion(
-            agent_name=self.name,
-            ticker=ticker,
-            timestamp=datetime.now(),
-            direction=direction,
-            confidence=min(confidence, 100),
-            reasoning=f"Sentiment composite: {composite:.2f}",
-            key_factors=factors or ["Neutral sentiment"],
-            suggested_action="buy" if direction == "bullish" and confidence > 70 else "wait",
-            suggested_position_size=0.05 if confidence > 70 else 0.02
-        )
\ No newline at end of file
+        direction = np.where(composite > 0.2, 'bullish', np.where(composite < -0.2, 'bearish', 'neutral'))
+        confidence = np.where(np.abs(composite) > 0.2, (50 + np.abs(composite) * 40).astype(int), 30)
+        confidence = np.minimum(confidence, 100)
+
+        # Generate reasoning (a missing source compares False)
+        finbert, reddit, news = scores.T
+        opinions = []
+        now = datetime.now()
+        for i, ticker in enumerate(tickers):
+            factors = []
+            if finbert[i] > 0.3:
+                factors.append(f"FinBERT positive: {finbert[i]:.2f}")
+            if reddit[i] > 0.4:
+                factors.append("Reddit sentiment strong")
+            if news[i] < -0.2:
+                factors.append("News negative")
+
+            d, conf = str(direction[i]), int(confidence[i])
+            opinions.append(AgentOpinion(
+                agent_name=self.name,
+                ticker=ticker,
+                timestamp=now,
+                direction=d,
+                confidence=conf,
+                reasoning=f"Sentiment composite: {composite[i]:.2f}",
+                key_factors=factors or ["Neutral sentiment"],
+                suggested_action="buy" if d == "bullish" and conf > 70 else "wait",
+                suggested_position_size=0.05 if conf > 70 else 0.02
+            ))
+        return opinions
@@ -1,62 +1,60 @@
 from agents.base_agent import BaseTradingAgent, AgentOpinion
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+import numpy as np
 
 class TechnicalAnalystAgent(BaseTradingAgent):
+    CONTEXT_KEYS = ('technicals',)
+
     async def analyze(self, ticker: str, context: Dict[str, Any]) -> AgentOpinion:
+        return self.evaluate([ticker], [context])[0]
+
+    def evaluate(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[AgentOpinion]:
         # Get technical indicators
-        technicals = context.get('technicals', {})
-        rsi = technicals.get('rsi', 50)
-        macd = technicals.get('macd', 0)
-        moving_avg = technicals.get('moving_avg', 0)
-        current_price = technicals.get('current_price', 0)
-        
-        score = 0
-        factors = []
-        
+        technicals = [c.get('technicals', {}) for c in contexts]
+        rsi = self._column(technicals, 'rsi', 50)
+        macd = self._column(technicals, 'macd', 0)
+        moving_avg = self._column(technicals, 'moving_avg', 0)
+        current_price = self._column(technicals, 'current_price', 0)
+
         # RSI analysis
-        if rsi < 30:
-            score += 1
-            factors.append(f"Oversold (RSI: {rsi})")
-        elif rsi > 70:
-            score -= 1
-            factors.append(f"Overbought (RSI: {rsi})")
-            
+        oversold, overbought = rsi < 30, rsi > 70
         # MACD
-        if macd > 0:
-            score += 1
-            factors.append("MACD positive")
-        elif macd < 0:
-            score -= 1
-            factors.append("MACD negative")
-            
+        macd_pos, macd_neg = macd > 0, macd < 0
         # Moving average
-        if current_price > moving_avg:
-            score += 1
-            factors.append("Above MA")
-        else:
-            score -= 1
-            factors.append("Below MA")
-        
+        above_ma = current_price > moving_avg
+        score = (oversold.astype(int) - overbought) + (macd_pos.astype(int) - macd_neg) + np.where(above_ma, 1, -1)
+
         # Determine direction
-        if score >= 2:
-            direction = "bullish"
-            confidence = 70 + score * 5
-        elif score <= -1:
-            direction = "bearish"
-            confidence = 60 + abs(score) * 10
-        else:
-            direction = "neutral"
-            confidence = 40
-            
-        return AgentOpinion(
-            agent_name=self.name,
-            ticker=ticker,
-            timestamp=datetime.now(),
-            direction=direction,
-            confidence=min(confidence, 100),
-            reasoning=f"Technical score: {score}",
-            key_factors=factors or ["Mixed technicals"],
-            suggested_action="buy" if direction == "bullish" and confidence > 70 else "wait",
-            suggested_position_size=0.03 if direction == "bullish" else 0.01
-        )
\ No newline at end of file
+        direction = np.where(score >= 2, 'bullish', np.where(score <= -1, 'bearish', 'neutral'))
+        confidence = np.where(score >= 2, 70 + score * 5, np.where(score <= -1, 60 + np.abs(score) * 10, 40))
+        confidence = np.minimum(confidence, 100)
+
+        opinions = []
+        now = datetime.now()
+        for i, ticker in enumerate(tickers):
+            t = technicals[i]
+            factors = []
+            if oversold[i]:
+                factors.append(f"Oversold (RSI: {t.get('rsi')})")
+            elif overbought[i]:
+                factors.append(f"Overbought (RSI: {t.get('rsi')})")
+            if macd_pos[i]:
+                factors.append("MACD positive")
+            elif macd_neg[i]:
+                factors.append("MACD negative")
+            factors.append("Above MA" if above_ma[i] else "Below MA")
+
+            d, conf = str(direction[i]), int(confidence[i])
+            opinions.append(AgentOpinion(
+                agent_name=self.name,
+                ticker=ticker,
+                timestamp=now,
+                direction=d,
+                confidence=conf,
+                reasoning=f"Technical score: {int(score[i])}",
+                key_factors=factors or ["Mixed technicals"],
+                suggested_action="buy" if d == "bullish" and conf > 70 else "wait",
+                suggested_position_size=0.03 if d == "bullish" else 0.01
+            ))
+        return opinions
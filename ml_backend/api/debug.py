@@ -0,0 +1,64 @@
+"""
+Operator-only debugging endpoints
+Disabled (404) unless DEBUG_TOKEN is set; requests must send it as X-Debug-Token.
+"""
+import os
+import hmac
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from utils.profiling import ProfilerBusy, profiler, slow_request_sampler
+from utils.serialization import FastJSONResponse
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+
+def _authorize(token: Optional[str]):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = 5,
+    interval_ms: float = 5,
+    format: str = "collapsed",
+    include_idle: bool = False,
+    x_debug_token: Optional[str] = Header(None),
+):
+    """
+    Sample every thread's stack for `seconds` while the server keeps serving
+    format=collapsed returns flamegraph.pl/speedscope input, format=json a summary
+    with top self/total functions and the stacks. Parked threads (idle event loop
+    and pool workers) are left out unless include_idle=true
+    """
+    _authorize(x_debug_token)
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+    try:
+        result = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    headers = {"Cache-Control": "no-store"}
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(result), headers=headers)
+    return FastJSONResponse(content={"status": "success", "data": profiler.summary(result)}, headers=headers)
+
+
+@router.get("/slow-requests")
+async def slow_requests(limit: Optional[int] = None, x_debug_token: Optional[str] = Header(None)):
+    """Most recent requests over SLOW_REQUEST_MS, newest first, with their stage timings"""
+    _authorize(x_debug_token)
+    return FastJSONResponse(
+        content={"status": "success", "data": {
+            **slow_request_sampler.stats(),
+            "requests": slow_request_sampler.recent(limit),
+        }},
+        headers={"Cache-Control": "no-store"},
+    )
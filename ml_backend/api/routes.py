@@ -8,10 +8,12 @@
 # from ..agents.risk_agent import RiskManagerAgent
 # from ..utils.context_builder import build_context
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+import os
+import json
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, WebSocket
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from orchestrator.agent_orchestrator import AgentOrchestrator
 
 
@@ -21,14 +23,38 @@ from agents.technical_agent import TechnicalAnalystAgent
 from agents.macro_agent import MacroEconomistAgent
 from agents.risk_agent import RiskManagerAgent
 from utils.context_builder import build_context
+from utils.circuit_breaker import get_breaker_states
+from utils.rate_limiter import Priority, market_data_scheduler
+from utils.sharding import SHARD_COUNT, SHARD_INDEX
+from utils.stream_hub import StreamLimitError, stream_hub
+from utils.serialization import FastJSONResponse, dumps
+from utils.deadline import MAX_DEADLINE_SECONDS, DeadlineExceeded, deadline_scope, parse_timeout
+from utils.admission import admission_controller
+from utils.profiling import slow_request_sampler
 
 # Import ML prediction modules
 try:
     from predictor.price_predictor import predictor
     from predictor.sentiment import sentiment_analyzer
+    from predictor.risk import risk_engine
+    from predictor.portfolio import portfolio_analyzer
+    from predictor.simulation import monte_carlo
+    from predictor.screener import screener
+    from predictor.fundamentals import fundamentals_provider
+    from predictor.macro import macro_provider
+    from predictor.providers import market_data
+    from predictor.explain import prediction_explainer
 except ImportError:
     predictor = None
     sentiment_analyzer = None
+    risk_engine = None
+    portfolio_analyzer = None
+    monte_carlo = None
+    screener = None
+    fundamentals_provider = None
+    macro_provider = None
+    market_data = None
+    prediction_explainer = None
 
 router = APIRouter(prefix="/agent", tags=["ai-agents"])
 
@@ -43,29 +69,107 @@ agents = [
 
 orchestrator = AgentOrchestrator(agents)
 
+# Fire-and-forget tasks; the event loop only keeps weak references to them
+_background_tasks: set = set()
+
+MAX_BATCH_SYMBOLS = 200
+# Default request deadlines (seconds); clients may set their own with X-Request-Timeout
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "8"))
+ANALYZE_BATCH_DEADLINE = float(os.getenv("ANALYZE_BATCH_DEADLINE_SECONDS", "20"))
+
+# Server-push channels: one computation per symbol and interval, fanned out to all subscribers
+STREAM_PRICE_INTERVAL = float(os.getenv("STREAM_PRICE_INTERVAL", "15"))
+STREAM_PREDICTION_INTERVAL = float(os.getenv("STREAM_PREDICTION_INTERVAL", "60"))
+STREAM_SENTIMENT_INTERVAL = float(os.getenv("STREAM_SENTIMENT_INTERVAL", "120"))
+if predictor is not None:
+    stream_hub.register("price", STREAM_PRICE_INTERVAL, predictor.get_current_price,
+                        key=lambda d: (d.get("price"), d.get("change_24h")))
+    stream_hub.register("prediction", STREAM_PREDICTION_INTERVAL, lambda s: predictor.predict(s, horizon=7),
+                        key=lambda d: (d.get("predicted_price"), d.get("recommendation"), d.get("confidence")))
+if sentiment_analyzer is not None:
+    stream_hub.register("sentiment", STREAM_SENTIMENT_INTERVAL, sentiment_analyzer.get_aggregate_sentiment,
+                        key=lambda d: (d.get("overall_score"), d.get("article_count")))
+
 
 # Request/Response models
 class PredictRequest(BaseModel):
     symbol: str
     horizon: Optional[int] = 7
+    interval: str = "1d"        # 1d, or 1m/2m/5m/15m/30m/1h with horizon counted in bars
+    explain: Optional[str] = None               # "exact" or "approx" TreeSHAP contributions
+    explain_budget_ms: Optional[float] = None   # approx only; defaults to EXPLAIN_BUDGET_MS
+
+
+class PredictBatchRequest(BaseModel):
+    symbols: List[str]
+    horizon: int = 7
+    explain: Optional[str] = None
+    explain_budget_ms: Optional[float] = None   # shared by the whole batch
+
+
+class AnalyzeBatchRequest(BaseModel):
+    symbols: List[str]
+
+
+class PortfolioRiskRequest(BaseModel):
+    symbols: List[str]
+    weights: Optional[List[float]] = None
+    period: str = "1y"
+    include_matrices: bool = True
+
+
+def _deadline_headers(deadline, cache_control: str) -> dict:
+    # A result assembled from partial data must not be cached
+    return {"Cache-Control": "no-store" if deadline.cut_short else cache_control}
 
 
 @router.get("/analyze/{ticker}")
-async def analyze_ticker(ticker: str):
+async def analyze_ticker(ticker: str, x_request_timeout: Optional[str] = Header(None)):
     """
     Run multi-agent analysis on a ticker
     Returns opinions from all agents + final recommendation
+    The whole pipeline runs under one deadline; `deadline.cut_short` lists what did not finish
     """
     try:
-        # Build context with all data
-        context = await build_context(ticker.upper())
-        
-        # Run agent analysis
-        result = await orchestrator.analyze_ticker(ticker.upper(), context)
+        budget = parse_timeout(x_request_timeout, ANALYZE_DEADLINE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        with deadline_scope(budget) as deadline:
+            # Build context with all data
+            context = await build_context(ticker.upper())
+            
+            # Run agent analysis
+            result = await orchestrator.analyze_ticker(ticker.upper(), context)
         
-        return JSONResponse(
-            content={"status": "success", "data": result},
-            headers={"Cache-Control": "public, max-age=60, stale-while-revalidate=120"},
+        return FastJSONResponse(
+            content={"status": "success", "data": result, "deadline": deadline.report()},
+            headers=_deadline_headers(deadline, "public, max-age=60, stale-while-revalidate=120"),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/analyze-batch")
+async def analyze_batch(request: AnalyzeBatchRequest, x_request_timeout: Optional[str] = Header(None)):
+    """
+    Multi-agent analysis for several tickers, in input order
+    Each agent scores all tickers in one vectorized pass; unchanged inputs are memoized
+    """
+    if not request.symbols or len(request.symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"symbols must contain 1 to {MAX_BATCH_SYMBOLS} entries")
+    try:
+        budget = parse_timeout(x_request_timeout, ANALYZE_BATCH_DEADLINE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        tickers = [s.upper() for s in request.symbols]
+        with deadline_scope(budget) as deadline:
+            contexts = await asyncio.gather(*(build_context(t) for t in tickers))
+            results = await orchestrator.analyze_batch(tickers, list(contexts))
+        return FastJSONResponse(
+            content={"status": "success", "data": {"results": results}, "deadline": deadline.report()},
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -81,29 +185,69 @@ async def predict_price(request: PredictRequest):
         raise HTTPException(status_code=500, detail="Predictor not available")
     
     try:
-        result = predictor.predict(request.symbol, request.horizon)
-        return {
-            "status": "success",
-            "data": result
-        }
+        result = await asyncio.to_thread(predictor.predict, request.symbol, request.horizon, request.interval,
+                                         request.explain, request.explain_budget_ms)
+        return FastJSONResponse(content={"status": "success", "data": result})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/predict/{symbol}")
-async def predict_price_get(symbol: str, horizon: int = 7):
+async def predict_price_get(symbol: str, horizon: int = 7, interval: str = "1d", explain: Optional[str] = None,
+                            explain_budget_ms: Optional[float] = None):
     """
     Generate ML-based price prediction (GET method)
+    Intraday intervals count the horizon in bars; explain=exact|approx adds
+    per-prediction TreeSHAP contributions
     """
     if predictor is None:
         raise HTTPException(status_code=500, detail="Predictor not available")
     
     try:
-        result = predictor.predict(symbol, horizon)
-        return JSONResponse(
+        result = await asyncio.to_thread(predictor.predict, symbol, horizon, interval, explain, explain_budget_ms)
+        return FastJSONResponse(
             content={"status": "success", "data": result},
             headers={"Cache-Control": "public, max-age=60, stale-while-revalidate=120"},
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict-batch")
+async def predict_price_batch(request: PredictBatchRequest, x_request_timeout: Optional[str] = Header(None)):
+    """
+    Predictions for several symbols, in input order
+    Behind the dispatcher each shard only receives the symbols it owns. Explanations
+    are computed in one batch after the predictions. With X-Request-Timeout the batch
+    runs under that deadline, which also caps the approx explanation budget
+    """
+    if predictor is None:
+        raise HTTPException(status_code=500, detail="Predictor not available")
+    if not request.symbols or len(request.symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"symbols must contain 1 to {MAX_BATCH_SYMBOLS} entries")
+    try:
+        budget = parse_timeout(x_request_timeout, MAX_DEADLINE_SECONDS) if x_request_timeout else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        with deadline_scope(budget) as deadline:
+            results = await asyncio.to_thread(
+                predictor.predict_many, request.symbols, request.horizon,
+                explain=request.explain, explain_budget_ms=request.explain_budget_ms,
+            )
+        content = {"status": "success", "data": {"results": results}}
+        if deadline is not None:
+            content["deadline"] = deadline.report()
+        return FastJSONResponse(content=content)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -117,8 +261,9 @@ async def get_current_price(symbol: str):
         raise HTTPException(status_code=500, detail="Predictor not available")
     
     try:
-        result = predictor.get_current_price(symbol)
-        return JSONResponse(
+        # Off the event loop: the outbound scheduler blocks while waiting for a token
+        result = await asyncio.to_thread(predictor.get_current_price, symbol)
+        return FastJSONResponse(
             content=result,
             headers={"Cache-Control": "public, max-age=30, stale-while-revalidate=60"},
         )
@@ -127,23 +272,128 @@ async def get_current_price(symbol: str):
 
 
 @router.get("/history")
-async def get_history(symbol: str, period: str = "1y"):
+async def get_history(symbol: str, period: str = "1y", interval: str = "1d"):
     """
     Get historical price data for charting
+    Intraday intervals (1m..1h) are capped at their retention window
     """
     if predictor is None:
         raise HTTPException(status_code=500, detail="Predictor not available")
     
     try:
-        result = predictor.get_history(symbol, period)
-        return JSONResponse(
-            content={"status": "success", "symbol": symbol, "data": result},
+        result = await asyncio.to_thread(predictor.get_history, symbol, period, interval)
+        return FastJSONResponse(
+            content={"status": "success", "symbol": symbol, "interval": interval, "data": result},
+            headers={"Cache-Control": "public, max-age=300, stale-while-revalidate=600"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/risk/{symbol}")
+async def get_risk(symbol: str, benchmark: Optional[str] = None):
+    """
+    Get VaR/CVaR, drawdown, realized volatility and beta for a symbol
+    """
+    if risk_engine is None:
+        raise HTTPException(status_code=500, detail="Risk engine not available")
+    
+    try:
+        result = await asyncio.to_thread(risk_engine.analyze, symbol.upper(), benchmark)
+        return FastJSONResponse(
+            content={"status": "success", "data": result},
             headers={"Cache-Control": "public, max-age=300, stale-while-revalidate=600"},
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/portfolio-risk")
+async def get_portfolio_risk(request: PortfolioRiskRequest):
+    """
+    Covariance/correlation, portfolio volatility, marginal risk contributions
+    and risk-parity weights for a list of symbols and weights
+    """
+    if portfolio_analyzer is None:
+        raise HTTPException(status_code=500, detail="Portfolio analyzer not available")
+    
+    try:
+        result = await asyncio.to_thread(
+            portfolio_analyzer.analyze, request.symbols, request.weights, request.period, request.include_matrices
+        )
+        return FastJSONResponse(content={"status": "success", "data": result})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/simulate/{symbol}")
+async def simulate_price_paths(
+    symbol: str,
+    horizon: int = 30,
+    paths: int = 5000,
+    method: str = "gbm",
+    targets: Optional[str] = None,
+    seed: Optional[int] = None,
+    model_drift: bool = True,
+):
+    """
+    Monte Carlo price paths (GBM or bootstrapped returns)
+    Returns percentile bands over the horizon and probability-of-target figures
+    """
+    if monte_carlo is None:
+        raise HTTPException(status_code=500, detail="Simulator not available")
+    
+    try:
+        target_list = [float(t) for t in targets.split(',') if t.strip()] if targets else None
+        result = await asyncio.to_thread(
+            monte_carlo.simulate, symbol.upper(), horizon, paths, method.lower(), target_list, seed, model_drift
+        )
+        return FastJSONResponse(content={"status": "success", "data": result})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/screen")
+async def screen_symbols(
+    filter: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: int = 50,
+    columns: Optional[str] = None,
+):
+    """
+    Screen the symbol universe on precomputed indicators
+    e.g. filter="rsi < 30 and close > ma_30", sort="-volume_ratio"
+    """
+    if screener is None:
+        raise HTTPException(status_code=500, detail="Screener not available")
+    
+    try:
+        if len(screener.table) == 0:
+            await asyncio.to_thread(screener.refresh)
+        elif screener.is_stale():
+            # Answer from the current table, refresh in the background
+            task = asyncio.create_task(asyncio.to_thread(screener.refresh))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        
+        column_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+        result = screener.screen(filter, sort, limit, column_list)
+        return FastJSONResponse(
+            content={"status": "success", "data": result},
+            headers={"Cache-Control": "public, max-age=30, stale-while-revalidate=60"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/news")
 async def get_news(symbol: str, max_items: int = 10):
     """
@@ -153,14 +403,15 @@ async def get_news(symbol: str, max_items: int = 10):
         raise HTTPException(status_code=500, detail="Sentiment analyzer not available")
     
     try:
-        articles = sentiment_analyzer.fetch_news(symbol, max_items)
-        aggregate = sentiment_analyzer.get_aggregate_sentiment(symbol)
-        return JSONResponse(
+        articles = await asyncio.to_thread(sentiment_analyzer.fetch_news, symbol, max_items)
+        aggregate = await asyncio.to_thread(sentiment_analyzer.get_aggregate_sentiment, symbol)
+        return FastJSONResponse(
             content={
                 "status": "success",
                 "symbol": symbol,
                 "aggregate_sentiment": aggregate,
                 "articles": articles,
+                "freshness_lag_seconds": aggregate.get("freshness_lag_seconds"),
             },
             headers={"Cache-Control": "public, max-age=180, stale-while-revalidate=300"},
         )
@@ -177,8 +428,8 @@ async def get_sentiment(symbol: str):
         raise HTTPException(status_code=500, detail="Sentiment analyzer not available")
     
     try:
-        result = sentiment_analyzer.get_aggregate_sentiment(symbol)
-        return JSONResponse(
+        result = await asyncio.to_thread(sentiment_analyzer.get_aggregate_sentiment, symbol)
+        return FastJSONResponse(
             content={"status": "success", "data": result},
             headers={"Cache-Control": "public, max-age=180, stale-while-revalidate=300"},
         )
@@ -186,26 +437,98 @@ async def get_sentiment(symbol: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.websocket("/stream")
+async def stream(websocket: WebSocket, symbols: str = "", channels: str = ""):
+    """
+    Push price ticks, prediction updates and sentiment changes for subscribed symbols
+    Client messages: {"action": "subscribe" | "unsubscribe", "symbols": ["AAPL", ...]}
+    """
+    await websocket.accept()
+    try:
+        conn = stream_hub.connect([c for c in channels.split(",") if c] or None)
+    except (StreamLimitError, ValueError) as e:
+        await websocket.close(code=1013 if isinstance(e, StreamLimitError) else 1008, reason=str(e))
+        return
+
+    def apply(action: str, requested: List[str]):
+        for symbol in requested:
+            try:
+                if action == "subscribe":
+                    stream_hub.subscribe(conn, symbol)
+                else:
+                    stream_hub.unsubscribe(conn, symbol)
+            except StreamLimitError as e:
+                conn.send_error(str(e))
+                break
+        conn.offer({"type": "subscriptions", "symbol": "", "symbols": sorted(conn.symbols)})
+
+    async def receive():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, requested = message["action"], message["symbols"]
+                if action not in ("subscribe", "unsubscribe") or not isinstance(requested, list):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                conn.send_error('Expected {"action": "subscribe" | "unsubscribe", "symbols": [...]}')
+                continue
+            apply(action, [str(s) for s in requested])
+
+    if symbols:
+        apply("subscribe", symbols.split(","))
+    sender = asyncio.create_task(stream_hub.pump(conn, lambda m: websocket.send_text(dumps(m).decode())))
+    receiver = asyncio.create_task(receive())
+    try:
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        # Either the client went away (WebSocketDisconnect) or it stopped reading for SEND_TIMEOUT
+        if any(isinstance(task.exception(), asyncio.TimeoutError) for task in done):
+            await websocket.close(code=1013, reason="Consumer too slow")
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        stream_hub.disconnect(conn)
+
+
 @router.get("/health")
 async def health_check():
     return {
         "status": "healthy", 
         "agents": len(agents),
+        "agent_memo": orchestrator.stats(),
         "predictor_available": predictor is not None,
-        "sentiment_available": sentiment_analyzer is not None
+        "sentiment_available": sentiment_analyzer is not None,
+        "market_data": market_data.stats() if market_data else None,
+        "circuit_breakers": get_breaker_states(),
+        "outbound_scheduler": market_data_scheduler.get_stats(),
+        "shared_bars": predictor.bar_store.stats() if predictor.bar_store else {"enabled": False},
+        "feature_store": predictor.feature_store.stats(),
+        "shard": {"index": SHARD_INDEX, "count": SHARD_COUNT},
+        "models": predictor.model_stats(),
+        "explainer": prediction_explainer.stats() if prediction_explainer else None,
+        "intraday": predictor.intraday.stats(),
+        "sentiment_model": sentiment_analyzer.model_scorer.stats() if sentiment_analyzer else {"available": False},
+        "article_store": sentiment_analyzer.store.stats() if sentiment_analyzer and sentiment_analyzer.store else None,
+        "news_ingestor": sentiment_analyzer.ingestor.stats() if sentiment_analyzer and sentiment_analyzer.ingestor else {"running": False},
+        "fundamentals": fundamentals_provider.stats() if fundamentals_provider else None,
+        "macro": macro_provider.stats() if macro_provider else None,
+        "stream": stream_hub.stats(),
+        "admission": admission_controller.stats(),
+        "slow_requests": slow_request_sampler.stats(),
     }
 
 
 @router.get("/profile/{symbol}")
 async def get_company_profile(symbol: str):
     """
-    Get company profile info using yfinance
+    Get company profile info (yfinance .info, cached once per day)
     """
     try:
-        import yfinance as yf
-        ticker = yf.Ticker(symbol.upper())
-        info = ticker.info or {}
-        return JSONResponse(
+        if fundamentals_provider is None:
+            raise RuntimeError("Fundamentals provider not available")
+        # Same cache key as the agents' fundamentals context (BTC -> BTC-USD)
+        info = await asyncio.to_thread(fundamentals_provider.get_info, predictor.normalize_symbol(symbol),
+                                       Priority.INTERACTIVE)
+        return FastJSONResponse(
             content={
                 "status": "success",
                 "data": {
@@ -242,19 +565,27 @@ async def get_company_profile(symbol: str):
 
 
 @router.get("/predict-multi/{symbol}")
-async def predict_multi_horizon(symbol: str):
+async def predict_multi_horizon(symbol: str, interval: str = "1d", explain: Optional[str] = None,
+                                explain_budget_ms: Optional[float] = None):
     """
     Generate predictions for multiple time horizons (1d, 7d, 30d)
     Each horizon uses a SEPARATE LightGBM model trained for that specific target.
+    With an intraday interval the horizons are 1, 7 and 30 bars.
     """
     if predictor is None:
         raise HTTPException(status_code=500, detail="Predictor not available")
 
     try:
-        results = predictor.predict_multi_horizon(symbol.upper(), horizons=[1, 7, 30])
-        return JSONResponse(
+        # Off the event loop, so admitted fits don't stall cheap routes
+        results = await asyncio.to_thread(
+            predictor.predict_multi_horizon, symbol.upper(), horizons=[1, 7, 30], interval=interval,
+            explain=explain, explain_budget_ms=explain_budget_ms,
+        )
+        return FastJSONResponse(
             content={"status": "success", "data": results},
             headers={"Cache-Control": "public, max-age=60, stale-while-revalidate=120"},
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
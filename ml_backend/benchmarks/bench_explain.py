@@ -0,0 +1,53 @@
+"""
+Cost and fidelity of per-prediction TreeSHAP explanations
+Trains one 7-day model per symbol on the synthetic market, then times explaining
+every symbol's latest row exactly and under approx budgets, and how often the
+approximation keeps the exact top-3 features.
+Run from ml_backend/: python -m benchmarks.bench_explain [n_symbols]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('MARKET_DATA_MODE', 'synthetic')
+
+from predictor.price_predictor import predictor
+from predictor.explain import prediction_explainer
+
+
+def top3(explanation):
+    return {c['feature'] for c in explanation['contributions'][:3]}
+
+
+def timed(items, mode, budget_ms=None, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        for model, _ in items:
+            prediction_explainer.for_model(model)._rows.clear()      # measure computation, not reuse
+        started = time.perf_counter()
+        result = prediction_explainer.explain_many(items, mode, budget_ms)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(n_symbols: int = 50):
+    symbols = [f"SYN{i:03d}" for i in range(n_symbols)]
+    runs = [predictor._predict(symbol, 7, '1d') for symbol in symbols]
+    items = [(model, X) for _, model, X in runs if model is not None]
+    print(f"{len(items)} models, {prediction_explainer.for_model(items[0][0]).n_trees} trees each")
+
+    exact_s, exact = timed(items, 'exact')
+    print(f"exact           {exact_s * 1000:7.2f} ms  ({exact_s / len(items) * 1000:.3f} ms/symbol)")
+    started = time.perf_counter()
+    prediction_explainer.explain_many(items, 'exact')
+    print(f"exact, repeated {(time.perf_counter() - started) * 1000:7.2f} ms  (rows reused)")
+    for budget_ms in (exact_s * 1000 * 0.9, exact_s * 1000 * 0.7, exact_s * 1000 * 0.25):
+        approx_s, approx = timed(items, 'approx', budget_ms)
+        kept = sum(len(top3(a) & top3(e)) for a, e in zip(approx, exact)) / (3 * len(items))
+        print(f"approx {budget_ms:6.1f} ms {approx_s * 1000:7.2f} ms  trees {approx[0]['trees_used']:>3}"
+              f"/{approx[0]['trees_total']}  top-3 kept {kept:.0%}")
+    print(prediction_explainer.stats())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
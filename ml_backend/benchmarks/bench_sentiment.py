@@ -0,0 +1,52 @@
+"""
+Throughput of the keyword sentiment scorer on synthetic headlines
+Run from ml_backend/: python -m benchmarks.bench_sentiment [n_headlines]
+"""
+import re
+import sys
+import time
+import random
+
+from predictor.sentiment import SentimentAnalyzer
+
+SUBJECTS = ['Apple', 'Tesla', 'Nvidia', 'Bitcoin', 'The S&P 500', 'Microsoft', 'Oil', 'Treasury yields']
+VERBS = ['surged', 'drops', 'rallies', 'slumped', 'is not strong', 'beats estimates', 'cuts guidance',
+         'hits all-time high', 'trades flat', 'misses expectations', 'climbs', "didn't recover", 'holds steady']
+TAILS = ['after earnings', 'amid recession fears', 'as bulls take control', 'on upgrade', 'ahead of the Fed',
+         'despite weak demand', 'in record session', 'as volatility rises', '', 'following analyst downgrade']
+
+
+def make_headlines(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(TAILS)}".strip() for _ in range(n)]
+
+
+def legacy_score(analyzer: SentimentAnalyzer, text: str):
+    """The previous per-headline implementation, for comparison"""
+    words = set(re.findall(r'\b\w+\b', text.lower()))
+    return len(words & analyzer.POSITIVE_WORDS), len(words & analyzer.NEGATIVE_WORDS)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    headlines = make_headlines(n)
+    analyzer = SentimentAnalyzer()
+    analyzer.analyze_batch(headlines[:1000])  # warm the token cache
+
+    started = time.perf_counter()
+    results = analyzer.analyze_batch(headlines)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for h in headlines:
+        legacy_score(analyzer, h)
+    legacy_elapsed = time.perf_counter() - started
+
+    labelled = sum(1 for r in results if r['label'] != 'NEUTRAL')
+    print(f"compiled scorer: {n / elapsed:,.0f} headlines/s ({elapsed:.2f}s for {n:,}), "
+          f"{labelled / n:.0%} non-neutral")
+    print(f"legacy word-set: {n / legacy_elapsed:,.0f} headlines/s (exact single words only)")
+
+
+if __name__ == '__main__':
+    main()
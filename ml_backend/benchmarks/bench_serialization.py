@@ -0,0 +1,98 @@
+"""
+End-to-end serialization cost of /agent/history and /agent/analyze payloads
+Compares the previous path (row-wise history records, starlette JSONResponse, plus
+jsonable_encoder for the opinions' datetimes) with FastJSONResponse.
+Run from ml_backend/: python -m benchmarks.bench_serialization [repeats]
+"""
+import sys
+import time
+import asyncio
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from agents.base_agent import AgentOpinion
+from orchestrator.agent_orchestrator import AgentOrchestrator
+from predictor.price_predictor import PricePredictor
+from utils import serialization
+from utils.serialization import FastJSONResponse
+
+
+def legacy_history(df):
+    """The previous row-wise get_history, for comparison"""
+    records = []
+    for _, row in df.iterrows():
+        records.append({
+            'date': row['date'].isoformat() if hasattr(row['date'], 'isoformat') else str(row['date']),
+            'open': round(float(row['open']), 2),
+            'high': round(float(row['high']), 2),
+            'low': round(float(row['low']), 2),
+            'close': round(float(row['close']), 2),
+            'volume': int(row['volume'])
+        })
+    return records
+
+
+def analyze_payload():
+    opinions = [
+        AgentOpinion(agent_name=name, ticker='AAPL', timestamp=datetime.now(), direction=direction,
+                     confidence=confidence, reasoning='Synthetic opinion ' * 8,
+                     key_factors=[f'factor {i}' for i in range(5)], suggested_position_size=0.04, weight=weight)
+        for name, direction, confidence, weight in [
+            ('Sentiment Analyst', 'bullish', 70, 1.2), ('Fundamental Analyst', 'neutral', 55, 1.5),
+            ('Technical Analyst', 'bullish', 64, 1.0), ('Macro Economist', 'bearish', 60, 0.8),
+            ('Risk Manager', 'neutral', 50, 1.3),
+        ]
+    ]
+
+    class Fixed:
+        CONTEXT_KEYS = ()
+
+        def __init__(self, opinion):
+            self.opinion = opinion
+            self.name = opinion.agent_name
+
+        def evaluate(self, tickers, contexts):
+            return [self.opinion for _ in tickers]
+
+    orchestrator = AgentOrchestrator([Fixed(o) for o in opinions])
+    return asyncio.run(orchestrator.analyze_ticker('AAPL', {}))
+
+
+def timed(fn, repeats: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def report(name: str, legacy_ms: float, fast_ms: float, size: int):
+    print(f"{name:<28} stock {legacy_ms:8.3f} ms   fast {fast_ms:8.3f} ms   "
+          f"{legacy_ms / fast_ms:5.1f}x   ({size / 1024:.0f} KiB)")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"encoder: {'orjson' if serialization.orjson else 'stdlib json (orjson not installed)'}")
+    predictor = PricePredictor()
+
+    for label, interval in (('history 1d (500 bars)', '1d'), ('history 5m (500 bars)', '5m')):
+        df = predictor._generate_mock_data('AAPL', interval)
+        predictor.fetch_data = lambda *args, **kwargs: df     # time serialization only, not the download
+        legacy = lambda: JSONResponse(content={'status': 'success', 'symbol': 'AAPL', 'data': legacy_history(df)}).body
+        fast = lambda: FastJSONResponse(content={
+            'status': 'success', 'symbol': 'AAPL', 'data': predictor.get_history('AAPL', interval=interval)}).body
+        report(label, timed(legacy, repeats), timed(fast, repeats), len(fast()))
+
+    result = analyze_payload()
+    payload = {'status': 'success', 'data': result}
+    # The stock JSONResponse cannot encode the opinions' datetimes without jsonable_encoder
+    legacy = lambda: JSONResponse(content=jsonable_encoder(payload)).body
+    fast = lambda: FastJSONResponse(content=payload).body
+    report('analyze (5 opinions)', timed(legacy, repeats * 20), timed(fast, repeats * 20), len(fast()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Startup import cost, measured in fresh interpreters
+Reports how long `import main` takes (what delays binding), how long the background
+import of the ML stack takes (what delays the /agent routes), and the slowest
+modules by cumulative import time from `python -X importtime`.
+Run from ml_backend/: python -m benchmarks.bench_startup [repeats]
+"""
+import os
+import sys
+import subprocess
+import statistics
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed_import(statement: str) -> float:
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_modules(statement: str, top: int = 10):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=HERE,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(repeats: int = 5):
+    background = "import main; main.startup_state.import_modules(main.HEAVY_MODULES)"
+    for label, statement in (("import main (bind)", "import main"),
+                             ("+ ML stack (background)", background)):
+        samples = [timed_import(statement) for _ in range(repeats)]
+        print(f"{label:<24} median {statistics.median(samples) * 1000:7.0f} ms   "
+              f"min {min(samples) * 1000:7.0f} ms")
+
+    print("\nSlowest modules under `import main` (cumulative ms, self ms):")
+    for cumulative, own, name in slowest_modules("import main"):
+        print(f"  {cumulative / 1000:8.1f} {own / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
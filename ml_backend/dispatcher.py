@@ -0,0 +1,325 @@
+"""
+Front dispatcher for symbol-affinity sharding
+Spawns SHARD_COUNT worker processes (main:app) and routes every request for a
+symbol to the same worker, so each worker only warms its own shard's models
+and caches. Run with: uvicorn dispatcher:app --port $PORT
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import subprocess
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from utils.sharding import SHARD_COUNT, HashRing, request_symbol, shard_key
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_BASE_PORT = int(os.getenv("SHARD_WORKER_BASE_PORT", "9100"))
+PROXY_TIMEOUT = float(os.getenv("SHARD_PROXY_TIMEOUT", "120"))
+MAX_BATCH_SYMBOLS = 200
+# Enforced across shards, since each shard only sees its own part of a stream's subscriptions
+STREAM_MAX_SYMBOLS_PER_CONNECTION = int(os.getenv('STREAM_MAX_SYMBOLS_PER_CONNECTION', '20'))
+
+# Externally managed workers (e.g. one container per shard) instead of spawning them
+WORKER_URLS: List[str] = [u.strip().rstrip('/') for u in os.getenv("SHARD_WORKER_URLS", "").split(",") if u.strip()]
+if not WORKER_URLS:
+    WORKER_URLS = [f"http://127.0.0.1:{WORKER_BASE_PORT + i}" for i in range(max(SHARD_COUNT, 1))]
+
+ring = HashRing(len(WORKER_URLS))
+_processes: List[subprocess.Popen] = []
+_client: Optional[httpx.AsyncClient] = None
+
+# Hop-by-hop and re-encoded headers that must not be copied between connections
+_SKIP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding"}
+
+
+def _spawn_workers():
+    for i, url in enumerate(WORKER_URLS):
+        env = dict(os.environ, SHARD_INDEX=str(i), SHARD_COUNT=str(len(WORKER_URLS)))
+        port = url.rsplit(":", 1)[1]
+        _processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", port],
+            cwd=BASE_DIR, env=env,
+        ))
+        logger.info(f"Started shard worker {i} on port {port}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _client
+    if not os.getenv("SHARD_WORKER_URLS"):
+        _spawn_workers()
+    _client = httpx.AsyncClient(timeout=PROXY_TIMEOUT)
+    yield
+    await _client.aclose()
+    for process in _processes:
+        process.terminate()
+    for process in _processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+app = FastAPI(title="TradePro AI Agents (dispatcher)", lifespan=lifespan)
+
+
+async def _forward(shard: int, request: Request, body: bytes) -> Response:
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS}
+    url = f"{WORKER_URLS[shard]}{request.url.path}"
+    try:
+        upstream = await _client.request(request.method, url, params=request.query_params,
+                                         headers=headers, content=body)
+    except httpx.TransportError as e:
+        logger.error(f"Shard {shard} unreachable: {e}")
+        return JSONResponse(status_code=503, content={"detail": f"Shard {shard} unavailable"},
+                            headers={"Retry-After": "5"})
+    response_headers = {k: v for k, v in upstream.headers.items() if k.lower() not in _SKIP_HEADERS}
+    response_headers["X-Shard"] = str(shard)
+    return Response(content=upstream.content, status_code=upstream.status_code, headers=response_headers)
+
+
+class PredictBatchRequest(BaseModel):
+    symbols: List[str]
+    horizon: int = 7
+    explain: Optional[str] = None
+    explain_budget_ms: Optional[float] = None   # each shard's sub-batch gets the whole budget; they run concurrently
+
+
+class AnalyzeBatchRequest(BaseModel):
+    symbols: List[str]
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "role": "dispatcher", "shards": len(WORKER_URLS)}
+
+
+@app.get("/agent/health")
+async def shard_health():
+    """Health of every shard worker"""
+    async def probe(i: int, url: str):
+        try:
+            r = await _client.get(f"{url}/agent/health", timeout=5)
+            return {"shard": i, "url": url, "health": r.json()}
+        except (httpx.HTTPError, ValueError) as e:
+            return {"shard": i, "url": url, "health": {"status": "unreachable", "error": str(e)}}
+
+    shards = await asyncio.gather(*(probe(i, url) for i, url in enumerate(WORKER_URLS)))
+    healthy = all(s["health"].get("status") == "healthy" for s in shards)
+    return {"status": "healthy" if healthy else "degraded", "role": "dispatcher", "shards": shards}
+
+
+async def _split_batch(path: str, symbols: List[str], params: Dict[str, Any],
+                       request_timeout: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Split a batch by owning shard, run the sub-batches concurrently, merge in input order.
+    The client's X-Request-Timeout is forwarded to every shard, less the time already spent here.
+    """
+    started = time.monotonic()
+    if not symbols or len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"symbols must contain 1 to {MAX_BATCH_SYMBOLS} entries")
+    budget = None
+    if request_timeout:
+        try:
+            budget = float(request_timeout)
+        except ValueError:
+            raise HTTPException(status_code=400,
+                                detail=f"X-Request-Timeout must be a number of seconds, got '{request_timeout}'")
+
+    groups = ring.split(symbols)
+
+    async def run(shard: int, positions: List[int]):
+        payload = {"symbols": [symbols[i] for i in positions], **params}
+        headers = {}
+        if budget is not None:
+            # Shards clamp this to their minimum deadline
+            headers["X-Request-Timeout"] = f"{max(budget - (time.monotonic() - started), 0.0):.3f}"
+        r = await _client.post(f"{WORKER_URLS[shard]}{path}", json=payload, headers=headers)
+        r.raise_for_status()
+        return positions, r.json()["data"]["results"]
+
+    try:
+        parts = await asyncio.gather(*(run(s, p) for s, p in groups.items()))
+    except httpx.HTTPStatusError as e:
+        response = e.response
+        if response.status_code < 500 or response.status_code == 504:
+            # Invalid request (e.g. an unknown explain mode), shed load or the client's deadline:
+            # pass the shard's answer through
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            detail = body.get("detail", response.text) if isinstance(body, dict) else response.text
+            retry_after = response.headers.get("retry-after")
+            raise HTTPException(status_code=response.status_code, detail=detail,
+                                headers={"Retry-After": retry_after} if retry_after else None)
+        raise HTTPException(status_code=503, detail=f"Shard request failed: {e}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Shard request failed: {e}")
+
+    results = [None] * len(symbols)
+    for positions, shard_results in parts:
+        for i, result in zip(positions, shard_results):
+            results[i] = result
+    return {"status": "success", "data": {"results": results, "shards_used": len(groups)}}
+
+
+@app.post("/agent/predict-batch")
+async def predict_batch(request: PredictBatchRequest, x_request_timeout: Optional[str] = Header(None)):
+    params = {"horizon": request.horizon, "explain": request.explain,
+              "explain_budget_ms": request.explain_budget_ms}
+    return await _split_batch("/agent/predict-batch", request.symbols, params, x_request_timeout)
+
+
+@app.post("/agent/analyze-batch")
+async def analyze_batch(request: AnalyzeBatchRequest, x_request_timeout: Optional[str] = Header(None)):
+    return await _split_batch("/agent/analyze-batch", request.symbols, {}, x_request_timeout)
+
+
+class StreamProxy:
+    """
+    One client stream over the shards: a connection to each shard that owns a subscribed
+    symbol, with subscribe/unsubscribe split by owner and the shards' subscription lists
+    merged. Pushes are relayed unchanged.
+    """
+
+    def __init__(self, client: WebSocket, channels: str):
+        self.client = client
+        self.channels = channels
+        self.upstreams: Dict[int, Any] = {}
+        self.subscriptions: Dict[int, List[str]] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.closed: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def _upstream(self, shard: int):
+        if shard not in self.upstreams:
+            url = WORKER_URLS[shard].replace("http", "ws", 1) + "/agent/stream"
+            if self.channels:
+                url += f"?channels={self.channels}"
+            self.upstreams[shard] = await websockets.connect(url)
+            self.tasks.append(asyncio.create_task(self._relay(shard, self.upstreams[shard])))
+        return self.upstreams[shard]
+
+    async def _relay(self, shard: int, upstream):
+        try:
+            async for raw in upstream:
+                message = json.loads(raw)
+                if message.get("type") == "subscriptions":
+                    self.subscriptions[shard] = message["symbols"]
+                    await self._send_subscriptions()
+                else:
+                    await self.client.send_text(raw)
+            code, reason = upstream.close_code or 1011, upstream.close_reason or f"Shard {shard} closed the stream"
+        except websockets.ConnectionClosed as e:
+            code, reason = e.code or 1011, e.reason or f"Shard {shard} closed the stream"
+        except Exception as e:
+            # The client went away mid-send, or the shard sent something unreadable
+            code, reason = 1011, str(e)
+        if not self.closed.done():
+            self.closed.set_result((code, reason))
+
+    async def _send_subscriptions(self):
+        merged = sorted(s for symbols in self.subscriptions.values() for s in symbols)
+        await self.client.send_text(json.dumps({"type": "subscriptions", "symbol": "", "symbols": merged}))
+
+    async def _error(self, detail: str):
+        await self.client.send_text(json.dumps({"type": "error", "detail": detail}))
+
+    async def apply(self, action: str, requested: List[str]):
+        if action == "subscribe":
+            known = {shard_key(s) for symbols in self.subscriptions.values() for s in symbols}
+            new = list(dict.fromkeys(s for s in requested if shard_key(s) not in known))
+            room = STREAM_MAX_SYMBOLS_PER_CONNECTION - len(known)
+            if len(new) > room:
+                new = new[:max(room, 0)]
+                await self._error(f"At most {STREAM_MAX_SYMBOLS_PER_CONNECTION} symbols per connection")
+            requested = new
+        groups = ring.split(requested)
+        for shard, positions in groups.items():
+            if action == "unsubscribe" and shard not in self.upstreams:
+                continue
+            upstream = await self._upstream(shard)
+            await upstream.send(json.dumps({"action": action, "symbols": [requested[i] for i in positions]}))
+        if not groups:
+            await self._send_subscriptions()
+
+    async def receive(self):
+        while True:
+            try:
+                message = json.loads(await self.client.receive_text())
+                action, requested = message["action"], message["symbols"]
+                if action not in ("subscribe", "unsubscribe") or not isinstance(requested, list):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                await self._error('Expected {"action": "subscribe" | "unsubscribe", "symbols": [...]}')
+                continue
+            await self.apply(action, [str(s) for s in requested])
+
+    async def aclose(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*(u.close() for u in self.upstreams.values()), return_exceptions=True)
+
+
+@app.websocket("/agent/stream")
+async def stream(websocket: WebSocket, symbols: str = "", channels: str = ""):
+    """Same protocol as a worker's /agent/stream; each symbol is streamed by its home shard"""
+    await websocket.accept()
+    if websockets is None:
+        await websocket.close(code=1011, reason="websockets not installed on the dispatcher")
+        return
+    proxy = StreamProxy(websocket, channels)
+    receiver = None
+    try:
+        if symbols:
+            await proxy.apply("subscribe", [s for s in symbols.split(",") if s])
+        receiver = asyncio.create_task(proxy.receive())
+        await asyncio.wait({receiver, proxy.closed}, return_when=asyncio.FIRST_COMPLETED)
+        if not receiver.done():
+            # A shard ended the stream (slow consumer, limit, restart): end the client's too
+            code, reason = proxy.closed.result()
+            await websocket.close(code=code, reason=reason)
+    except (OSError, websockets.InvalidHandshake) as e:
+        logger.error(f"Stream shard unreachable: {e}")
+        await websocket.close(code=1013, reason="Shard unavailable")
+    except (WebSocketDisconnect, RuntimeError):
+        pass        # the client is already gone (Starlette raises RuntimeError on sends after close)
+    finally:
+        if receiver is not None:
+            if receiver.done() and not receiver.cancelled():
+                receiver.exception()        # the client disconnected
+            receiver.cancel()
+        await proxy.aclose()
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def proxy(path: str, request: Request):
+    """Symbol requests go to the symbol's home shard; anything else is pinned by path"""
+    body = await request.body()
+    symbol = request_symbol(request.url.path, request.url.query, body)
+    shard = ring.shard_for(shard_key(symbol) if symbol else request.url.path)
+    return await _forward(shard, request, body)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("dispatcher:app", host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
@@ -1,14 +1,82 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from api.debug import router as debug_router
+from utils.serialization import FastJSONResponse
+from utils.admission import AdmissionMiddleware
+from utils.profiling import SlowRequestMiddleware
+from utils.startup import FAILED, WARMUP_SYMBOLS, StartupGateMiddleware, startup_state
 import uvicorn
 
 load_dotenv()
 
-app = FastAPI(title="TradePro AI Agents")
+# Imported after the server binds (see utils/startup.py), in this order so each
+# module's own import cost is recorded
+HEAVY_MODULES = ("numpy", "pandas", "lightgbm", "yfinance", "predictor", "api.routes")
+
+background_services = []
+# Fire-and-forget tasks; the event loop only keeps weak references to them
+background_tasks = set()
+
+
+def _warm_symbol(symbol: str):
+    # Bars, features and the default 7-day model; the scheduler paces the downloads
+    from predictor.price_predictor import predictor
+    predictor.predict(symbol, 7)
+
+
+async def start_application(app: FastAPI):
+    """Import the ML stack, mount the API, start background services, then warm up"""
+    try:
+        await asyncio.to_thread(startup_state.import_modules, HEAVY_MODULES)
+        from api.routes import router
+    except Exception as e:
+        startup_state.fail(e)
+        return
+    app.include_router(router)
+    app.openapi_schema = None       # rebuilt with the /agent routes
+    startup_state.mark_routes_mounted()
+
+    try:
+        from predictor.news_ingestor import news_ingestor
+        from predictor.fundamentals import fundamentals_provider
+        from predictor.macro import macro_provider
+    except ImportError:
+        news_ingestor = None
+        fundamentals_provider = None
+        macro_provider = None
+    # Background news polling; request handlers read the article store it fills
+    if news_ingestor is not None:
+        news_ingestor.start()
+        background_services.append(news_ingestor)
+    # Bulk refresh of fundamentals before their daily cache entries expire
+    if fundamentals_provider is not None:
+        fundamentals_provider.start()
+        background_services.append(fundamentals_provider)
+    # Compute today's macro snapshot before the first analysis needs it
+    if macro_provider is not None:
+        task = asyncio.create_task(asyncio.to_thread(macro_provider.snapshot))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    await startup_state.warm_up(WARMUP_SYMBOLS, _warm_symbol)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Returns at once so the server binds; /ready reports progress
+    startup = asyncio.create_task(start_application(app))
+    yield
+    startup.cancel()
+    for service in background_services:
+        await service.stop()
+
+
+app = FastAPI(title="TradePro AI Agents", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -24,6 +92,13 @@ allowed_origins = [
 # Remove duplicates and empty strings
 allowed_origins = list(set(filter(None, allowed_origins)))
 
+# Admission control sits inside CORS, so shed responses still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+# Outside admission, so a slow request's trace includes its queue wait
+app.add_middleware(SlowRequestMiddleware)
+# Answers for the /agent routes until they are mounted
+app.add_middleware(StartupGateMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -32,12 +107,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(router)
+app.include_router(debug_router)
 
 @app.get("/")
 async def root():
     return {"message": "TradePro AI Agents API", "status": "running"}
 
+
+@app.get("/health")
+async def liveness():
+    """
+    Liveness: the process is up and serving (Render's health check); never waits on warm-up.
+    503 once startup has failed, so the instance is restarted instead of answering 503 forever
+    """
+    if startup_state.phase == FAILED:
+        return FastJSONResponse(
+            status_code=503,
+            content={"status": "failed", "phase": startup_state.phase, "error": startup_state.error,
+                     "uptime_s": round(startup_state.uptime(), 1)},
+            headers={"Cache-Control": "no-store"},
+        )
+    return {"status": "alive", "phase": startup_state.phase, "uptime_s": round(startup_state.uptime(), 1)}
+
+
+@app.get("/ready")
+async def readiness():
+    """Readiness: 200 once the API is mounted and warm-up has finished, 503 with progress before"""
+    report = startup_state.report()
+    status = 200 if startup_state.ready else 503
+    return FastJSONResponse(status_code=status, content=report, headers={"Cache-Control": "no-store"})
+
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
@@ -1,49 +1,173 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import os
+import hashlib
 import asyncio
+import logging
 import numpy as np
 from datetime import datetime
 from agents.base_agent import BaseTradingAgent, AgentOpinion
+from utils.serialization import dumps
+from utils.deadline import current_deadline
+from utils.profiling import stage
+
+logger = logging.getLogger(__name__)
 
 class AgentOrchestrator:
+    # Memoized opinions/results, keyed by a hash of the context slice each agent reads.
+    # New data changes the slice, so a stale entry is never matched; LRU bounds memory.
+    MEMO_MAX_ENTRIES = int(os.getenv('AGENT_MEMO_MAX_ENTRIES', '4096'))
+
     def __init__(self, agents: List[BaseTradingAgent]):
         self.agents = agents
-        
+        self._opinions: "OrderedDict[Tuple[str, str, str], AgentOpinion]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.result_hits = 0
+
+    @staticmethod
+    def context_hash(context: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[str]:
+        """
+        Stable digest of the context sections in `keys` (the whole context if none are
+        declared); None if the slice cannot be encoded, which disables memoization
+        """
+        data = {k: context.get(k) for k in keys} if keys else context
+        try:
+            return hashlib.blake2b(dumps(data, sort_keys=True), digest_size=16).hexdigest()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _memoizable(opinion: Any) -> bool:
+        # Timeouts and errors are transient, not a function of the context
+        return isinstance(opinion, AgentOpinion) and opinion.key_factors != ["timeout"]
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, limit: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def _cached_opinion(self, key: Tuple[str, str, Optional[str]]) -> Optional[AgentOpinion]:
+        if key[2] is None:
+            return None
+        opinion = self._opinions.get(key)
+        if opinion is not None:
+            self._opinions.move_to_end(key)
+        return opinion
+
+    def _store_opinion(self, key: Tuple[str, str, Optional[str]], opinion: Any):
+        if key[2] is not None and self._memoizable(opinion):
+            self._remember(self._opinions, key, opinion, self.MEMO_MAX_ENTRIES)
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drop memoized opinions and results (for one ticker, or all)"""
+        if ticker is None:
+            self._opinions.clear()
+            self._results.clear()
+            return
+        for key in [k for k in self._opinions if k[1] == ticker]:
+            del self._opinions[key]
+        for key in [k for k in self._results if k[0] == ticker]:
+            del self._results[key]
+
     async def analyze_ticker(self, ticker: str, context: Dict[str, Any]) -> Dict:
-        # Run all agents in parallel
-        tasks = [agent.run_with_timeout(ticker, context) for agent in self.agents]
-        opinions = await asyncio.gather(*tasks, return_exceptions=True)
-        
+        return (await self.analyze_batch([ticker], [context]))[0]
+
+    async def analyze_batch(self, tickers: List[str], contexts: List[Dict[str, Any]]) -> List[Dict]:
+        """
+        Each agent evaluates all of its uncached tickers in one vectorized `evaluate`
+        call; agents without one, or whose batch call fails, run per ticker, in parallel,
+        under their timeout, so one ticker's bad input only drops that agent's opinion on it
+        """
+        hashes = [tuple(self.context_hash(c, agent.CONTEXT_KEYS) for agent in self.agents) for c in contexts]
+        results: List[Optional[Dict]] = [None] * len(tickers)
+        for i, (ticker, h) in enumerate(zip(tickers, hashes)):
+            memo = self._results.get((ticker, h)) if None not in h else None
+            if memo is not None:
+                self.result_hits += 1
+                results[i] = {**memo, 'timestamp': datetime.now().isoformat()}
+        todo = [i for i, r in enumerate(results) if r is None]
+
+        opinions: Dict[int, List[Any]] = {i: [None] * len(self.agents) for i in todo}
+        deadline = current_deadline()
+        for a, agent in enumerate(self.agents):
+            keys = {i: (agent.name, tickers[i], hashes[i][a]) for i in todo}
+            pending = []
+            for i in todo:
+                opinions[i][a] = self._cached_opinion(keys[i])
+                if opinions[i][a] is None:
+                    pending.append(i)
+            self.hits += len(todo) - len(pending)
+            self.misses += len(pending)
+            if not pending:
+                continue
+            if deadline is not None and deadline.expired:
+                # Out of time: the verdict is synthesized from the opinions we have
+                deadline.cut(f"agent:{agent.name}")
+                continue
+            with stage(f"agent:{agent.name}"):
+                try:
+                    fresh = agent.evaluate([tickers[i] for i in pending], [contexts[i] for i in pending])
+                except Exception as e:
+                    if not isinstance(e, NotImplementedError):
+                        logger.warning(f"{agent.name} batch evaluation failed ({e}); evaluating per ticker")
+                    timeout = min(5, deadline.remaining()) if deadline is not None else 5
+                    fresh = await asyncio.gather(*(agent.run_with_timeout(tickers[i], contexts[i], timeout)
+                                                   for i in pending), return_exceptions=True)
+            for i, opinion in zip(pending, fresh):
+                opinions[i][a] = opinion
+                self._store_opinion(keys[i], opinion)
+
+        for i in todo:
+            results[i] = self._assemble(tickers[i], opinions[i])
+            if None not in hashes[i] and all(self._memoizable(o) for o in opinions[i]):
+                self._remember(self._results, (tickers[i], hashes[i]), results[i], self.MEMO_MAX_ENTRIES)
+        return results
+
+    def _assemble(self, ticker: str, opinions: List[Any]) -> Dict:
         # Filter valid opinions
         valid_opinions = [o for o in opinions if isinstance(o, AgentOpinion)]
-        
+
         # Synthesize final decision
         final = self._synthesize(valid_opinions)
-        
+
         return {
             'ticker': ticker,
             'timestamp': datetime.now().isoformat(),
-            'individual_opinions': [o.dict() for o in valid_opinions],
+            'individual_opinions': [o.model_dump() for o in valid_opinions],
             'final_recommendation': final,
             'debate_summary': self._generate_summary(valid_opinions)
         }
-    
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'memoized_opinions': len(self._opinions),
+            'memoized_results': len(self._results),
+            'opinion_hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'result_hits': self.result_hits,
+        }
+
     def _synthesize(self, opinions: List[AgentOpinion]) -> Dict:
         # Weighted voting
         scores = {'bullish': 0, 'bearish': 0, 'neutral': 0}
         total_weight = 0
-        
+
         for o in opinions:
             weight = o.weight * (o.confidence / 100)
             scores[o.direction] += weight
             total_weight += weight
-        
+
         # Get final direction
         final_dir = max(scores, key=scores.get)
-        
+
         # Calculate average position size from risk manager or others
         position_sizes = [o.suggested_position_size for o in opinions if o.suggested_position_size > 0]
         avg_position = np.mean(position_sizes) if position_sizes else 0.05
-        
+
         return {
             'direction': final_dir,
             'confidence': int((scores[final_dir] / total_weight) * 100) if total_weight > 0 else 50,
@@ -53,10 +177,10 @@ class AgentOrchestrator:
             'bearish_score': round(scores['bearish'], 2),
             'neutral_score': round(scores['neutral'], 2)
         }
-    
+
     def _generate_summary(self, opinions: List[AgentOpinion]) -> str:
         lines = []
         for o in opinions:
             emoji = "📈" if o.direction == "bullish" else "📉" if o.direction == "bearish" else "➖"
             lines.append(f"{emoji} {o.agent_name}: {o.direction.upper()} ({o.confidence}%)")
-        return "\n".join(lines)
\ No newline at end of file
+        return "\n".join(lines)
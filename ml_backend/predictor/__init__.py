@@ -1,4 +1,10 @@
 from .price_predictor import PricePredictor, TechnicalIndicators, predictor
 from .sentiment import SentimentAnalyzer, sentiment_analyzer
+from .risk import RiskEngine, risk_engine
+from .portfolio import PortfolioRiskAnalyzer, portfolio_analyzer
+from .simulation import MonteCarloSimulator, monte_carlo
+from .screener import Screener, screener
 
-__all__ = ['PricePredictor', 'TechnicalIndicators', 'predictor', 'SentimentAnalyzer', 'sentiment_analyzer']
+__all__ = ['PricePredictor', 'TechnicalIndicators', 'predictor', 'SentimentAnalyzer', 'sentiment_analyzer',
+           'RiskEngine', 'risk_engine', 'PortfolioRiskAnalyzer', 'portfolio_analyzer',
+           'MonteCarloSimulator', 'monte_carlo', 'Screener', 'screener']
@@ -0,0 +1,234 @@
+"""
+Persistent news article store (SQLite) with deduplication and time-decayed sentiment
+Articles are scored once at ingest; per-symbol aggregates are updated incrementally
+"""
+import os
+import re
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    symbol        TEXT NOT NULL,
+    id            TEXT NOT NULL,      -- sha1 of the normalized title
+    title         TEXT NOT NULL,
+    source        TEXT,
+    link          TEXT,
+    published     TEXT,
+    published_ts  REAL NOT NULL,
+    ingested_ts   REAL NOT NULL,
+    sentiment     TEXT NOT NULL,
+    score         REAL NOT NULL,
+    model_sentiment TEXT,
+    model_score   REAL,
+    PRIMARY KEY (symbol, id)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_recent ON articles (symbol, published_ts DESC);
+CREATE TABLE IF NOT EXISTS symbol_sentiment (
+    symbol        TEXT PRIMARY KEY,
+    ref_ts        REAL NOT NULL,      -- decayed sums below are valued at this time
+    score_sum     REAL NOT NULL,
+    weight_sum    REAL NOT NULL,
+    model_sum     REAL NOT NULL,
+    model_weight  REAL NOT NULL,
+    article_count INTEGER NOT NULL,
+    positive_count INTEGER NOT NULL,
+    negative_count INTEGER NOT NULL,
+    neutral_count INTEGER NOT NULL,
+    last_ingest_ts REAL NOT NULL
+);
+"""
+
+
+def article_id(title: str) -> str:
+    """Dedup key: the same headline from Yahoo and Seeking Alpha maps to one article"""
+    normalized = re.sub(r'[^a-z0-9]+', ' ', title.lower()).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def parse_published(value: str, default: float) -> float:
+    """RSS (RFC 822) or ISO timestamp -> epoch seconds"""
+    if not value:
+        return default
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            return default
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class ArticleStore:
+    """
+    Per symbol, symbol_sentiment keeps S = sum(score_i * exp(-k (ref - t_i))) and
+    W = sum(exp(-k (ref - t_i))). Decaying both to "now" scales them by the same
+    factor, so the decayed mean S / W is read in O(1) without touching articles.
+    Article and label counts cover retained articles only: they are recounted
+    whenever articles older than RETENTION_DAYS are pruned.
+    """
+
+    HALF_LIFE_HOURS = float(os.getenv('SENTIMENT_HALF_LIFE_HOURS', '24'))
+    RETENTION_DAYS = float(os.getenv('ARTICLE_RETENTION_DAYS', '30'))
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self.decay = math.log(2) / (self.HALF_LIFE_HOURS * 3600)
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # One connection shared by threads (serialized by _lock); WAL lets worker processes read concurrently
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def known_ids(self, symbol: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored scores for the given article ids, so callers only score new headlines"""
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, sentiment, score, model_sentiment, model_score FROM articles "
+                f"WHERE symbol = ? AND id IN ({placeholders})", [symbol, *ids]
+            ).fetchall()
+        return {r[0]: {'sentiment': r[1], 'sentiment_score': r[2], 'model_sentiment': r[3], 'model_score': r[4]}
+                for r in rows}
+
+    def ingest(self, symbol: str, articles: List[Dict[str, Any]]) -> int:
+        """Insert new articles and fold them into the symbol's decayed aggregate; returns how many were new"""
+        now = time.time()
+        added = 0
+        with self._lock:
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT ref_ts, score_sum, weight_sum, model_sum, model_weight, article_count, "
+                    "positive_count, negative_count, neutral_count FROM symbol_sentiment WHERE symbol = ?",
+                    (symbol,)
+                ).fetchone()
+                ref, s, w, ms, mw, n, pos, neg, neu = row or (now, 0.0, 0.0, 0.0, 0.0, 0, 0, 0, 0)
+
+                seen: Set[str] = set()
+                for a in articles:
+                    aid = a.get('id') or article_id(a['title'])
+                    if aid in seen:
+                        continue
+                    seen.add(aid)
+                    t = min(parse_published(a.get('published', ''), now), now)
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO articles VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                        (symbol, aid, a['title'], a.get('source'), a.get('link'), a.get('published'), t, now,
+                         a['sentiment'], a['sentiment_score'], a.get('model_sentiment'), a.get('model_score'))
+                    )
+                    if cursor.rowcount == 0:
+                        continue  # already stored (possibly by another worker)
+                    added += 1
+                    if t > ref:
+                        factor = math.exp(-self.decay * (t - ref))
+                        s, w, ms, mw, ref = s * factor, w * factor, ms * factor, mw * factor, t
+                    weight = math.exp(-self.decay * (ref - t))
+                    s += weight * a['sentiment_score']
+                    w += weight
+                    if a.get('model_score') is not None:
+                        ms += weight * a['model_score']
+                        mw += weight
+                    n += 1
+                    pos += a['sentiment'] == 'POSITIVE'
+                    neg += a['sentiment'] == 'NEGATIVE'
+                    neu += a['sentiment'] == 'NEUTRAL'
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO symbol_sentiment VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    (symbol, ref, s, w, ms, mw, n, pos, neg, neu, now)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            if now - self._last_prune > self.PRUNE_INTERVAL:
+                self._last_prune = now
+                self._prune(now - self.RETENTION_DAYS * 86400)
+        return added
+
+    def _prune(self, cutoff: float):
+        """Delete articles published before cutoff and recount what remains (caller holds _lock)"""
+        conn = self._conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute("DELETE FROM articles WHERE published_ts < ?", (cutoff,)).rowcount:
+                conn.execute(
+                    "UPDATE symbol_sentiment SET "
+                    "article_count = (SELECT COUNT(*) FROM articles a WHERE a.symbol = symbol_sentiment.symbol), "
+                    "positive_count = (SELECT COUNT(*) FROM articles a WHERE a.symbol = symbol_sentiment.symbol "
+                    "AND a.sentiment = 'POSITIVE'), "
+                    "negative_count = (SELECT COUNT(*) FROM articles a WHERE a.symbol = symbol_sentiment.symbol "
+                    "AND a.sentiment = 'NEGATIVE'), "
+                    "neutral_count = (SELECT COUNT(*) FROM articles a WHERE a.symbol = symbol_sentiment.symbol "
+                    "AND a.sentiment = 'NEUTRAL')"
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def aggregate(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Decayed sentiment for a symbol from its single aggregate row, or None if never ingested"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ref_ts, score_sum, weight_sum, model_sum, model_weight, article_count, "
+                "positive_count, negative_count, neutral_count, last_ingest_ts FROM symbol_sentiment WHERE symbol = ?",
+                (symbol,)
+            ).fetchone()
+        if row is None:
+            return None
+        ref, s, w, ms, mw, n, pos, neg, neu, last_ingest = row
+        return {
+            'score': s / w if w > 0 else 0.0,
+            'model_score': ms / mw if mw > 0 else None,
+            # Articles' total weight as of now: a recency-weighted article count
+            'effective_count': w * math.exp(-self.decay * max(time.time() - ref, 0)),
+            'article_count': n,
+            'positive_count': pos,
+            'negative_count': neg,
+            'neutral_count': neu,
+            'last_ingest_ts': last_ingest,
+        }
+
+    def recent(self, symbol: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recently published stored articles for a symbol"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, source, link, published, sentiment, score, model_sentiment, model_score "
+                "FROM articles WHERE symbol = ? ORDER BY published_ts DESC LIMIT ?", (symbol, limit)
+            ).fetchall()
+        articles = []
+        for title, source, link, published, sentiment, score, model_sentiment, model_score in rows:
+            article = {'title': title, 'source': source, 'link': link, 'published': published,
+                       'sentiment': sentiment, 'sentiment_score': score}
+            if model_score is not None:
+                article['model_sentiment'] = model_sentiment
+                article['model_score'] = model_score
+            articles.append(article)
+        return articles
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            symbols = self._conn.execute("SELECT COUNT(*) FROM symbol_sentiment").fetchone()[0]
+        return {'path': self.path, 'articles': articles, 'symbols': symbols, 'half_life_hours': self.HALF_LIFE_HOURS}
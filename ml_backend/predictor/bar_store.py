@@ -0,0 +1,220 @@
+"""
+OHLCV bars shared by every uvicorn worker through memory-mapped files
+One worker fetches and publishes; the others map the same pages read-only.
+The store lives in RAM (/dev/shm) and outlives the process, so keys that have not
+been refreshed within max_age, and the oldest keys beyond max_bytes, are pruned
+at startup and periodically after publishing.
+"""
+import os
+import json
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+class SharedBarStore:
+    """
+    Per (symbol, period):
+      <key>.json          manifest: generation, n_rows, columns, tz, fetched_at
+      <key>.<gen>.bars    int64 UTC nanosecond dates, then one float64 block per column
+      <key>.lock          flock taken by the worker refreshing this key
+
+    Generation files are written under a temporary name and renamed before the
+    manifest is swapped, so a reader sees either the old or the new bars, never
+    a mix. Readers get DataFrames whose columns are read-only views of the map.
+    """
+
+    ORPHAN_AGE = 3600       # seconds before unreferenced generations and temp files are removed
+
+    def __init__(self, root: str, max_bytes: int = 0, max_age: float = 0, prune_interval: float = 600):
+        self.root = root
+        self.max_bytes = max_bytes          # 0: unbounded
+        self.max_age = max_age              # 0: keys never expire
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self.pruned = 0
+        # Per-process views keyed by generation, so repeat reads skip re-mapping
+        self._views: Dict[Tuple[str, str], Tuple[str, pd.DataFrame]] = {}
+        self.enabled = True
+        try:
+            os.makedirs(root, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"Shared bar store disabled, cannot use {root}: {e}")
+            self.enabled = False
+        if self.enabled:
+            self.prune()
+
+    def _file(self, symbol: str, period: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{symbol.replace('/', '_')}_{period}.{suffix}")
+
+    def _read_manifest(self, symbol: str, period: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(symbol, period, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def lock(self, symbol: str, period: str, timeout: float) -> FileLock:
+        """Cross-process lock serializing refreshes of one key"""
+        return FileLock(self._file(symbol, period, 'lock'), timeout=timeout)
+
+    def get(self, symbol: str, period: str) -> Optional[Tuple[float, pd.DataFrame]]:
+        """(fetched_at wall time, bars) as last published by any worker, or None"""
+        if not self.enabled:
+            return None
+        key = (symbol, period)
+        # A writer may unlink the generation we just read about; re-read once
+        for _ in range(2):
+            manifest = self._read_manifest(symbol, period)
+            if manifest is None:
+                # Pruned: drop our map so its pages can be freed
+                self._views.pop(key, None)
+                return None
+            view = self._views.get(key)
+            if view is not None and view[0] == manifest['generation']:
+                return manifest['fetched_at'], view[1]
+            try:
+                df = self._map(symbol, period, manifest)
+            except (OSError, ValueError):
+                continue
+            self._views[key] = (manifest['generation'], df)
+            return manifest['fetched_at'], df
+        return None
+
+    def _map(self, symbol: str, period: str, manifest: Dict[str, Any]) -> pd.DataFrame:
+        n, columns = manifest['n_rows'], manifest['columns']
+        data = np.memmap(self._file(symbol, period, f"{manifest['generation']}.bars"),
+                         dtype=np.int64, mode='r', shape=((len(columns) + 1) * n,))
+        dates = pd.to_datetime(data[:n], utc=manifest['tz'] is not None)
+        if manifest['tz'] is not None:
+            dates = dates.tz_convert(manifest['tz'])
+        frame = {'date': dates}
+        values = data[n:].view(np.float64)
+        for i, column in enumerate(columns):
+            frame[column] = values[i * n:(i + 1) * n]
+        return pd.DataFrame(frame, copy=False)
+
+    def put(self, symbol: str, period: str, df: pd.DataFrame):
+        """Publish freshly fetched bars as a new generation"""
+        if not self.enabled or df is None or df.empty or 'date' not in df.columns:
+            return
+        dates = pd.to_datetime(df['date'])
+        tz = None
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            tz = str(dates.dt.tz)
+            dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+        columns = [c for c in df.columns if c != 'date' and pd.api.types.is_numeric_dtype(df[c])]
+
+        previous = self._read_manifest(symbol, period)
+        generation = uuid.uuid4().hex[:8]
+        path = self._file(symbol, period, f'{generation}.bars')
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(dates.to_numpy().astype('datetime64[ns]').view(np.int64).tobytes())
+                for column in columns:
+                    f.write(df[column].to_numpy(dtype=np.float64).tobytes())
+            os.replace(tmp, path)
+
+            manifest_tmp = self._file(symbol, period, f'json.{uuid.uuid4().hex}.tmp')
+            with open(manifest_tmp, 'w') as f:
+                json.dump({
+                    'generation': generation,
+                    'n_rows': len(df),
+                    'columns': columns,
+                    'tz': tz,
+                    'fetched_at': time.time(),
+                }, f)
+            os.replace(manifest_tmp, self._file(symbol, period, 'json'))
+        except OSError as e:
+            logger.warning(f"Could not publish bars for {symbol} {period}: {e}")
+            return
+
+        # Workers still mapping the old generation keep their pages until they unmap
+        if previous:
+            self._remove(self._file(symbol, period, f"{previous['generation']}.bars"))
+        if time.monotonic() - self._last_prune > self.prune_interval:
+            self.prune()
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _scan(self) -> Tuple[Dict[str, Tuple[float, str, int]], list]:
+        """({key stem: (fetched_at, generation file, bytes)}, file names in the store)"""
+        names = os.listdir(self.root)
+        keys = {}
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.root, name)) as f:
+                    manifest = json.load(f)
+                bars = f"{name[:-5]}.{manifest['generation']}.bars"
+                keys[name[:-5]] = (manifest['fetched_at'], bars, os.path.getsize(os.path.join(self.root, bars)))
+            except (OSError, ValueError, KeyError):
+                continue
+        return keys, names
+
+    def prune(self) -> int:
+        """
+        Remove keys not refreshed within max_age, then the least recently refreshed keys
+        until the bars fit in max_bytes, plus generations and temp files left behind by
+        interrupted writes. One worker prunes at a time; returns the keys removed.
+        """
+        self._last_prune = time.monotonic()
+        lock = FileLock(os.path.join(self.root, '.prune.lock'), timeout=0)
+        if not lock.acquire():
+            return 0
+        try:
+            keys, names = self._scan()
+            now = time.time()
+            expired = {k for k, (fetched_at, _, _) in keys.items() if self.max_age and now - fetched_at > self.max_age}
+            dropped = set(expired)
+            if self.max_bytes:
+                total = sum(size for k, (_, _, size) in keys.items() if k not in dropped)
+                for k in sorted(set(keys) - dropped, key=lambda k: keys[k][0]):
+                    if total <= self.max_bytes:
+                        break
+                    dropped.add(k)
+                    total -= keys[k][2]
+            for k in dropped:
+                # Manifest first: readers then see a miss, never a missing generation file
+                self._remove(os.path.join(self.root, f'{k}.json'))
+                self._remove(os.path.join(self.root, keys[k][1]))
+                if k in expired:
+                    # Nobody has refreshed it within max_age, so nobody holds its lock
+                    self._remove(os.path.join(self.root, f'{k}.lock'))
+
+            live = {bars for k, (_, bars, _) in keys.items() if k not in dropped}
+            for name in names:
+                if name.endswith('.tmp') or (name.endswith('.bars') and name not in live):
+                    path = os.path.join(self.root, name)
+                    try:
+                        if now - os.path.getmtime(path) > self.ORPHAN_AGE:
+                            self._remove(path)
+                    except OSError:
+                        pass
+            if dropped:
+                self.pruned += len(dropped)
+                logger.info(f"Pruned {len(dropped)} shared bar series ({len(expired)} expired)")
+            return len(dropped)
+        finally:
+            lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        keys = self._scan()[0] if self.enabled else {}
+        return {'enabled': self.enabled, 'path': self.root, 'keys': len(keys),
+                'bytes': sum(size for _, _, size in keys.values()), 'max_bytes': self.max_bytes,
+                'max_age_s': self.max_age, 'pruned': self.pruned, 'mapped_in_process': len(self._views)}
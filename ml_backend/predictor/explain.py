@@ -0,0 +1,222 @@
+"""
+Per-prediction explanations with TreeSHAP
+LightGBM's built-in TreeSHAP (pred_contrib) attributes one prediction to the
+features of that row: base value plus contributions equals the predicted return.
+An explainer is cached per trained model (dropped along with the model) and
+remembers the rows it explained recently. Rows of the same model are explained in
+one call. `approx` mode runs TreeSHAP over only as many leading trees as fit the
+latency budget, then spreads the skipped trees' share over the features in
+proportion to their contributions, so the sum still matches the prediction.
+"""
+import os
+import time
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.deadline import current_deadline
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_MODES = ('exact', 'approx')
+EXPLAIN_BUDGET_MS = float(os.getenv('EXPLAIN_BUDGET_MS', '10'))
+EXPLAIN_TOP_N = int(os.getenv('EXPLAIN_TOP_N', '5'))
+
+
+def check_mode(mode: str) -> str:
+    if mode not in EXPLAIN_MODES:
+        raise ValueError(f"explain must be one of {', '.join(EXPLAIN_MODES)}")
+    return mode
+
+
+class ModelExplainer:
+    """TreeSHAP for one trained model, with its recently explained rows"""
+
+    MAX_ROWS = 64
+
+    def __init__(self, model):
+        self.booster = model.booster_
+        self.n_trees = self.booster.current_iteration()
+        # row bytes -> (trees used, contributions with the base value last)
+        self._rows: "OrderedDict[bytes, Tuple[int, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contributions(self, X: np.ndarray, n_trees: int) -> Tuple[np.ndarray, np.ndarray, int, float]:
+        """
+        (contributions, trees used per row, rows computed, TreeSHAP seconds); rows seen
+        before with at least n_trees are reused
+        """
+        n_trees = max(1, min(n_trees, self.n_trees))
+        out = np.empty((len(X), X.shape[1] + 1))
+        used = np.empty(len(X), dtype=np.int64)
+        keys = [row.tobytes() for row in X]
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._rows.get(key)
+                if entry is not None and entry[0] >= n_trees:
+                    used[i], out[i] = entry
+                    self._rows.move_to_end(key)
+                else:
+                    missing.append(i)
+        if not missing:
+            return out, used, 0, 0.0
+
+        X_missing = X[missing]
+        started = time.perf_counter()
+        phi = self.booster.predict(X_missing, pred_contrib=True, num_iteration=n_trees)
+        shap_seconds = time.perf_counter() - started
+        if n_trees < self.n_trees:
+            phi = self._complete(phi, self.booster.predict(X_missing, raw_score=True))
+        out[missing] = phi
+        used[missing] = n_trees
+        with self._lock:
+            for i in missing:
+                self._rows[keys[i]] = (n_trees, out[i].copy())
+                self._rows.move_to_end(keys[i])
+            while len(self._rows) > self.MAX_ROWS:
+                self._rows.popitem(last=False)
+        return out, used, len(missing), shap_seconds
+
+    @staticmethod
+    def _complete(phi: np.ndarray, full: np.ndarray) -> np.ndarray:
+        """Assign what the skipped trees add to the features, weighted by |contribution|"""
+        residual = full - phi.sum(axis=1)
+        weights = np.abs(phi[:, :-1])
+        totals = weights.sum(axis=1, keepdims=True)
+        weights = np.where(totals > 0, weights / np.where(totals > 0, totals, 1), 1 / weights.shape[1])
+        phi[:, :-1] += residual[:, None] * weights
+        return phi
+
+
+class PredictionExplainer:
+    """
+    Explainers per trained model plus running cost estimates for budgeting: TreeSHAP's
+    cost per row per tree, and the fixed cost of approximating any rows of one model
+    (two booster calls, conversion, formatting), which no budget can trim
+    """
+
+    COST_SMOOTHING = 0.2
+    MIN_COST_SAMPLE = 100       # row-trees; smaller calls are dominated by the fixed cost
+
+    def __init__(self, budget_ms: float = EXPLAIN_BUDGET_MS, top_n: int = EXPLAIN_TOP_N):
+        self.budget_ms = budget_ms
+        self.top_n = top_n
+        self._explainers: "weakref.WeakKeyDictionary[Any, ModelExplainer]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.model_seconds = 2e-4
+        self.row_tree_seconds = 3e-6
+        self.calls = 0
+        self.rows = 0
+        self.reused = 0
+        self.approximated = 0
+
+    def for_model(self, model) -> ModelExplainer:
+        with self._lock:
+            explainer = self._explainers.get(model)
+            if explainer is None:
+                explainer = self._explainers[model] = ModelExplainer(model)
+            return explainer
+
+    def explain(self, model, X: pd.DataFrame, mode: str = 'exact',
+                budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """One explanation per row of X"""
+        return self.explain_many([(model, X.iloc[[i]]) for i in range(len(X))], mode, budget_ms)
+
+    def explain_many(self, items: Sequence[Tuple[Any, pd.DataFrame]], mode: str = 'exact',
+                     budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Explain one feature row per (model, row) item, in order. Rows of the same model
+        share one TreeSHAP call; in approx mode the whole batch shares the budget
+        (capped by the request deadline) and every model gets the same fraction of its trees.
+        """
+        check_mode(mode)
+        groups: "OrderedDict[int, Tuple[ModelExplainer, List[int]]]" = OrderedDict()
+        for i, (model, _) in enumerate(items):
+            if id(model) not in groups:
+                groups[id(model)] = (self.for_model(model), [])
+            groups[id(model)][1].append(i)
+
+        fraction = 1.0
+        if mode == 'approx':
+            budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000
+            deadline = current_deadline()
+            if deadline is not None:
+                budget = min(budget, deadline.remaining())
+            budget -= len(groups) * self.model_seconds
+            work = sum(len(rows) * explainer.n_trees for explainer, rows in groups.values())
+            fraction = min(1.0, max(budget, 0.0) / max(work * self.row_tree_seconds, 1e-9))
+
+        with self._lock:
+            self.calls += 1
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        for explainer, rows in groups.values():
+            started = time.perf_counter()
+            X = np.vstack([items[i][1].to_numpy(dtype=np.float64) for i in rows])
+            n_trees = max(1, int(fraction * explainer.n_trees))
+            phi, used, computed, shap_seconds = explainer.contributions(X, n_trees)
+            names = list(items[rows[0]][1].columns)
+            for j, i in enumerate(rows):
+                results[i] = self._describe(phi[j], X[j], names, int(used[j]), explainer.n_trees)
+            if computed:
+                self._observe_cost(time.perf_counter() - started, shap_seconds,
+                                   computed * min(n_trees, explainer.n_trees), n_trees < explainer.n_trees)
+            with self._lock:
+                self.rows += len(rows)
+                self.reused += len(rows) - computed
+                self.approximated += int((used < explainer.n_trees).sum())
+        return results
+
+    def _observe_cost(self, group_seconds: float, shap_seconds: float, row_trees: int, approximated: bool):
+        with self._lock:
+            if row_trees >= self.MIN_COST_SAMPLE:
+                self.row_tree_seconds += self.COST_SMOOTHING * (shap_seconds / row_trees - self.row_tree_seconds)
+            if approximated:
+                fixed = max(group_seconds - row_trees * self.row_tree_seconds, 0.0)
+                self.model_seconds += self.COST_SMOOTHING * (fixed - self.model_seconds)
+
+    def _describe(self, phi: np.ndarray, x: np.ndarray, names: List[str], trees_used: int,
+                  n_trees: int) -> Dict[str, Any]:
+        """Largest contributions, in percentage points of predicted_change"""
+        contributions = phi[:-1] * 100
+        top = np.argsort(-np.abs(contributions))[:self.top_n].tolist()
+        values = x.tolist()
+        shown = contributions.tolist()
+        return {
+            'method': 'tree_shap',
+            'exact': trees_used >= n_trees,
+            'trees_used': trees_used,
+            'trees_total': n_trees,
+            'base_change': round(float(phi[-1]) * 100, 4),
+            'contributions': [
+                {
+                    'feature': names[i],
+                    'value': None if values[i] != values[i] else round(values[i], 6),     # NaN: missing
+                    'contribution': round(shown[i], 4),
+                }
+                for i in top
+            ],
+            'other_contribution': round(sum(shown) - sum(shown[i] for i in top), 4),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'explainers': len(self._explainers),
+                'calls': self.calls,
+                'rows': self.rows,
+                'reused_rows': self.reused,
+                'approximated_rows': self.approximated,
+                'model_overhead_us': round(self.model_seconds * 1e6, 1),
+                'row_tree_us': round(self.row_tree_seconds * 1e6, 3),
+                'budget_ms': self.budget_ms,
+            }
+
+
+# Global prediction explainer instance
+prediction_explainer = PredictionExplainer()
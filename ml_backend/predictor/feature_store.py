@@ -0,0 +1,263 @@
+"""
+Versioned on-disk feature store shared by training, inference and the screener
+Feature matrices are stored columnar as memory-mapped float64 and appended incrementally
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Callable, Optional, Tuple
+import logging
+
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+def feature_version(columns: List[str], *definitions) -> str:
+    """Hash of the column list and the source of every function/class that defines them"""
+    digest = hashlib.sha1(json.dumps(list(columns)).encode())
+    for definition in definitions:
+        digest.update(inspect.getsource(definition).encode())
+    return digest.hexdigest()[:12]
+
+
+class FeatureStore:
+    """
+    One directory per feature version, per symbol:
+      <symbol>.json          manifest: generation, n_rows, last date/close
+      <symbol>.<gen>.f64     row-major float64 matrix (n_rows x n_columns)
+      <symbol>.<gen>.dates   int64 nanosecond timestamps, one per row
+      <symbol>.lock          flock held by the process appending to this symbol
+
+    Only settled bars (all but the latest) are stored, so data files are
+    strictly append-only; readers map exactly the manifest's n_rows and never
+    see a partially written row. A rewritten history (e.g. dividend-adjusted
+    closes) goes to a new generation and the manifest is swapped atomically.
+    The latest, possibly still-forming bar is recomputed on every read from a
+    WARMUP-bar tail.
+    """
+
+    WARMUP = 250   # bars of context for tail recomputation (EWM error < 1e-8)
+    LOCK_TIMEOUT = 30.0
+    MEMO_MAX_ENTRIES = 256
+    TOUCH_INTERVAL = 3600.0
+
+    def __init__(self, root: str, columns: List[str], compute: Callable[[pd.DataFrame], pd.DataFrame],
+                 version: str, version_max_age: float = 7 * 86400):
+        self.columns = list(columns)
+        self.compute = compute
+        self.version = version
+        self.version_max_age = version_max_age
+        self.root = root
+        self.path = os.path.join(root, version)
+        self._touched_at = 0.0
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Assembled frames keyed by a bar fingerprint, so repeat reads of the same
+        # bars skip even the live-row recomputation
+        self._memo: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self.enabled = True
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            self._touch()
+            self._prune_old_versions()
+        except OSError as e:
+            logger.warning(f"Feature store disabled, cannot use {self.path}: {e}")
+            self.enabled = False
+
+    def _touch(self):
+        """Mark this version as in use (directory mtime), at most once per TOUCH_INTERVAL"""
+        now = time.time()
+        if now - self._touched_at < self.TOUCH_INTERVAL:
+            return
+        self._touched_at = now
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _prune_old_versions(self):
+        """
+        Remove other versions nobody has used for version_max_age. During a rolling
+        deploy the old workers keep touching theirs, so it is left alone.
+        """
+        if self.version_max_age <= 0:
+            return
+        cutoff = time.time() - self.version_max_age
+        for name in os.listdir(self.root):
+            old = os.path.join(self.root, name)
+            if name == self.version or not os.path.isdir(old):
+                continue
+            try:
+                if os.stat(old).st_mtime >= cutoff:
+                    continue
+                for f in os.listdir(old):
+                    os.remove(os.path.join(old, f))
+                os.rmdir(old)
+            except OSError:
+                continue   # pruned by another worker, or written to meanwhile
+            logger.info(f"Removed stale feature store version {name}")
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _file(self, symbol: str, suffix: str) -> str:
+        return os.path.join(self.path, f"{symbol.replace('/', '_')}.{suffix}")
+
+    @staticmethod
+    def _bar_ns(df: pd.DataFrame) -> np.ndarray:
+        dates = pd.to_datetime(df['date'])
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+        return dates.to_numpy().astype('datetime64[ns]').view('int64')
+
+    def read_manifest(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(symbol, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, symbol: str, manifest: Dict[str, Any]):
+        tmp = self._file(symbol, f'json.{uuid.uuid4().hex}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._file(symbol, 'json'))
+
+    def load(self, symbol: str) -> Optional[Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]:
+        """(dates int64[ns], memory-mapped matrix, manifest) for the stored settled rows"""
+        # Another process may replace the generation between the two reads; retry once
+        for _ in range(2):
+            manifest = self.read_manifest(symbol)
+            if not manifest or manifest['n_rows'] == 0:
+                return None
+            n, gen = manifest['n_rows'], manifest['generation']
+            try:
+                matrix = np.memmap(self._file(symbol, f'{gen}.f64'), dtype=np.float64, mode='r',
+                                   shape=(n, len(self.columns)))
+                dates = np.memmap(self._file(symbol, f'{gen}.dates'), dtype=np.int64, mode='r', shape=(n,))
+            except (OSError, ValueError):
+                continue
+            return dates, matrix, manifest
+        return None
+
+    def _write_rows(self, symbol: str, manifest: Optional[Dict[str, Any]], dates: np.ndarray,
+                    rows: np.ndarray, last_close: float, new_generation: bool):
+        if new_generation or manifest is None:
+            old_gen = manifest['generation'] if manifest else None
+            gen = uuid.uuid4().hex[:8]
+            n_rows = 0
+            first_date = int(dates[0])
+        else:
+            old_gen, gen, n_rows = None, manifest['generation'], manifest['n_rows']
+            first_date = manifest['first_date']
+
+        with open(self._file(symbol, f'{gen}.f64'), 'ab') as f:
+            f.truncate(n_rows * len(self.columns) * 8)   # drop any bytes a crashed writer left
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+        with open(self._file(symbol, f'{gen}.dates'), 'ab') as f:
+            f.truncate(n_rows * 8)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(dates, dtype=np.int64).tobytes())
+
+        self._write_manifest(symbol, {
+            'version': self.version,
+            'columns': self.columns,
+            'generation': gen,
+            'n_rows': n_rows + len(rows),
+            'first_date': first_date,
+            'last_date': int(dates[-1]),
+            'last_close': last_close,
+        })
+        if old_gen:
+            for suffix in ('f64', 'dates'):
+                try:
+                    os.remove(self._file(symbol, f'{old_gen}.{suffix}'))
+                except OSError:
+                    pass
+
+    def _sync(self, symbol: str, settled: pd.DataFrame, settled_ns: np.ndarray):
+        """Bring the stored rows up to date with the settled bars"""
+        manifest = self.read_manifest(symbol)
+        closes = settled['close'].to_numpy(dtype=float)
+
+        pos = None
+        # Reuse stored rows only if they cover the start of these bars
+        if manifest and manifest['n_rows'] > 0 and manifest['first_date'] <= settled_ns[0]:
+            idx = np.searchsorted(settled_ns, manifest['last_date'])
+            if idx < len(settled_ns) and settled_ns[idx] == manifest['last_date'] \
+                    and np.isclose(closes[idx], manifest['last_close']):
+                pos = int(idx)
+
+        if pos is None:
+            # First sight of this symbol or diverged history: rebuild a new generation
+            features = self.compute(settled)
+            self._write_rows(symbol, manifest, settled_ns, features[self.columns].to_numpy(dtype=float),
+                             float(closes[-1]), new_generation=True)
+            return
+
+        n_new = len(settled) - pos - 1
+        if n_new <= 0:
+            return
+        tail = settled.iloc[max(0, pos + 1 - self.WARMUP):]
+        features = self.compute(tail).iloc[-n_new:]
+        self._write_rows(symbol, manifest, settled_ns[-n_new:], features[self.columns].to_numpy(dtype=float),
+                         float(closes[-1]), new_generation=False)
+
+    def features(self, symbol: str, bars: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feature frame aligned row-for-row with `bars`: the raw bar columns plus
+        self.columns. Stored rows are reused; only new bars are computed.
+        The returned frame may be shared between callers; treat it as read-only.
+        """
+        if not self.enabled or len(bars) < 2:
+            return self.compute(bars)
+
+        bars = bars.reset_index(drop=True)
+        bars_ns = self._bar_ns(bars)
+        fingerprint = (symbol, len(bars), int(bars_ns[0]), int(bars_ns[-1]), float(bars['close'].iloc[-1]))
+        memo = self._memo.get(fingerprint)
+        if memo is not None:
+            return memo
+
+        self._touch()
+        with self._lock(symbol):
+            try:
+                with FileLock(self._file(symbol, 'lock'), timeout=self.LOCK_TIMEOUT) as lock:
+                    if lock.acquired:
+                        self._sync(symbol, bars.iloc[:-1], bars_ns[:-1])
+                stored = self.load(symbol)
+            except OSError as e:
+                logger.warning(f"Feature store write failed for {symbol}: {e}")
+                return self.compute(bars)
+
+        if stored is None:
+            return self.compute(bars)
+        dates, matrix, _ = stored
+
+        # Align stored rows to the settled bars (the store may start earlier)
+        start = np.searchsorted(dates, bars_ns[0])
+        if len(dates) - start != len(bars) - 1 or not np.array_equal(dates[start:], bars_ns[:-1]):
+            return self.compute(bars)
+
+        live = self.compute(bars.iloc[-self.WARMUP:]).iloc[-1:]
+        values = np.vstack((matrix[start:], live[self.columns].to_numpy(dtype=float)))
+        out = pd.concat([bars, pd.DataFrame(values, columns=self.columns, index=bars.index)], axis=1)
+
+        self._memo[fingerprint] = out
+        while len(self._memo) > self.MEMO_MAX_ENTRIES:
+            self._memo.popitem(last=False)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        symbols = [f[:-5] for f in os.listdir(self.path) if f.endswith('.json')] if self.enabled else []
+        return {'enabled': self.enabled, 'version': self.version, 'path': self.path, 'symbols': len(symbols)}
@@ -0,0 +1,268 @@
+"""
+Fundamentals provider
+Company `.info` is fetched at most once per symbol per day into an on-disk cache
+shared by every worker, /agent/profile and the agents' context. A background
+loop refreshes tracked symbols in bulk before their entries expire.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional
+import logging
+
+from utils.circuit_breaker import get_breaker
+from utils.file_lock import FileLock
+from utils.rate_limiter import Priority, market_data_scheduler
+
+from .providers import market_data
+
+logger = logging.getLogger(__name__)
+
+
+class YFinanceInfoSource:
+    """`.info` lookups from the market data provider, through the yfinance breaker and outbound scheduler"""
+
+    @property
+    def name(self) -> str:
+        return 'yfinance' if market_data.mode in ('live', 'record') else market_data.mode
+
+    def fetch(self, symbol: str, priority: Priority = Priority.STANDARD) -> Dict[str, Any]:
+        if not market_data.available:
+            raise RuntimeError("yfinance not installed")
+        return market_data_scheduler.submit(
+            ('info', symbol), market_data.info, symbol,
+            priority=priority, breaker=get_breaker('yfinance'),
+        )
+
+
+class FixtureInfoSource:
+    """`.info` dicts from a JSON file ({"AAPL": {...}, ...}) for tests and offline runs"""
+
+    name = 'fixture'
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            self.data = {k.upper(): v for k, v in json.load(f).items()}
+
+    def fetch(self, symbol: str, priority: Priority = Priority.STANDARD) -> Dict[str, Any]:
+        if symbol not in self.data:
+            raise KeyError(f"No fixture fundamentals for {symbol}")
+        return dict(self.data[symbol])
+
+
+class FundamentalsProvider:
+    """
+    One JSON file per symbol: {"fetched_at": ..., "source": ..., "info": {...}}.
+    Reads go memory -> disk -> source. An entry older than TTL is still served
+    while a refresh is queued; only a symbol never seen before costs a fetch.
+    """
+
+    TTL = float(os.getenv('FUNDAMENTALS_TTL_SECONDS', '86400'))
+    REFRESH_INTERVAL = float(os.getenv('FUNDAMENTALS_REFRESH_INTERVAL', '900'))
+    # Tracked entries are refreshed once they reach this fraction of TTL
+    REFRESH_AHEAD = 0.9
+    # Symbols not requested for this long drop out of the bulk refresh
+    TRACK_TTL = 7 * 86400
+    LOCK_TIMEOUT = 30.0
+    # A symbol whose first fetch failed is not retried on every request
+    FAILURE_BACKOFF = 300.0
+    CACHE_DIR = os.getenv(
+        'FUNDAMENTALS_CACHE_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'fundamentals'),
+    )
+
+    def __init__(self, cache_dir: Optional[str] = None, source=None):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fixture = os.getenv('FUNDAMENTALS_FIXTURE_PATH')
+        self.source = source or (FixtureInfoSource(fixture) if fixture else YFinanceInfoSource())
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._tracked: Dict[str, float] = {s.strip().upper(): float('inf') for s in
+                                           os.getenv('FUNDAMENTALS_SYMBOLS', '').split(',') if s.strip()}
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_now: Optional[asyncio.Event] = None
+        self.fetches = 0
+        self.failures = 0
+        self.hits = 0
+
+    def _file(self, symbol: str, ext: str = 'json') -> str:
+        return os.path.join(self.cache_dir, f"{symbol.replace('/', '_')}.{ext}")
+
+    def _read_disk(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(symbol)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, symbol: str, entry: Dict[str, Any]):
+        tmp = self._file(symbol, f'json.{uuid.uuid4().hex}.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(entry, f, default=str)
+            os.replace(tmp, self._file(symbol))
+        except OSError as e:
+            logger.warning(f"Could not persist fundamentals for {symbol}: {e}")
+
+    def _cached(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Newest entry from memory or another worker's write"""
+        entry = self._entries.get(symbol)
+        if entry is None or time.time() - entry['fetched_at'] > self.TTL:
+            disk = self._read_disk(symbol)
+            if disk is not None and (entry is None or disk['fetched_at'] > entry['fetched_at']):
+                entry = disk
+                with self._lock:
+                    self._entries[symbol] = entry
+        return entry
+
+    def _fetch(self, symbol: str, priority: Priority) -> Dict[str, Any]:
+        """Fetch from the source unless another worker did while we waited for the lock"""
+        with FileLock(self._file(symbol, 'lock'), timeout=self.LOCK_TIMEOUT):
+            entry = self._read_disk(symbol)
+            if entry is not None and time.time() - entry['fetched_at'] <= self.TTL * self.REFRESH_AHEAD:
+                with self._lock:
+                    self._entries[symbol] = entry
+                return entry
+            try:
+                info = self.source.fetch(symbol, priority)
+            except Exception:
+                self.failures += 1
+                self._failed[symbol] = time.time()
+                raise
+            self.fetches += 1
+            self._failed.pop(symbol, None)
+            entry = {'fetched_at': time.time(), 'source': self.source.name, 'info': info}
+            self._write_disk(symbol, entry)
+        with self._lock:
+            self._entries[symbol] = entry
+        return entry
+
+    def get_info(self, symbol: str, priority: Priority = Priority.STANDARD) -> Dict[str, Any]:
+        """Raw `.info` dict for a symbol; raises only if it was never fetched and the source fails"""
+        symbol = symbol.upper()
+        with self._lock:
+            self._tracked[symbol] = max(self._tracked.get(symbol, 0.0), time.time())
+        entry = self._cached(symbol)
+        if entry is None:
+            if time.time() - self._failed.get(symbol, 0.0) < self.FAILURE_BACKOFF:
+                raise LookupError(f"Fundamentals for {symbol} recently failed to load")
+            return self._fetch(symbol, priority)['info']
+        self.hits += 1
+        if time.time() - entry['fetched_at'] > self.TTL:
+            if self._refresh_now is not None:
+                # Stale: serve it and let the background loop refresh
+                self._loop.call_soon_threadsafe(self._refresh_now.set)
+            else:
+                try:
+                    entry = self._fetch(symbol, priority)
+                except Exception as e:
+                    logger.debug(f"Serving stale fundamentals for {symbol}: {e}")
+        return entry['info']
+
+    def get_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        """Agent-facing fundamentals; keys without data are omitted so agents fall back to neutral"""
+        try:
+            info = self.get_info(symbol)
+        except Exception as e:
+            logger.warning(f"Fundamentals unavailable for {symbol}: {e}")
+            return {}
+        return self.summarize(info)
+
+    @staticmethod
+    def summarize(info: Dict[str, Any]) -> Dict[str, Any]:
+        """`.info` -> the fields the fundamental agent reads (growth and margins in percent)"""
+        def pct(value):
+            return round(value * 100, 2) if isinstance(value, (int, float)) else None
+
+        market_cap = info.get('marketCap')
+        fundamentals = {
+            'pe_ratio': info.get('trailingPE') or info.get('forwardPE'),
+            'forward_pe': info.get('forwardPE'),
+            'earnings_growth': pct(info.get('earningsGrowth', info.get('earningsQuarterlyGrowth'))),
+            'revenue_growth': pct(info.get('revenueGrowth')),
+            'profit_margin': pct(info.get('profitMargins')),
+            'debt_to_equity': info.get('debtToEquity'),
+            'dividend_yield': info.get('dividendYield'),
+            'sector': info.get('sector'),
+        }
+        if isinstance(market_cap, (int, float)) and market_cap > 0:
+            fundamentals['market_cap'] = 'Large' if market_cap >= 10e9 else 'Mid' if market_cap >= 2e9 else 'Small'
+        return {k: v for k, v in fundamentals.items() if v is not None}
+
+    def refresh_many(self, symbols: List[str]) -> Dict[str, Any]:
+        """Bulk refresh at background priority; one failing symbol does not stop the rest"""
+        refreshed, failed = 0, []
+        for symbol in symbols:
+            try:
+                self._fetch(symbol, Priority.BACKGROUND)
+                refreshed += 1
+            except Exception as e:
+                logger.debug(f"Fundamentals refresh failed for {symbol}: {e}")
+                failed.append(symbol)
+        return {'refreshed': refreshed, 'failed': failed}
+
+    def _due_symbols(self) -> List[str]:
+        now = time.time()
+        due = []
+        with self._lock:
+            for symbol, seen in list(self._tracked.items()):
+                if now - seen > self.TRACK_TTL:
+                    del self._tracked[symbol]
+                    continue
+                entry = self._entries.get(symbol) or self._read_disk(symbol)
+                if entry is None or now - entry['fetched_at'] > self.TTL * self.REFRESH_AHEAD:
+                    due.append(symbol)
+        return due
+
+    def start(self):
+        """Start the bulk refresh loop from the running event loop (FastAPI lifespan)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._refresh_now = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name='fundamentals-refresh')
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._refresh_now = None
+
+    async def _run(self):
+        while True:
+            due = self._due_symbols()
+            if due:
+                result = await asyncio.to_thread(self.refresh_many, due)
+                logger.info(f"Refreshed fundamentals for {result['refreshed']}/{len(due)} symbols")
+            self._refresh_now.clear()
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), timeout=self.REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'source': self.source.name,
+            'cache_dir': self.cache_dir,
+            'entries': len(self._entries),
+            'tracked_symbols': len(self._tracked),
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'failures': self.failures,
+            'background_refresh': self._task is not None and not self._task.done(),
+        }
+
+
+# Global fundamentals provider instance
+fundamentals_provider = FundamentalsProvider()
@@ -0,0 +1,232 @@
+"""
+Intraday bar storage for the predictor
+Bars are kept per (symbol, interval) in fixed-capacity ring buffers bounded by a
+retention window, refreshed incrementally, and coarser intervals are resampled
+from the finest fresh buffer instead of being downloaded again.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAILY = '1d'
+DAY_NS = 86400 * 10**9
+
+# interval -> (seconds, download period for a cold buffer, incremental download period, retention days)
+# Download periods are yfinance's limits: 1m goes back 7 days, sub-hour intervals 60 days
+INTERVALS: Dict[str, Tuple[int, str, str, float]] = {
+    '1m': (60, '7d', '1d', 7),
+    '2m': (120, '60d', '1d', 30),
+    '5m': (300, '60d', '5d', 60),
+    '15m': (900, '60d', '5d', 60),
+    '30m': (1800, '60d', '5d', 60),
+    '1h': (3600, '730d', '1mo', 365),
+}
+_ALIASES = {'60m': '1h', '1wk': None, '1mo': None}
+_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+_PERIOD_UNITS = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}
+
+
+def normalize_interval(interval: Optional[str]) -> str:
+    """Canonical interval name; raises ValueError for intervals we do not serve"""
+    requested = interval
+    interval = (interval or DAILY).lower()
+    interval = _ALIASES.get(interval, interval)
+    if interval != DAILY and interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval '{requested}'. Use 1d or one of: {', '.join(INTERVALS)}")
+    return interval
+
+
+def interval_seconds(interval: str) -> int:
+    return 86400 if interval == DAILY else INTERVALS[interval][0]
+
+
+def period_days(period: str) -> float:
+    """'5d' / '1mo' / '2y' -> days ('max' and unknown units -> inf)"""
+    for unit, days in _PERIOD_UNITS.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return int(period[:-len(unit)]) * days
+    return float('inf')
+
+
+def download_period(interval: str, last_ns: Optional[int]) -> str:
+    """
+    Period to download so the bars join a buffer ending at last_ns: the incremental
+    period if it spans the gap, a day count if that is shorter than the cold-buffer
+    period, else the cold-buffer period
+    """
+    _, full_period, incremental_period, _ = INTERVALS[interval]
+    if last_ns is None:
+        return full_period
+    # yfinance counts intraday periods in days back from today, today included
+    days = (time.time_ns() // DAY_NS) - (last_ns // DAY_NS) + 1
+    if days <= period_days(incremental_period):
+        return incremental_period
+    if days < period_days(full_period):
+        return f"{days}d"
+    return full_period
+
+
+def resample_bars(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """OHLCV bars -> `interval` bars on clock-aligned bins; bins without trades are dropped"""
+    indexed = df.set_index('date')
+    out = indexed[list(_OHLCV)].resample(f'{interval_seconds(interval)}s', label='left', closed='left').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    )
+    return out.dropna(subset=['close']).reset_index()
+
+
+class BarRingBuffer:
+    """
+    Fixed-capacity OHLCV store: int64 nanosecond timestamps plus one float64 row per bar.
+    Appending past capacity overwrites the oldest bar, so memory is bounded by the
+    retention window however long the process runs.
+    """
+
+    def __init__(self, capacity: int, tz=None):
+        self.capacity = capacity
+        self.tz = tz
+        self._dates = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((capacity, len(_OHLCV)), dtype=np.float64)
+        self._start = 0
+        self.size = 0
+        self.updated_at = 0.0       # monotonic time of the last download merged in
+
+    def _ordered(self) -> np.ndarray:
+        return (self._start + np.arange(self.size)) % self.capacity
+
+    @property
+    def last_ns(self) -> Optional[int]:
+        return int(self._dates[(self._start + self.size - 1) % self.capacity]) if self.size else None
+
+    @property
+    def first_ns(self) -> Optional[int]:
+        return int(self._dates[self._start]) if self.size else None
+
+    def append(self, df: pd.DataFrame):
+        """Merge downloaded bars: the still-forming last bar is overwritten, newer bars appended"""
+        if df.empty:
+            return
+        dates = pd.DatetimeIndex(df['date'])
+        if self.tz is None:
+            self.tz = dates.tz
+        ns = dates.as_unit('ns').asi8
+        values = df[list(_OHLCV)].to_numpy(dtype=np.float64)
+        last = self.last_ns
+        if last is not None:
+            # Re-downloaded bars at or after our last one replace it (it may have been partial)
+            keep = ns >= last
+            ns, values = ns[keep], values[keep]
+            if len(ns) and ns[0] == last:
+                self._values[(self._start + self.size - 1) % self.capacity] = values[0]
+                ns, values = ns[1:], values[1:]
+        if len(ns) > self.capacity:
+            ns, values = ns[-self.capacity:], values[-self.capacity:]
+        for i in range(len(ns)):
+            slot = (self._start + self.size) % self.capacity
+            self._dates[slot] = ns[i]
+            self._values[slot] = values[i]
+            if self.size < self.capacity:
+                self.size += 1
+            else:
+                self._start = (self._start + 1) % self.capacity
+        self.updated_at = time.monotonic()
+
+    def frame(self, since_ns: Optional[int] = None) -> pd.DataFrame:
+        """Bars in time order (optionally only those at or after since_ns) as a new DataFrame"""
+        order = self._ordered()
+        dates = self._dates[order]
+        if since_ns is not None:
+            order = order[np.searchsorted(dates, since_ns):]
+            dates = self._dates[order]
+        df = pd.DataFrame(self._values[order], columns=list(_OHLCV))
+        df.insert(0, 'date', pd.to_datetime(dates, utc=True).tz_convert(self.tz) if self.tz
+                  else pd.to_datetime(dates))
+        return df
+
+    def nbytes(self) -> int:
+        return self._dates.nbytes + self._values.nbytes
+
+
+class IntradayBarCache:
+    """Ring buffers per (symbol, interval), LRU-bounded by symbol-interval pairs"""
+
+    MAX_BUFFERS = int(os.getenv('INTRADAY_MAX_BUFFERS', '256'))
+
+    def __init__(self):
+        self._buffers: "OrderedDict[Tuple[str, str], BarRingBuffer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.resampled = 0
+
+    @staticmethod
+    def capacity(interval: str) -> int:
+        seconds, _, _, retention_days = INTERVALS[interval]
+        return int(retention_days * 86400 / seconds)
+
+    def buffer(self, symbol: str, interval: str, create: bool = False) -> Optional[BarRingBuffer]:
+        key = (symbol, interval)
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is None and create:
+                buf = self._buffers[key] = BarRingBuffer(self.capacity(interval))
+                while len(self._buffers) > self.MAX_BUFFERS:
+                    self._buffers.popitem(last=False)
+            if buf is not None:
+                self._buffers.move_to_end(key)
+            return buf
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame):
+        buf = self.buffer(symbol, interval, create=True)
+        with self._lock:
+            buf.append(df)
+
+    def get(self, symbol: str, interval: str, window_days: float, max_age: Optional[float] = None,
+            resample: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Bars for the last window_days at `interval`: the most recent of its own buffer
+        and the finer buffers whose interval divides it and whose data covers the window
+        (resampled); on a tie the own buffer, then the finest, wins. max_age=None accepts
+        buffers of any age (last-good data); resample=False reads only the own buffer.
+        """
+        target = interval_seconds(interval)
+        now_ns = time.time_ns()
+        since_ns = now_ns - int(min(window_days, INTERVALS[interval][3]) * 86400e9)
+        sources = [interval] if not resample else [i for i in INTERVALS if target % INTERVALS[i][0] == 0]
+        best = None
+        for source in sources:
+            buf = self.buffer(symbol, source)
+            if buf is None or not buf.size:
+                continue
+            if max_age is not None and time.monotonic() - buf.updated_at > max_age:
+                continue
+            # A finer buffer is only a substitute if it reaches back far enough
+            if source != interval and buf.first_ns > since_ns + INTERVALS[source][0] * 1e9 * 2:
+                continue
+            rank = (buf.last_ns, source == interval, -INTERVALS[source][0])
+            if best is None or rank > best[0]:
+                best = (rank, source, buf)
+        if best is None:
+            return None
+        _, source, buf = best
+        with self._lock:
+            bars = buf.frame(since_ns)
+        if source == interval:
+            return bars
+        self.resampled += 1
+        return resample_bars(bars, interval)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffers = list(self._buffers.items())
+        return {
+            'buffers': len(buffers),
+            'bars': sum(b.size for _, b in buffers),
+            'memory_mb': round(sum(b.nbytes() for _, b in buffers) / 1e6, 2),
+            'resampled_reads': self.resampled,
+        }
@@ -0,0 +1,170 @@
+"""
+Compiled keyword sentiment scorer
+Lexicon inflections, multi-word phrases and negation are resolved once per
+distinct token, so scoring a headline is one regex pass plus dict lookups
+"""
+import re
+from typing import Dict, Any, List, Iterable, Optional
+
+NEUTRAL, POSITIVE, NEGATIVE, NEGATOR = 0, 1, -1, 2
+
+NEGATORS = {'not', 'no', 'never', 'without', 'hardly', 'barely', 'nor', 'neither', 'cannot', 'lacks', 'lack'}
+
+# Irregular forms the suffix rules cannot reach
+IRREGULAR = {
+    'fell': 'fall', 'fallen': 'fall', 'rose': 'rise', 'risen': 'rise', 'sank': 'sink', 'sunk': 'sink',
+    'slid': 'slide', 'beaten': 'beat', 'better': 'best', 'worse': 'worst', 'lost': 'loss',
+    'losses': 'loss', 'lose': 'loss', 'loses': 'loss', 'losing': 'loss', 'failure': 'fail',
+    'gainers': 'gain', 'losers': 'loss',
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def stem_candidates(word: str) -> List[str]:
+    """Possible base forms of an inflected word, most likely first (rallies -> rally, surged -> surge)"""
+    candidates = [word]
+    if word in IRREGULAR:
+        candidates.append(IRREGULAR[word])
+    for suffix in ('ies', 'ied'):
+        if word.endswith(suffix) and len(word) > 4:
+            candidates.append(word[:-3] + 'y')
+    for suffix in ('ing', 'ed', 'est', 'er', 'es', 's', 'ly'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            base = word[:-len(suffix)]
+            candidates.append(base)
+            if suffix in ('ing', 'ed', 'est', 'er', 'es'):
+                candidates.append(base + 'e')             # surged -> surge, rising -> rise
+            if len(base) > 3 and base[-1] == base[-2]:
+                candidates.append(base[:-1])              # dropped -> drop
+    return candidates
+
+
+class KeywordScorer:
+    """Lexicon scorer with stemming, phrases and negation; output schema of analyze_text"""
+
+    NEGATION_SCOPE = 3          # tokens after a negator whose polarity is flipped
+    MAX_TOKEN_CACHE = 200_000
+
+    def __init__(self, positive: Iterable[str], negative: Iterable[str],
+                 positive_phrases: Iterable[str] = (), negative_phrases: Iterable[str] = ()):
+        self._base = {w: POSITIVE for w in positive}
+        self._base.update({w: NEGATIVE for w in negative})
+        self._base.update({w: NEGATOR for w in NEGATORS})
+        # Phrases are rewritten to a marker token before tokenizing, so they take
+        # part in negation like single words and their own words are not recounted
+        self._base['xposphrasex'] = POSITIVE
+        self._base['xnegphrasex'] = NEGATIVE
+        self._phrase_re = self._compile_phrases(positive_phrases, negative_phrases)
+        # Surface token -> polarity, filled lazily; most headlines reuse a small vocabulary
+        self._tokens: Dict[str, int] = dict(self._base)
+
+    @staticmethod
+    def _inflections(word: str) -> List[str]:
+        forms = {word, word + 's', word + 'es', word + 'ed', word + 'ing', word + 'd'}
+        if word.endswith('e'):
+            forms |= {word[:-1] + 'ing', word + 'd'}
+        if word.endswith('y'):
+            forms |= {word[:-1] + 'ies', word[:-1] + 'ied'}
+        forms |= {k for k, v in IRREGULAR.items() if v == word}
+        return sorted(forms, key=len, reverse=True)
+
+    def _compile_phrases(self, positive: Iterable[str], negative: Iterable[str]) -> Optional[re.Pattern]:
+        positive, negative = list(positive), list(negative)
+        if not positive and not negative:
+            return None
+
+        def alternation(phrases):
+            return '|'.join(
+                r'[\s-]+'.join('(?:' + '|'.join(map(re.escape, self._inflections(w))) + ')' for w in p.lower().split())
+                for p in phrases
+            )
+        groups = []
+        if positive:
+            groups.append(f'(?P<pos>{alternation(positive)})')
+        if negative:
+            groups.append(f'(?P<neg>{alternation(negative)})')
+        # Cheap first-character lookahead lets the engine skip most positions
+        heads = sorted({form[0] for p in positive + negative for form in self._inflections(p.lower().split()[0])})
+        return re.compile(f"(?=[{re.escape(''.join(heads))}])" + r'\b(?:' + '|'.join(groups) + r')\b')
+
+    def _resolve(self, token: str) -> int:
+        """Polarity of an unseen surface token, cached"""
+        if token.endswith("n't"):
+            polarity = NEGATOR
+        else:
+            polarity = next((self._base[c] for c in stem_candidates(token) if c in self._base), NEUTRAL)
+        if len(self._tokens) < self.MAX_TOKEN_CACHE:
+            self._tokens[token] = polarity
+        return polarity
+
+    @staticmethod
+    def _phrase_marker(match) -> str:
+        return ' xposphrasex ' if match.lastgroup == 'pos' else ' xnegphrasex '
+
+    def _prepare(self, text: str) -> str:
+        text = text.lower()
+        if self._phrase_re is not None:
+            text = self._phrase_re.sub(self._phrase_marker, text)
+        return text
+
+    def counts(self, text: str):
+        """(positive hits, negative hits) after phrase matching and negation"""
+        return self._count_prepared(self._prepare(text))
+
+    def _count_prepared(self, text: str):
+        tokens = self._tokens
+        positive = negative = 0
+        negate_until = -1
+        for i, token in enumerate(_TOKEN_RE.findall(text)):
+            polarity = tokens.get(token)
+            if polarity is None:
+                polarity = self._resolve(token)
+            if polarity == NEUTRAL:
+                continue
+            if polarity == NEGATOR:
+                negate_until = i + self.NEGATION_SCOPE
+                continue
+            if i <= negate_until:
+                polarity = -polarity
+                negate_until = -1       # a negator flips one sentiment term
+            if polarity > 0:
+                positive += 1
+            else:
+                negative += 1
+        return positive, negative
+
+    def score(self, text: str) -> Dict[str, Any]:
+        if not text:
+            return {'score': 0, 'label': 'NEUTRAL', 'confidence': 0.5}
+        return self._result(*self.counts(text))
+
+    @staticmethod
+    def _result(positive_count: int, negative_count: int) -> Dict[str, Any]:
+        total_sentiment_words = positive_count + negative_count
+        if total_sentiment_words == 0:
+            return {'score': 0, 'label': 'NEUTRAL', 'confidence': 0.5}
+
+        # Score from -1 (very negative) to +1 (very positive)
+        score = (positive_count - negative_count) / total_sentiment_words
+        confidence = min(0.5 + (total_sentiment_words * 0.1), 0.95)
+
+        if score > 0.2:
+            label = 'POSITIVE'
+        elif score < -0.2:
+            label = 'NEGATIVE'
+        else:
+            label = 'NEUTRAL'
+
+        return {
+            'score': round(score, 3),
+            'label': label,
+            'confidence': round(confidence, 3),
+            'positive_words': positive_count,
+            'negative_words': negative_count
+        }
+
+    def score_batch(self, texts: Iterable[str]) -> List[Dict[str, Any]]:
+        """Score many texts (method lookups hoisted out of the loop)"""
+        prepare, count, result = self._prepare, self._count_prepared, self._result
+        return [result(*count(prepare(t))) if t else result(0, 0) for t in texts]
@@ -0,0 +1,281 @@
+"""
+Macro snapshot provider
+Market regime and VIX come from benchmark bars; policy rate and inflation
+come from a local snapshot store, optionally refreshed from a remote source.
+The snapshot is computed once per day and shared by every ticker's context.
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import logging
+
+from utils.circuit_breaker import get_breaker
+from utils.rate_limiter import Priority, market_data_scheduler
+from .intraday import DAILY
+from .providers import market_data
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MacroSnapshotStore:
+    """
+    Dated observations per series, e.g. {"interest_rate": [["2025-08-01", 4.33], ...]}.
+    The bundled seed file (JSON, or CSV with date,series,value rows) is read-only;
+    remote refreshes are written to an overlay file that takes precedence.
+    """
+
+    def __init__(self, seed_path: str, overlay_path: str):
+        self.seed_path = seed_path
+        self.overlay_path = overlay_path
+        self._lock = threading.Lock()
+        self.series: Dict[str, List[Tuple[str, float]]] = {}
+        self.load()
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, List[Tuple[str, float]]]:
+        if not os.path.exists(path):
+            return {}
+        if path.endswith('.csv'):
+            series: Dict[str, List[Tuple[str, float]]] = {}
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    series.setdefault(row['series'], []).append((row['date'], float(row['value'])))
+            return series
+        with open(path) as f:
+            raw = json.load(f)['series']
+        return {name: [(d, float(v)) for d, v in obs] for name, obs in raw.items()}
+
+    def load(self):
+        merged: Dict[str, Dict[str, float]] = {}
+        for path in (self.seed_path, self.overlay_path):
+            try:
+                for name, observations in self._read(path).items():
+                    merged.setdefault(name, {}).update(dict(observations))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not read macro snapshot {path}: {e}")
+        with self._lock:
+            self.series = {name: sorted(obs.items()) for name, obs in merged.items()}
+
+    def latest(self, name: str) -> Optional[Tuple[str, float]]:
+        """(date, value) of the most recent observation, or None"""
+        observations = self.series.get(name)
+        return observations[-1] if observations else None
+
+    def update(self, series: Dict[str, List[Tuple[str, float]]]):
+        """Merge remote observations into the overlay file and reload"""
+        overlay = self._read(self.overlay_path) if os.path.exists(self.overlay_path) else {}
+        for name, observations in series.items():
+            overlay[name] = sorted({**dict(overlay.get(name, [])), **dict(observations)}.items())
+        os.makedirs(os.path.dirname(self.overlay_path) or '.', exist_ok=True)
+        tmp = f"{self.overlay_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'updated_at': datetime.now(timezone.utc).isoformat(), 'series': overlay}, f)
+        os.replace(tmp, self.overlay_path)
+        self.load()
+
+
+class FredSource:
+    """FRED observations: effective fed funds rate and CPI year-over-year change"""
+
+    name = 'fred'
+    URL = 'https://api.stlouisfed.org/fred/series/observations'
+    SERIES = {
+        'interest_rate': ('FEDFUNDS', 'lin'),
+        'inflation': ('CPIAUCSL', 'pc1'),     # percent change from a year ago
+    }
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def fetch(self) -> Dict[str, List[Tuple[str, float]]]:
+        if httpx is None:
+            raise RuntimeError("httpx not installed")
+        start = (datetime.now(timezone.utc) - timedelta(days=400)).strftime('%Y-%m-%d')
+        series = {}
+        for name, (series_id, units) in self.SERIES.items():
+            response = httpx.get(self.URL, timeout=10, params={
+                'series_id': series_id, 'units': units, 'api_key': self.api_key,
+                'file_type': 'json', 'observation_start': start,
+            })
+            response.raise_for_status()
+            series[name] = [(o['date'], round(float(o['value']), 2))
+                            for o in response.json()['observations'] if o['value'] not in ('.', '')]
+        return series
+
+
+# Remote sources selectable with MACRO_REMOTE_SOURCE
+REMOTE_SOURCES = {
+    'fred': lambda: FredSource(os.environ['FRED_API_KEY']),
+}
+
+
+class MacroProvider:
+    """
+    Regime rules on the benchmark (SPY) closes:
+      bullish  close > SMA200, SMA50 > SMA200 and realized vol below HIGH_VOL
+      bearish  close < SMA200 and SMA50 < SMA200, or realized vol above CRISIS_VOL
+      neutral  otherwise
+    """
+
+    BENCHMARK = os.getenv('MACRO_BENCHMARK', 'SPY')
+    VIX_SYMBOL = '^VIX'
+    HIGH_VOL = 25.0       # annualized %, 20-day realized
+    CRISIS_VOL = 35.0
+    SEED_PATH = os.getenv('MACRO_SNAPSHOT_PATH', os.path.join(_BASE_DIR, 'data', 'macro_snapshot.json'))
+    OVERLAY_PATH = os.path.join(_BASE_DIR, '.cache', 'macro_remote.json')
+    # Values used when the snapshot store has no observation for a series
+    DEFAULTS = {'interest_rate': 4.5, 'inflation': 3.2}
+    RETRY_SECONDS = 900
+
+    def __init__(self, remote=None):
+        self.store = MacroSnapshotStore(self.SEED_PATH, self.OVERLAY_PATH)
+        source_name = os.getenv('MACRO_REMOTE_SOURCE', 'fred' if os.getenv('FRED_API_KEY') else '')
+        if remote is None and source_name:
+            try:
+                remote = REMOTE_SOURCES[source_name]()
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Macro remote source '{source_name}' unavailable: {e}")
+        self.remote = remote
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self.computations = 0
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _next_midnight() -> float:
+        now = datetime.now(timezone.utc)
+        return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Today's macro snapshot; computed by the first caller of the day, shared by the rest"""
+        if self._snapshot is not None and time.time() < self._expires:
+            return self._snapshot
+        # Yesterday's snapshot is served while one caller recomputes
+        if not self._lock.acquire(blocking=self._snapshot is None):
+            return self._snapshot
+        try:
+            if self._snapshot is None or time.time() >= self._expires:
+                self._snapshot = self._compute()
+                self.computations += 1
+                # Without benchmark bars the regime is a placeholder: retry soon instead of tomorrow
+                degraded = self._snapshot['realized_volatility'] is None
+                self._expires = time.time() + self.RETRY_SECONDS if degraded else self._next_midnight()
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def context(self) -> Dict[str, Any]:
+        """The macro block of the agent context"""
+        snap = self.snapshot()
+        return {k: snap[k] for k in ('interest_rate', 'inflation', 'market_regime', 'vix', 'benchmark_trend',
+                                     'realized_volatility', 'interest_rate_date', 'inflation_date', 'as_of')}
+
+    def _refresh_remote(self):
+        if self.remote is None:
+            return
+        try:
+            self.store.update(get_breaker(f"macro_{self.remote.name}").call(self.remote.fetch))
+        except Exception as e:
+            logger.warning(f"Macro remote refresh failed, using snapshot store: {e}")
+
+    def _compute(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self._refresh_remote()
+        regime = self._regime()
+        snap = {**regime, 'vix': self._vix(regime.get('realized_volatility')), 'as_of': self._today()}
+        for name, default in self.DEFAULTS.items():
+            latest = self.store.latest(name)
+            snap[name] = latest[1] if latest else default
+            snap[f'{name}_date'] = latest[0] if latest else None
+        snap['compute_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Macro snapshot for {snap['as_of']}: regime={snap['market_regime']}, vix={snap['vix']}")
+        return snap
+
+    def _bars(self, symbol: str, period: str):
+        """
+        Bars straight from the provider, through the yfinance breaker and scheduler. Raises on
+        a failed or empty download: the predictor's mock fallback would make up a regime and
+        a VIX level that then stay cached all day.
+        """
+        from . import price_predictor
+        if not market_data.available:
+            raise RuntimeError("yfinance not installed")
+        df = market_data_scheduler.submit(
+            ('history', symbol, period), market_data.history, symbol, period, DAILY,
+            price_predictor.predictor.YFINANCE_TIMEOUT, priority=Priority.BACKGROUND,
+            breaker=get_breaker('yfinance'),
+        )
+        df = df.reset_index()
+        df.columns = [c.lower() for c in df.columns]
+        return df
+
+    def _regime(self) -> Dict[str, Any]:
+        try:
+            df = self._bars(self.BENCHMARK, '1y')
+            close = df['close'].to_numpy(dtype=float)
+        except Exception as e:
+            logger.warning(f"Benchmark bars unavailable for macro regime: {e}")
+            return {'market_regime': 'neutral', 'benchmark_trend': None, 'realized_volatility': None}
+        if len(close) < 200:
+            return {'market_regime': 'neutral', 'benchmark_trend': None, 'realized_volatility': None}
+
+        sma50, sma200 = close[-50:].mean(), close[-200:].mean()
+        returns = np.diff(np.log(close[-21:]))
+        vol = float(returns.std(ddof=1) * np.sqrt(252) * 100)
+        above = close[-1] > sma200 and sma50 > sma200
+        below = close[-1] < sma200 and sma50 < sma200
+        if vol > self.CRISIS_VOL or below:
+            regime = 'bearish'
+        elif above and vol < self.HIGH_VOL:
+            regime = 'bullish'
+        else:
+            regime = 'neutral'
+        return {
+            'market_regime': regime,
+            'benchmark_trend': {
+                'symbol': self.BENCHMARK,
+                'close': round(float(close[-1]), 2),
+                'sma_50': round(float(sma50), 2),
+                'sma_200': round(float(sma200), 2),
+                'pct_above_sma_200': round(float((close[-1] / sma200 - 1) * 100), 2),
+            },
+            'realized_volatility': round(vol, 2),
+        }
+
+    def _vix(self, realized_vol: Optional[float]) -> Optional[float]:
+        """Last VIX close; realized benchmark vol stands in when VIX bars are unavailable"""
+        try:
+            df = self._bars(self.VIX_SYMBOL, '1mo')
+            return round(float(df['close'].iloc[-1]), 2)
+        except Exception as e:
+            logger.warning(f"VIX unavailable, using realized volatility: {e}")
+            return realized_vol
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'as_of': self._snapshot['as_of'] if self._snapshot else None,
+            'computations': self.computations,
+            'remote': self.remote.name if self.remote else None,
+            'series': {name: self.store.latest(name) for name in self.store.series},
+        }
+
+
+# Global macro provider instance
+macro_provider = MacroProvider()
@@ -0,0 +1,235 @@
+"""
+Background news ingestion
+Polls every RSS feed for the active symbol set from the event loop, scores new
+headlines as they arrive and writes them to the article store, so request
+handlers only read local data. Each (symbol, feed) pair has its own poll
+interval that adapts to how often the feed actually changes.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from utils.circuit_breaker import CircuitOpenError
+from . import sentiment
+from .providers import market_data
+
+logger = logging.getLogger(__name__)
+
+
+class FeedState:
+    """Conditional-GET validators and adaptive schedule for one (symbol, feed) pair"""
+
+    __slots__ = ('interval', 'next_due', 'etag', 'modified', 'polls', 'changes',
+                 'not_modified', 'last_success', 'last_change', 'last_error')
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_due = 0.0             # monotonic; 0 = poll now
+        self.etag: Optional[str] = None
+        self.modified: Optional[str] = None
+        self.polls = 0
+        self.changes = 0
+        self.not_modified = 0
+        self.last_success = 0.0         # wall clock
+        self.last_change = 0.0
+        self.last_error: Optional[str] = None
+
+
+class NewsIngestor:
+    """
+    Active symbols are the ones requested within ACTIVE_SYMBOL_TTL (plus NEWS_SYMBOLS).
+    After a poll that brought new articles the interval halves; after an unchanged
+    poll it grows by 1.5x, clamped to [MIN_INTERVAL, MAX_INTERVAL]. Failures back
+    off like unchanged polls. Jitter keeps symbols from polling in lockstep.
+    """
+
+    ENABLED = os.getenv('NEWS_INGEST_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    MIN_INTERVAL = float(os.getenv('NEWS_POLL_MIN_SECONDS', '60'))
+    MAX_INTERVAL = float(os.getenv('NEWS_POLL_MAX_SECONDS', '1800'))
+    INITIAL_INTERVAL = float(os.getenv('NEWS_POLL_INITIAL_SECONDS', '300'))
+    ACTIVE_SYMBOL_TTL = float(os.getenv('NEWS_ACTIVE_SYMBOL_TTL', '3600'))
+    CONCURRENCY = int(os.getenv('NEWS_INGEST_CONCURRENCY', '4'))
+    MAX_ITEMS = 20
+    # How long a request for a never-polled symbol waits for its first poll
+    COLD_WAIT = 5.0
+    JITTER = 0.1
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self._feeds: Dict[Tuple[str, str], FeedState] = {}
+        self._active: Dict[str, float] = {}                 # symbol -> last request (monotonic)
+        self._pinned = {s.strip().upper() for s in os.getenv('NEWS_SYMBOLS', '').split(',') if s.strip()}
+        self._first_poll: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.articles_ingested = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start polling from the running event loop (FastAPI lifespan)"""
+        if not self.ENABLED or self.running:
+            return
+        if not market_data.feeds_available:
+            logger.warning("feedparser not installed, news ingestor not started")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._pinned = {self.analyzer.news_symbol(s) for s in self._pinned}
+        for symbol in self._pinned:
+            self.touch(symbol)
+        self._task = asyncio.create_task(self._run(), name='news-ingestor')
+        self.analyzer.ingestor = self
+        logger.info(f"News ingestor started ({len(self._pinned)} pinned symbols)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.analyzer.ingestor = None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def touch(self, symbol: str):
+        """Mark a symbol as requested; a symbol seen for the first time is polled immediately"""
+        now = time.monotonic()
+        with self._lock:
+            new = symbol not in self._active
+            self._active[symbol] = now
+            if new:
+                self._first_poll.setdefault(symbol, threading.Event())
+                for source in self.analyzer.NEWS_FEEDS:
+                    state = self._feeds.setdefault((symbol, source), FeedState(self.INITIAL_INTERVAL))
+                    state.next_due = 0.0
+        if new and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def wait_first_poll(self, symbol: str, timeout: Optional[float] = None) -> bool:
+        """Block (worker thread) until the symbol's feeds have been polled once"""
+        with self._lock:
+            event = self._first_poll.get(symbol)
+        return event is None or event.wait(self.COLD_WAIT if timeout is None else timeout)
+
+    def freshness_lag(self, symbol: str) -> Optional[float]:
+        """Seconds since the most recent successful poll of any of the symbol's feeds"""
+        with self._lock:
+            last = max((s.last_success for (sym, _), s in self._feeds.items() if sym == symbol), default=0.0)
+        return round(time.time() - last, 1) if last else None
+
+    def _due(self) -> Tuple[list, float]:
+        """(feeds due now, seconds until the next one); drops symbols no longer requested"""
+        now = time.monotonic()
+        due, next_due = [], now + self.MAX_INTERVAL
+        with self._lock:
+            for symbol, seen in list(self._active.items()):
+                if symbol not in self._pinned and now - seen > self.ACTIVE_SYMBOL_TTL:
+                    del self._active[symbol]
+                    self._first_poll.pop(symbol, None)
+                    for source in self.analyzer.NEWS_FEEDS:
+                        self._feeds.pop((symbol, source), None)
+            for key, state in self._feeds.items():
+                if state.next_due <= now:
+                    state.next_due = float('inf')       # in flight
+                    due.append(key)
+                else:
+                    next_due = min(next_due, state.next_due)
+        return due, max(next_due - now, 0.0)
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+        pending = set()
+
+        async def poll(key):
+            async with semaphore:
+                await asyncio.to_thread(self._poll, *key)
+            self._wake.set()    # reschedule with the feed's new interval
+
+        try:
+            while True:
+                due, wait = self._due()
+                for key in due:
+                    task = asyncio.create_task(poll(key))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(wait, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _poll(self, symbol: str, source: str):
+        """One conditional fetch; parses and scores new items and reschedules the feed"""
+        state = self._feeds.get((symbol, source))
+        if state is None:
+            return
+        state.polls += 1
+        changed = False
+        try:
+            articles, state.etag, state.modified = self.analyzer.poll_feed(
+                symbol, source, self.MAX_ITEMS, state.etag, state.modified
+            )
+            if articles is None:
+                state.not_modified += 1
+            elif articles:
+                added = self.analyzer.ingest_articles(symbol, articles)
+                self.articles_ingested += added
+                changed = added > 0
+            state.last_success = time.time()
+            state.last_error = None
+        except CircuitOpenError as e:
+            state.last_error = str(e)
+        except Exception as e:
+            state.last_error = str(e)
+            logger.warning(f"News poll failed for {symbol} from {source}: {e}")
+
+        if changed:
+            state.changes += 1
+            state.last_change = time.time()
+            state.interval = max(state.interval / 2, self.MIN_INTERVAL)
+        else:
+            state.interval = min(state.interval * 1.5, self.MAX_INTERVAL)
+        jitter = random.uniform(1 - self.JITTER, 1 + self.JITTER)
+        state.next_due = time.monotonic() + state.interval * jitter
+
+        with self._lock:
+            done = all(s.polls for (sym, _), s in self._feeds.items() if sym == symbol)
+            event = self._first_poll.get(symbol)
+        if done and event is not None:
+            event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            feeds = list(self._feeds.values())
+            active = len(self._active)
+        now = time.time()
+        lags = [now - s.last_success for s in feeds if s.last_success]
+        return {
+            'running': self.running,
+            'active_symbols': active,
+            'feeds': len(feeds),
+            'polls': sum(s.polls for s in feeds),
+            'changes': sum(s.changes for s in feeds),
+            'not_modified': sum(s.not_modified for s in feeds),
+            'articles_ingested': self.articles_ingested,
+            'avg_interval_seconds': round(sum(s.interval for s in feeds) / len(feeds), 1) if feeds else None,
+            'max_freshness_lag_seconds': round(max(lags), 1) if lags else None,
+            'failing_feeds': sum(1 for s in feeds if s.last_error),
+        }
+
+
+# Global news ingestor instance (started from the FastAPI lifespan)
+news_ingestor = NewsIngestor(sentiment.sentiment_analyzer)
@@ -0,0 +1,169 @@
+"""
+Portfolio / watchlist risk: covariance, correlation, risk contributions
+and risk-parity weights from aligned cached return series
+"""
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from .price_predictor import predictor
+from .risk import bar_days
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioRiskAnalyzer:
+    """Batched linear algebra over a (days x symbols) return matrix"""
+
+    LOOKBACK = 252
+    PERIODS_PER_YEAR = 252
+    MIN_COVERAGE = 0.6        # drop symbols with bars on fewer than 60% of the days
+    MAX_SYMBOLS = 1000
+
+    def aligned_returns(self, symbols: List[str], period: str = "1y") -> Tuple[List[str], np.ndarray, List[str]]:
+        """
+        Return (kept symbols, T x N return matrix, excluded symbols).
+        Prices are placed on the union calendar and forward-filled, so a symbol
+        that did not trade on a day contributes a zero return for it.
+        """
+        frames = predictor.fetch_many(symbols, period=period)
+
+        series = []
+        for symbol in symbols:
+            df = frames.get(symbol)
+            if df is None or len(df) < 3:
+                series.append(None)
+                continue
+            days = bar_days(df)
+            # Keep the last bar of any duplicated day
+            last = np.r_[days[1:] != days[:-1], True]
+            series.append((days[last], df['close'].to_numpy(dtype=float)[last]))
+
+        valid = [s for s in series if s is not None]
+        if not valid:
+            return [], np.empty((0, 0)), list(symbols)
+
+        calendar = np.unique(np.concatenate([d for d, _ in valid]))[-(self.LOOKBACK + 1):]
+        prices = np.full((len(calendar), len(symbols)), np.nan)
+        for j, s in enumerate(series):
+            if s is None:
+                continue
+            days, closes = s
+            mask = days >= calendar[0]
+            prices[np.searchsorted(calendar, days[mask]), j] = closes[mask]
+
+        coverage = np.isfinite(prices).mean(axis=0)
+        keep = coverage >= self.MIN_COVERAGE
+        prices = prices[:, keep]
+
+        # Vectorized forward fill: index of the last valid row at or above each row
+        rows = np.where(np.isfinite(prices), np.arange(len(prices))[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        prices = prices[rows, np.arange(prices.shape[1])]
+
+        returns = prices[1:] / prices[:-1] - 1
+        # Leading gaps (before a symbol's first bar) stay NaN; treat as flat
+        returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        kept = [s for s, k in zip(symbols, keep) if k]
+        excluded = [s for s, k in zip(symbols, keep) if not k]
+        return kept, returns, excluded
+
+    @staticmethod
+    def risk_parity_weights(cov: np.ndarray, budgets: Optional[np.ndarray] = None,
+                            max_iter: int = 50, tol: float = 1e-10) -> np.ndarray:
+        """
+        Equal (or budgeted) risk contribution weights via damped Newton on
+        Spinu's convex objective 0.5 x'Cx - sum(b * log x), then w = x / sum(x).
+        """
+        n = cov.shape[0]
+        b = np.full(n, 1.0 / n) if budgets is None else budgets / budgets.sum()
+        # Inverse-volatility start is already close for weakly correlated assets
+        x = 1.0 / np.sqrt(np.maximum(np.diag(cov), 1e-12))
+        x *= np.sqrt(b.sum() / (x @ cov @ x))
+
+        for _ in range(max_iter):
+            cx = cov @ x
+            grad = cx - b / x
+            if np.abs(grad).max() < tol:
+                break
+            hess = cov + np.diag(b / x ** 2)
+            step = np.linalg.solve(hess, grad)
+            # Backtrack so every weight stays positive
+            t = 1.0
+            while np.any(x - t * step <= 0):
+                t *= 0.5
+            x = x - t * step
+
+        return x / x.sum()
+
+    def analyze(self, symbols: List[str], weights: Optional[List[float]] = None,
+                period: str = "1y", include_matrices: bool = True) -> Dict[str, Any]:
+        """Covariance/correlation, portfolio volatility and risk budgets for a basket"""
+        symbols = [s.upper() for s in symbols]
+        if len(symbols) < 2:
+            raise ValueError("At least two symbols are required")
+        if len(symbols) > self.MAX_SYMBOLS:
+            raise ValueError(f"At most {self.MAX_SYMBOLS} symbols are supported")
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Symbols must be unique")
+        if weights is not None and len(weights) != len(symbols):
+            raise ValueError("weights must have one entry per symbol")
+
+        kept, returns, excluded = self.aligned_returns(symbols, period)
+        if len(kept) < 2 or len(returns) < 20:
+            raise ValueError("Not enough overlapping history to estimate covariance")
+
+        if weights is None:
+            w = np.full(len(kept), 1.0 / len(kept))
+        else:
+            by_symbol = dict(zip(symbols, weights))
+            w = np.array([by_symbol[s] for s in kept], dtype=float)
+            if abs(w.sum()) < 1e-12:
+                raise ValueError("weights must not sum to zero")
+            w = w / w.sum()
+
+        cov = np.cov(returns, rowvar=False) * self.PERIODS_PER_YEAR
+        std = np.sqrt(np.maximum(np.diag(cov), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.nan_to_num(cov / np.outer(std, std))
+        np.fill_diagonal(corr, 1.0)
+
+        cov_w = cov @ w
+        port_var = float(w @ cov_w)
+        port_vol = np.sqrt(max(port_var, 0.0))
+        marginal = cov_w / port_vol if port_vol > 0 else np.zeros_like(w)
+        contribution = w * marginal
+        contribution_pct = contribution / port_vol if port_vol > 0 else np.zeros_like(w)
+
+        parity = self.risk_parity_weights(cov)
+        diversification = float(w @ std / port_vol) if port_vol > 0 else 1.0
+
+        result = {
+            'symbols': kept,
+            'excluded': excluded,
+            'observations': int(len(returns)),
+            'portfolio_volatility': round(float(port_vol) * 100, 2),
+            'diversification_ratio': round(diversification, 3),
+            'assets': [
+                {
+                    'symbol': s,
+                    'weight': round(float(w[i]), 4),
+                    'volatility': round(float(std[i]) * 100, 2),
+                    'marginal_contribution': round(float(marginal[i]) * 100, 4),
+                    'risk_contribution_pct': round(float(contribution_pct[i]) * 100, 2),
+                    'risk_parity_weight': round(float(parity[i]), 4),
+                }
+                for i, s in enumerate(kept)
+            ],
+            'timestamp': datetime.now().isoformat()
+        }
+        if include_matrices:
+            result['covariance'] = np.round(cov, 6).tolist()
+            result['correlation'] = np.round(corr, 4).tolist()
+        return result
+
+
+# Global portfolio analyzer instance
+portfolio_analyzer = PortfolioRiskAnalyzer()
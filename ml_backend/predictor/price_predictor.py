@@ -2,16 +2,25 @@
 ML Price Predictor using LightGBM
 Fetches real market data and generates price predictions
 """
+import os
+import time
+import threading
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Callable, List
 import logging
 
-try:
-    import yfinance as yf
-except ImportError:
-    yf = None
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from utils.rate_limiter import Priority, market_data_scheduler
+from utils.deadline import DeadlineExceeded, check_deadline
+from utils.profiling import stage, traced
+from .feature_store import FeatureStore, feature_version
+from .bar_store import SharedBarStore
+from .intraday import DAILY, IntradayBarCache, download_period, interval_seconds, normalize_interval, period_days
+from .providers import market_data, synthetic_market
+from .explain import check_mode, prediction_explainer
 
 try:
     from lightgbm import LGBMRegressor
@@ -74,61 +83,310 @@ class PricePredictor:
         'BTC/USD': 'BTC-USD', 'ETH/USD': 'ETH-USD', 'SOL/USD': 'SOL-USD',
     }
     
+    # Bars per (symbol, period): fresh within BAR_CACHE_TTL, otherwise kept as
+    # last-good data to serve while yfinance is failing
+    BAR_CACHE_TTL = float(os.getenv('BAR_CACHE_TTL', '60'))
+    BAR_CACHE_MAX_ENTRIES = int(os.getenv('BAR_CACHE_MAX_ENTRIES', '1024'))
+    YFINANCE_TIMEOUT = float(os.getenv('YFINANCE_TIMEOUT', '10'))
+    
+    # Model inputs, in the order add_features creates them. Training and inference
+    # both use exactly this list; editing it or add_features bumps the feature
+    # store version.
+    FEATURE_COLUMNS = [
+        'returns', 'log_returns',
+        'ma_7', 'ma_ratio_7', 'ma_14', 'ma_ratio_14', 'ma_30', 'ma_ratio_30', 'ma_50', 'ma_ratio_50',
+        'return_lag_1', 'price_lag_1', 'return_lag_3', 'price_lag_3',
+        'return_lag_7', 'price_lag_7', 'return_lag_14', 'price_lag_14',
+        'rsi', 'macd', 'macd_signal', 'macd_hist',
+        'bb_upper', 'bb_middle', 'bb_lower', 'bb_position',
+        'volatility_7', 'volatility_30', 'atr', 'volume_ma_7', 'volume_ratio',
+    ]
+    FEATURE_STORE_DIR = os.getenv(
+        'FEATURE_STORE_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'feature_store'),
+    )
+    # Other feature versions are pruned once unused this long (old workers of a rolling deploy keep theirs)
+    FEATURE_STORE_MAX_AGE = float(os.getenv('FEATURE_STORE_MAX_AGE', str(7 * 86400)))
+    
+    # Bars published here are mapped by every worker process; /dev/shm keeps them in RAM.
+    # Set to an empty string to keep bars per process.
+    SHARED_CACHE_DIR = os.getenv(
+        'SHARED_CACHE_DIR',
+        '/dev/shm/tradepro_bars' if os.path.isdir('/dev/shm')
+        else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'shared_bars'),
+    )
+    # The store outlives restarts, so series nobody refreshes are pruned
+    SHARED_CACHE_MAX_MB = float(os.getenv('SHARED_CACHE_MAX_MB', '256'))
+    SHARED_CACHE_MAX_AGE = float(os.getenv('SHARED_CACHE_MAX_AGE', '86400'))
+    
+    # Trained models per (symbol, horizon, n_estimators, interval); with sharding each
+    # worker only ever trains the symbols it owns. Intraday horizons count bars.
+    MODEL_CACHE_MAX_ENTRIES = int(os.getenv('MODEL_CACHE_MAX_ENTRIES', '256'))
+    MODEL_MAX_AGE = float(os.getenv('MODEL_MAX_AGE', '86400'))
+    
     def __init__(self):
-        self.model = None
-        self.feature_columns = []
+        self._models: "OrderedDict[Tuple[str, int, int, str], Tuple[float, Any, float]]" = OrderedDict()
+        self._models_lock = threading.Lock()
+        self.feature_columns = list(self.FEATURE_COLUMNS)
         self.indicators = TechnicalIndicators()
+        self.feature_store = FeatureStore(
+            self.FEATURE_STORE_DIR, self.FEATURE_COLUMNS, self.add_features,
+            version=feature_version(self.FEATURE_COLUMNS, PricePredictor.add_features, TechnicalIndicators),
+            version_max_age=self.FEATURE_STORE_MAX_AGE,
+        )
+        self._bar_cache: "OrderedDict[Tuple[str, str], Tuple[float, pd.DataFrame]]" = OrderedDict()
+        # Routes fetch bars from worker threads
+        self._bar_cache_lock = threading.Lock()
+        self.bar_store = SharedBarStore(
+            self.SHARED_CACHE_DIR, max_bytes=int(self.SHARED_CACHE_MAX_MB * 1024 * 1024),
+            max_age=self.SHARED_CACHE_MAX_AGE,
+        ) if self.SHARED_CACHE_DIR else None
+        if self.bar_store is not None and not self.bar_store.enabled:
+            self.bar_store = None
+        self._feature_listeners: List[Callable[[str, pd.DataFrame], None]] = []
+        # Intraday bars (1m..1h) in retention-bounded ring buffers, per process
+        self.intraday = IntradayBarCache()
+    
+    def _get_model(self, symbol: str, horizon: int, n_estimators: int = 100,
+                   interval: str = DAILY) -> Optional[Tuple[Any, float]]:
+        """(model, test R²) if one was trained for this key within MODEL_MAX_AGE"""
+        key = (self.normalize_symbol(symbol), horizon, n_estimators, interval)
+        with self._models_lock:
+            entry = self._models.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.MODEL_MAX_AGE:
+                return None
+            self._models.move_to_end(key)
+            return entry[1], entry[2]
+    
+    def _put_model(self, symbol: str, horizon: int, n_estimators: int, model, test_score: float,
+                   interval: str = DAILY):
+        key = (self.normalize_symbol(symbol), horizon, n_estimators, interval)
+        with self._models_lock:
+            self._models[key] = (time.monotonic(), model, test_score)
+            self._models.move_to_end(key)
+            while len(self._models) > self.MODEL_CACHE_MAX_ENTRIES:
+                self._models.popitem(last=False)
+    
+    def model_stats(self) -> Dict[str, Any]:
+        with self._models_lock:
+            keys = list(self._models)
+        return {'cached': len(keys), 'symbols': len({k[0] for k in keys}), 'max_entries': self.MODEL_CACHE_MAX_ENTRIES,
+                'intervals': sorted({k[3] for k in keys})}
+    
+    def add_feature_listener(self, listener: Callable[[str, pd.DataFrame], None]):
+        """Register a callback invoked with (symbol, features) whenever daily features are computed"""
+        self._feature_listeners.append(listener)
+    
+    def _notify_features(self, symbol: str, df_features: pd.DataFrame, interval: str = DAILY,
+                         fallback: bool = False):
+        # Indicators over 1m..1h bars, or over last good / mock bars, must not overwrite
+        # the daily rows listeners keep (screener)
+        if interval != DAILY or fallback:
+            return
+        for listener in self._feature_listeners:
+            try:
+                listener(symbol, df_features)
+            except Exception as e:
+                logger.warning(f"Feature listener failed for {symbol}: {e}")
         
     def normalize_symbol(self, symbol: str) -> str:
         """Convert symbol to yfinance format"""
         symbol = symbol.upper().replace('/', '')
         return self.CRYPTO_SYMBOLS.get(symbol, symbol)
     
-    def fetch_data(self, symbol: str, period: str = "2y") -> Optional[pd.DataFrame]:
-        """Fetch historical data from yfinance"""
-        if yf is None:
+    @traced('predictor.fetch_data')
+    def fetch_data(self, symbol: str, period: Optional[str] = None,
+                   priority: Priority = Priority.STANDARD, interval: str = DAILY) -> Optional[pd.DataFrame]:
+        """
+        Fetch historical data from yfinance through the shared outbound scheduler.
+        period defaults to 2y for daily bars and to the retention window for intraday ones.
+        """
+        interval = normalize_interval(interval)
+        if not market_data.available:
             logger.warning("yfinance not installed, using mock data")
-            return self._generate_mock_data(symbol)
+            return self._generate_mock_data(symbol, interval)
+        if interval != DAILY:
+            return self._fetch_intraday(symbol, period, interval, priority)
+        period = period or "2y"
+        
+        key = (self.normalize_symbol(symbol), period)
+        cached = self._fresh_bars(key)
+        if cached is not None:
+            return cached
+        
+        # One worker refreshes a key at a time; the rest wait and read what it published
+        lock = self.bar_store.lock(*key, timeout=self.YFINANCE_TIMEOUT * 2) if self.bar_store else None
+        if lock is not None and lock.acquire():
+            cached = self._fresh_bars(key)
+            if cached is not None:
+                lock.release()
+                return cached
+        try:
+            return self._refresh_bars(key, symbol, period, priority)
+        finally:
+            if lock is not None:
+                lock.release()
+    
+    def _refresh_bars(self, key: Tuple[str, str], symbol: str, period: str,
+                      priority: Priority) -> pd.DataFrame:
+        try:
+            df = market_data_scheduler.submit(
+                ('history',) + key, self._download_history, key[0], period,
+                priority=priority, breaker=get_breaker('yfinance'),
+            )
+        except CircuitOpenError as e:
+            logger.warning(f"{e}; serving cached data for {symbol}")
+            return self._last_good_or_mock(key, symbol)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching data for {symbol}: {e}")
+            return self._last_good_or_mock(key, symbol)
         
+        df = df.reset_index()
+        df.columns = [c.lower() for c in df.columns]
+        self._store_bars(key, df)
+        return df
+    
+    def _fetch_intraday(self, symbol: str, period: Optional[str], interval: str,
+                        priority: Priority) -> pd.DataFrame:
+        """
+        Intraday bars from the ring buffers: a fresh buffer at this interval or a finer
+        one (resampled), else an incremental download merged into this interval's buffer
+        """
+        yf_symbol = self.normalize_symbol(symbol)
+        window = period_days(period) if period else float('inf')
+        cached = self.intraday.get(yf_symbol, interval, window, max_age=self.BAR_CACHE_TTL)
+        if cached is not None:
+            return cached
+        
+        buf = self.intraday.buffer(yf_symbol, interval)
+        # A warm buffer only needs the bars since its last one; a long-idle one is refilled
+        fetch_period = download_period(interval, buf.last_ns if buf is not None else None)
         try:
-            ticker = yf.Ticker(self.normalize_symbol(symbol))
-            df = ticker.history(period=period)
-            
+            df = market_data_scheduler.submit(
+                ('history', yf_symbol, fetch_period, interval), self._download_history, yf_symbol,
+                fetch_period, interval, priority=priority, breaker=get_breaker('yfinance'),
+            )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Intraday fetch failed for {symbol} ({interval}): {e}; serving cached bars")
+            stale = self.intraday.get(yf_symbol, interval, window)
+            return stale if stale is not None else self._generate_mock_data(symbol, interval)
+        
+        df = df.reset_index()
+        df.columns = [c.lower() for c in df.columns]
+        df = df.rename(columns={'datetime': 'date'})
+        self.intraday.append(yf_symbol, interval, df)
+        # Just downloaded: read this interval's own buffer, not an older finer one
+        bars = self.intraday.get(yf_symbol, interval, window, resample=False)
+        if bars is None:
+            logger.warning(f"No {interval} data found for {symbol}, using mock data")
+            return self._generate_mock_data(symbol, interval)
+        return bars
+    
+    def _fresh_bars(self, key: Tuple[str, str]) -> Optional[pd.DataFrame]:
+        """Bars younger than BAR_CACHE_TTL from this process, else from the shared store"""
+        with self._bar_cache_lock:
+            cached = self._bar_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.BAR_CACHE_TTL:
+            return cached[1]
+        shared = self.bar_store.get(*key) if self.bar_store else None
+        if shared is not None and time.time() - shared[0] < self.BAR_CACHE_TTL:
+            # Keep the shared fetch time so every worker expires the entry together
+            self._cache_bars(key, shared[1], time.monotonic() - (time.time() - shared[0]))
+            return shared[1]
+        return None
+    
+    def _cache_bars(self, key: Tuple[str, str], df: pd.DataFrame, fetched_at: float):
+        with self._bar_cache_lock:
+            self._bar_cache[key] = (fetched_at, df)
+            self._bar_cache.move_to_end(key)
+            while len(self._bar_cache) > self.BAR_CACHE_MAX_ENTRIES:
+                self._bar_cache.popitem(last=False)
+    
+    def _store_bars(self, key: Tuple[str, str], df: pd.DataFrame):
+        """Cache freshly downloaded bars locally and publish them to the other workers"""
+        self._cache_bars(key, df, time.monotonic())
+        if self.bar_store:
+            self.bar_store.put(*key, df)
+    
+    def fetch_many(self, symbols: list, period: str = "1y",
+                   priority: Priority = Priority.STANDARD) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch bars for many symbols; cache misses share one batched yfinance download.
+        Frames that are not fresh downloads (last good or mock bars) have attrs['fallback'] set.
+        """
+        results: Dict[str, pd.DataFrame] = {}
+        misses = []
+        for symbol in symbols:
+            cached = self._fresh_bars((self.normalize_symbol(symbol), period))
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                misses.append(symbol)
+        
+        if not market_data.available or len(misses) < 2:
+            for symbol in misses:
+                results[symbol] = self.fetch_data(symbol, period, priority=priority)
+            return results
+        
+        yf_symbols = sorted({self.normalize_symbol(s) for s in misses})
+        try:
+            raw = market_data_scheduler.submit(
+                ('download', tuple(yf_symbols), period), market_data.download, yf_symbols, period,
+                self.YFINANCE_TIMEOUT, priority=priority, breaker=get_breaker('yfinance'),
+            )
+        except Exception as e:
+            logger.error(f"Batch download failed for {len(yf_symbols)} symbols: {e}")
+            raw = None
+        
+        for symbol in misses:
+            key = (self.normalize_symbol(symbol), period)
+            if raw is None or key[0] not in raw.columns.get_level_values(0):
+                results[symbol] = self._last_good_or_mock(key, symbol)
+                continue
+            df = raw[key[0]].dropna(how='all')
             if df.empty:
-                logger.warning(f"No data found for {symbol}, using mock data")
-                return self._generate_mock_data(symbol)
-            
+                results[symbol] = self._last_good_or_mock(key, symbol)
+                continue
             df = df.reset_index()
             df.columns = [c.lower() for c in df.columns]
+            self._store_bars(key, df)
+            results[symbol] = df
+        return results
+    
+    def _download_history(self, yf_symbol: str, period: str, interval: str = DAILY) -> pd.DataFrame:
+        """
+        Single history download from the market data provider, bounded by YFINANCE_TIMEOUT.
+        Raises on errors and on an empty answer, so both count against the breaker.
+        """
+        return market_data.history(yf_symbol, period, interval, self.YFINANCE_TIMEOUT)
+    
+    def _last_good_or_mock(self, key: Tuple[str, str], symbol: str) -> pd.DataFrame:
+        """Last successful download for this symbol, or mock data if we never had one; marked as a fallback"""
+        with self._bar_cache_lock:
+            cached = self._bar_cache.get(key)
+            if cached is None:
+                # Any period is better than synthetic data
+                cached = next((v for (sym, _), v in reversed(self._bar_cache.items()) if sym == key[0]), None)
+        if cached is None and self.bar_store:
+            # Another worker may still have it, however old
+            cached = self.bar_store.get(*key)
+        if cached is not None:
+            # Shallow copy: the cached frame itself stays unmarked
+            df = cached[1].copy(deep=False)
+            df.attrs['fallback'] = True
             return df
-        except Exception as e:
-            logger.error(f"Error fetching data for {symbol}: {e}")
-            return self._generate_mock_data(symbol)
+        return self._generate_mock_data(symbol)
     
-    def _generate_mock_data(self, symbol: str) -> pd.DataFrame:
-        """Generate realistic mock data for testing"""
-        np.random.seed(42)
-        dates = pd.date_range(end=datetime.now(), periods=500, freq='D')
-        
-        # Base prices for different assets
-        base_prices = {
-            'BTC': 65000, 'ETH': 3500, 'SOL': 180,
-            'AAPL': 180, 'GOOGL': 140, 'MSFT': 420, 'TSLA': 250
-        }
-        base = base_prices.get(symbol.split('-')[0].split('/')[0], 100)
-        
-        # Generate random walk
-        returns = np.random.normal(0.0005, 0.02, len(dates))
-        prices = base * np.exp(np.cumsum(returns))
-        
-        df = pd.DataFrame({
-            'date': dates,
-            'open': prices * (1 + np.random.uniform(-0.01, 0.01, len(dates))),
-            'high': prices * (1 + np.random.uniform(0, 0.03, len(dates))),
-            'low': prices * (1 - np.random.uniform(0, 0.03, len(dates))),
-            'close': prices,
-            'volume': np.random.uniform(1e6, 1e8, len(dates))
-        })
+    def _generate_mock_data(self, symbol: str, interval: str = DAILY) -> pd.DataFrame:
+        """500 synthetic bars, seeded per symbol (each symbol gets its own series)"""
+        df = synthetic_market.bars(self.normalize_symbol(symbol), interval, n_bars=500).reset_index()
+        df.columns = [c.lower() for c in df.columns]
+        df = df.rename(columns={'datetime': 'date'})
+        df.attrs['fallback'] = True
         return df
     
     def add_features(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -176,36 +434,49 @@ class PricePredictor:
         
         return df
     
-    def prepare_training_data(self, df: pd.DataFrame, horizon: int = 7) -> Tuple[pd.DataFrame, pd.Series]:
+    @traced('predictor.features')
+    def get_features(self, symbol: str, df: pd.DataFrame, interval: str = DAILY) -> pd.DataFrame:
+        """
+        Bars plus FEATURE_COLUMNS, read from the feature store (only new bars are computed).
+        Windows count bars, so on intraday frames ma_7 is a 7-bar average; each interval
+        has its own store entry.
+        """
+        key = self.normalize_symbol(symbol)
+        return self.feature_store.features(key if interval == DAILY else f"{key}@{interval}", df)
+    
+    def feature_matrix(self, df_features: pd.DataFrame) -> pd.DataFrame:
+        """Model input matrix: FEATURE_COLUMNS with infinities treated as missing"""
+        return df_features[self.FEATURE_COLUMNS].replace([np.inf, -np.inf], np.nan)
+    
+    def prepare_training_data(self, df: pd.DataFrame, horizon: int = 7, symbol: Optional[str] = None,
+                              interval: str = DAILY) -> Tuple[pd.DataFrame, pd.Series]:
         """Prepare data for model training"""
-        df = self.add_features(df)
+        df = self.get_features(symbol, df, interval) if symbol else self.add_features(df)
         
         # Target: future return over horizon
-        df['target'] = df['close'].shift(-horizon) / df['close'] - 1
+        target = df['close'].shift(-horizon) / df['close'] - 1
         
-        # Feature columns (exclude target, date, and raw price columns)
-        exclude_cols = ['date', 'target', 'close', 'open', 'high', 'low', 'volume']
-        self.feature_columns = [c for c in df.columns if c not in exclude_cols and not df[c].isna().all()]
+        # Drop warm-up rows (longest window is ma_50) and rows without a future target;
+        # remaining gaps are handled natively by LightGBM
+        valid = df['ma_50'].notna() & target.notna()
         
-        # Remove rows with NaN
-        df_clean = df.dropna(subset=self.feature_columns + ['target'])
-        
-        X = df_clean[self.feature_columns]
-        y = df_clean['target']
+        X = self.feature_matrix(df[valid])
+        y = target[valid]
         
         return X, y
     
-    def train(self, symbol: str, horizon: int = 7) -> Dict[str, Any]:
-        """Train the prediction model"""
+    def train(self, symbol: str, horizon: int = 7, interval: str = DAILY) -> Dict[str, Any]:
+        """Train the prediction model (horizon in bars of `interval`)"""
         if LGBMRegressor is None:
             logger.warning("LightGBM not installed")
             return {'success': False, 'error': 'LightGBM not installed'}
         
-        df = self.fetch_data(symbol)
+        interval = normalize_interval(interval)
+        df = self.fetch_data(symbol, priority=Priority.BACKGROUND, interval=interval)
         if df is None or len(df) < 100:
             return {'success': False, 'error': 'Insufficient data'}
         
-        X, y = self.prepare_training_data(df, horizon)
+        X, y = self.prepare_training_data(df, horizon, symbol=symbol, interval=interval)
         
         if len(X) < 50:
             return {'success': False, 'error': 'Insufficient training samples'}
@@ -216,7 +487,7 @@ class PricePredictor:
         y_train, y_test = y[:split_idx], y[split_idx:]
         
         # Train model
-        self.model = LGBMRegressor(
+        model = LGBMRegressor(
             n_estimators=100,
             learning_rate=0.05,
             max_depth=6,
@@ -225,11 +496,13 @@ class PricePredictor:
             verbose=-1
         )
         
-        self.model.fit(X_train, y_train)
+        with stage('predictor.fit'):
+            model.fit(X_train, y_train)
         
         # Evaluate
-        train_score = self.model.score(X_train, y_train)
-        test_score = self.model.score(X_test, y_test)
+        train_score = model.score(X_train, y_train)
+        test_score = model.score(X_test, y_test)
+        self._put_model(symbol, horizon, 100, model, test_score, interval)
         
         return {
             'success': True,
@@ -239,21 +512,65 @@ class PricePredictor:
             'n_features': len(self.feature_columns)
         }
     
-    def predict(self, symbol: str, horizon: int = 7) -> Dict[str, Any]:
-        """Generate price prediction for a symbol"""
+    def predict(self, symbol: str, horizon: int = 7, interval: str = DAILY, explain: Optional[str] = None,
+                explain_budget_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Generate price prediction for a symbol (horizon in bars of `interval`)
+        explain='exact' or 'approx' adds the prediction's TreeSHAP contributions
+        """
+        if explain:
+            check_mode(explain)
+        run = self._predict(symbol, horizon, interval)
+        if explain:
+            self._attach_explanations([run], explain, explain_budget_ms)
+        return run[0]
+    
+    def predict_many(self, symbols: List[str], horizon: int = 7, interval: str = DAILY,
+                     explain: Optional[str] = None, explain_budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Predictions in input order; explanations are computed together after all of them"""
+        if explain:
+            check_mode(explain)
+        runs = [self._predict(symbol, horizon, interval) for symbol in symbols]
+        if explain:
+            self._attach_explanations(runs, explain, explain_budget_ms)
+        return [run[0] for run in runs]
+    
+    def _attach_explanations(self, runs: List[Tuple[Dict[str, Any], Any, Optional[pd.DataFrame]]], mode: str,
+                             budget_ms: Optional[float]):
+        """Set 'explanation' on each (result, model, feature row); None for fallback predictions"""
+        explainable = [run for run in runs if run[1] is not None]
+        for result, _, _ in runs:
+            result['explanation'] = None
+        if not explainable:
+            return
+        with stage('predictor.explain'):
+            explanations = prediction_explainer.explain_many([(model, X) for _, model, X in explainable],
+                                                             mode, budget_ms)
+        for (result, _, _), explanation in zip(explainable, explanations):
+            result['explanation'] = explanation
+    
+    def _predict(self, symbol: str, horizon: int, interval: str) -> Tuple[Dict[str, Any], Any, Optional[pd.DataFrame]]:
+        """(prediction, model, feature row it was made from); no model for fallback predictions"""
+        interval = normalize_interval(interval)
         # Fetch latest data
-        df = self.fetch_data(symbol)
+        df = self.fetch_data(symbol, interval=interval)
         if df is None or len(df) < 100:
-            return self._fallback_prediction(symbol, horizon)
-        
-        # Train model if needed
-        if self.model is None:
-            train_result = self.train(symbol, horizon)
+            return self._fallback_prediction(symbol, horizon, interval), None, None
+        
+        # Train a model for this symbol, horizon and interval if needed
+        cached = self._get_model(symbol, horizon, interval=interval)
+        if cached is None:
+            # Training is the slow path; skip it once the request has given up waiting
+            check_deadline('model training')
+            train_result = self.train(symbol, horizon, interval)
             if not train_result.get('success'):
-                return self._fallback_prediction(symbol, horizon)
+                return self._fallback_prediction(symbol, horizon, interval), None, None
+            cached = self._get_model(symbol, horizon, interval=interval)
+        model = cached[0]
         
         # Add features to latest data
-        df_features = self.add_features(df)
+        df_features = self.get_features(symbol, df, interval)
+        self._notify_features(symbol, df_features, interval, df.attrs.get('fallback', False))
         
         # Get latest row for prediction
         latest = df_features.iloc[-1]
@@ -261,11 +578,12 @@ class PricePredictor:
         
         # Make prediction
         try:
-            X_pred = latest[self.feature_columns].values.reshape(1, -1)
-            predicted_return = float(self.model.predict(X_pred)[0])
+            with stage('predictor.inference'):
+                X_pred = self.feature_matrix(df_features.iloc[-1:])
+                predicted_return = float(model.predict(X_pred)[0])
         except Exception as e:
             logger.error(f"Prediction error: {e}")
-            return self._fallback_prediction(symbol, horizon)
+            return self._fallback_prediction(symbol, horizon, interval), None, None
         
         predicted_price = current_price * (1 + predicted_return)
         predicted_change = predicted_return * 100
@@ -295,14 +613,14 @@ class PricePredictor:
             confidence = base_confidence - 10
         
         # Feature importance for explainability
-        top_features = self._get_top_features()
+        top_features = self._get_top_features(model)
         
         return {
             'symbol': str(symbol),
             'current_price': float(round(current_price, 2)),
             'predicted_price': float(round(predicted_price, 2)),
             'predicted_change': float(round(predicted_change, 2)),
-            'horizon_days': int(horizon),
+            **self._horizon_fields(horizon, interval),
             'confidence': float(round(confidence, 1)),
             'recommendation': str(recommendation),
             'technicals': {
@@ -316,15 +634,15 @@ class PricePredictor:
             },
             'top_factors': top_features,
             'timestamp': datetime.now().isoformat()
-        }
+        }, model, X_pred
     
-    def _get_top_features(self, top_n: int = 5) -> list:
+    def _get_top_features(self, model, top_n: int = 5) -> list:
         """Get top contributing features"""
-        if self.model is None:
+        if model is None:
             return []
         
         try:
-            importances = self.model.feature_importances_
+            importances = model.feature_importances_
             indices = np.argsort(importances)[-top_n:][::-1]
             return [
                 {'feature': str(self.feature_columns[int(i)]), 'importance': float(round(importances[int(i)], 3))}
@@ -333,10 +651,21 @@ class PricePredictor:
         except:
             return []
     
-    def _fallback_prediction(self, symbol: str, horizon: int) -> Dict[str, Any]:
+    @staticmethod
+    def _horizon_fields(horizon: int, interval: str) -> Dict[str, Any]:
+        """Daily predictions keep horizon_days; intraday ones count bars"""
+        if interval == DAILY:
+            return {'horizon_days': int(horizon)}
+        return {
+            'horizon_days': round(horizon * interval_seconds(interval) / 86400, 4),
+            'horizon_bars': int(horizon),
+            'interval': interval,
+        }
+    
+    def _fallback_prediction(self, symbol: str, horizon: int, interval: str = DAILY) -> Dict[str, Any]:
         """Generate fallback prediction when model fails"""
         # Use basic technical analysis
-        df = self.fetch_data(symbol)
+        df = self.fetch_data(symbol, interval=interval)
         if df is not None and len(df) > 30:
             current_price = float(df['close'].iloc[-1])
             ma_7 = float(df['close'].rolling(7).mean().iloc[-1])
@@ -365,7 +694,7 @@ class PricePredictor:
             'current_price': float(round(current_price, 2)),
             'predicted_price': float(round(predicted_price, 2)),
             'predicted_change': float(round(predicted_change, 2)),
-            'horizon_days': int(horizon),
+            **self._horizon_fields(horizon, interval),
             'confidence': 55.0,
             'recommendation': str(recommendation),
             'technicals': {
@@ -382,66 +711,76 @@ class PricePredictor:
             'fallback': True
         }
     
-    def predict_multi_horizon(self, symbol: str, horizons: list = None) -> Dict[str, Any]:
+    def predict_multi_horizon(self, symbol: str, horizons: list = None, interval: str = DAILY,
+                              explain: Optional[str] = None, explain_budget_ms: Optional[float] = None) -> Dict[str, Any]:
         """Train separate LightGBM models per horizon and return distinct predictions."""
         if horizons is None:
             horizons = [1, 7, 30]
+        if explain:
+            check_mode(explain)
+        interval = normalize_interval(interval)
+        # Daily horizons keep their "7d" labels; intraday ones read e.g. "12x5m"
+        unit = 'd' if interval == DAILY else f'x{interval}'
 
         if LGBMRegressor is None:
-            return {h: self._fallback_prediction(symbol, h) for h in horizons}
+            return {h: self._fallback_prediction(symbol, h, interval) for h in horizons}
 
-        df = self.fetch_data(symbol)
+        df = self.fetch_data(symbol, interval=interval)
         if df is None or len(df) < 100:
-            return {h: self._fallback_prediction(symbol, h) for h in horizons}
+            return {h: self._fallback_prediction(symbol, h, interval) for h in horizons}
 
-        df_feat = self.add_features(df)
+        df_feat = self.get_features(symbol, df, interval)
+        self._notify_features(symbol, df_feat, interval, df.attrs.get('fallback', False))
         current_price = float(df_feat['close'].iloc[-1])
-
-        # Exclude cols that shouldn't be features
-        exclude_cols = ['date', 'target', 'close', 'open', 'high', 'low', 'volume']
+        feat_cols = self.FEATURE_COLUMNS
+        X_all = self.feature_matrix(df_feat)
 
         results: Dict[str, Any] = {}
+        models: Dict[str, Any] = {}
 
         for horizon in horizons:
             try:
-                df_h = df_feat.copy()
-                # Target: future return over this specific horizon
-                df_h['target'] = df_h['close'].shift(-horizon) / df_h['close'] - 1
-
-                feat_cols = [c for c in df_h.columns
-                             if c not in exclude_cols and not df_h[c].isna().all()]
-                df_clean = df_h.dropna(subset=feat_cols + ['target'])
+                n_estimators = 150 + horizon * 5   # more trees for longer horizons
+                cached = self._get_model(symbol, horizon, n_estimators, interval)
+                if cached is not None:
+                    model, test_score = cached
+                else:
+                    # Target: future return over this specific horizon
+                    target = df_feat['close'].shift(-horizon) / df_feat['close'] - 1
+                    valid = df_feat['ma_50'].notna() & target.notna()
 
-                if len(df_clean) < 50:
-                    label = f"{horizon}d"
-                    results[label] = self._fallback_prediction(symbol, horizon)
-                    continue
+                    if valid.sum() < 50:
+                        label = f"{horizon}{unit}"
+                        results[label] = self._fallback_prediction(symbol, horizon, interval)
+                        continue
 
-                X = df_clean[feat_cols]
-                y = df_clean['target']
+                    X = X_all[valid]
+                    y = target[valid]
 
-                split = int(len(X) * 0.8)
-                X_train, X_test = X[:split], X[split:]
-                y_train, y_test = y[:split], y[split:]
+                    split = int(len(X) * 0.8)
+                    X_train, X_test = X[:split], X[split:]
+                    y_train, y_test = y[:split], y[split:]
 
-                model = LGBMRegressor(
-                    n_estimators=150 + horizon * 5,   # more trees for longer horizons
-                    learning_rate=0.05,
-                    max_depth=6,
-                    num_leaves=31,
-                    random_state=42,
-                    verbose=-1,
-                )
-                model.fit(X_train, y_train)
+                    model = LGBMRegressor(
+                        n_estimators=n_estimators,
+                        learning_rate=0.05,
+                        max_depth=6,
+                        num_leaves=31,
+                        random_state=42,
+                        verbose=-1,
+                    )
+                    with stage(f'predictor.fit:{horizon}{unit}'):
+                        model.fit(X_train, y_train)
+                    test_score = model.score(X_test, y_test)
+                    self._put_model(symbol, horizon, n_estimators, model, test_score, interval)
 
                 # Predict using the very last row of features
-                latest_features = df_feat[feat_cols].dropna().iloc[-1:]
-                predicted_return = float(model.predict(latest_features.values)[0])
+                latest_features = X_all.iloc[-1:]
+                predicted_return = float(model.predict(latest_features)[0])
                 predicted_price = current_price * (1 + predicted_return)
                 predicted_change = predicted_return * 100
 
                 # Confidence from model R² (clamped 30-95)
-                test_score = model.score(X_test, y_test)
                 rsi = float(df_feat['rsi'].iloc[-1]) if 'rsi' in df_feat.columns else 50
                 vol = float(df_feat.get('volatility_7', pd.Series([0.02])).iloc[-1])
                 base_conf = max(30, min(90, 70 - (vol * 500)))
@@ -472,13 +811,13 @@ class PricePredictor:
                 except Exception:
                     top_feats = []
 
-                label = f"{horizon}d"
+                label = f"{horizon}{unit}"
                 results[label] = {
                     'symbol': str(symbol),
                     'current_price': float(round(current_price, 2)),
                     'predicted_price': float(round(predicted_price, 2)),
                     'predicted_change': float(round(predicted_change, 2)),
-                    'horizon_days': int(horizon),
+                    **self._horizon_fields(horizon, interval),
                     'confidence': float(round(confidence, 1)),
                     'recommendation': str(rec),
                     'technicals': {
@@ -490,16 +829,24 @@ class PricePredictor:
                     'top_factors': top_feats,
                     'timestamp': datetime.now().isoformat(),
                 }
+                models[label] = model
             except Exception as e:
-                logger.warning(f"Horizon {horizon}d failed for {symbol}: {e}")
-                label = f"{horizon}d"
-                results[label] = self._fallback_prediction(symbol, horizon)
+                logger.warning(f"Horizon {horizon}{unit} failed for {symbol}: {e}")
+                label = f"{horizon}{unit}"
+                results[label] = self._fallback_prediction(symbol, horizon, interval)
 
+        if explain:
+            # Every horizon explains the same latest row, in one batch
+            latest_features = X_all.iloc[-1:]
+            self._attach_explanations(
+                [(result, models.get(label), latest_features) for label, result in results.items()],
+                explain, explain_budget_ms,
+            )
         return results
 
     def get_current_price(self, symbol: str) -> Dict[str, Any]:
         """Get current price for a symbol"""
-        df = self.fetch_data(symbol, period="5d")
+        df = self.fetch_data(symbol, period="5d", priority=Priority.INTERACTIVE)
         if df is not None and len(df) > 0:
             return {
                 'symbol': symbol,
@@ -509,23 +856,22 @@ class PricePredictor:
             }
         return {'symbol': symbol, 'price': 0, 'error': 'Failed to fetch price'}
     
-    def get_history(self, symbol: str, period: str = "1y") -> list:
+    def get_history(self, symbol: str, period: str = "1y", interval: str = DAILY) -> list:
         """Get historical price data for charting"""
-        df = self.fetch_data(symbol, period=period)
+        df = self.fetch_data(symbol, period=period, interval=interval)
         if df is None:
             return []
         
-        records = []
-        for _, row in df.iterrows():
-            records.append({
-                'date': row['date'].isoformat() if hasattr(row['date'], 'isoformat') else str(row['date']),
-                'open': round(float(row['open']), 2),
-                'high': round(float(row['high']), 2),
-                'low': round(float(row['low']), 2),
-                'close': round(float(row['close']), 2),
-                'volume': int(row['volume'])
-            })
-        return records
+        # Column-wise: one rounding pass per column instead of a Series per row
+        dates = [d.isoformat() if hasattr(d, 'isoformat') else str(d) for d in df['date']]
+        prices = df[['open', 'high', 'low', 'close']].to_numpy(dtype=float).round(2).tolist()
+        volume = df['volume'].to_numpy(dtype=float)
+        # Missing volumes become None; casting NaN to int64 would give -2**63
+        volumes = [int(v) if v == v else None for v in volume.tolist()]
+        return [
+            {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for d, (o, h, l, c), v in zip(dates, prices, volumes)
+        ]
 
 
 # Global predictor instance
@@ -0,0 +1,568 @@
+"""
+Market data providers: live, record, replay and synthetic
+Every upstream call (yfinance bars, batch downloads and `.info`, RSS feeds) goes
+through `market_data`, whose source is chosen by MARKET_DATA_MODE:
+  live       yfinance / httpx + feedparser (default)
+  record     live, and every response is also written under MARKET_DATA_DIR
+  replay     recorded responses only; no network
+  synthetic  seeded per-symbol markets of any size; no network
+Replay and synthetic sources can inject latency and errors, so load tests see
+upstream behaviour as well as realistic data sizes. Callers keep their circuit
+breakers, scheduler and caches; injected errors count as upstream failures.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+
+from utils.circuit_breaker import NoDataError
+from .intraday import DAILY, interval_seconds, period_days
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+try:
+    from yfinance import exceptions as yf_exceptions
+except ImportError:
+    yf_exceptions = None
+
+try:
+    import feedparser
+except ImportError:
+    feedparser = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+MODES = ('live', 'record', 'replay', 'synthetic')
+
+
+class InjectedUpstreamError(ConnectionError):
+    """Failure injected by MARKET_DATA_ERROR_RATE"""
+
+
+class RecordingNotFound(LookupError):
+    """Replay mode was asked for a response that was never recorded"""
+
+
+class NoBarsReturned(NoDataError):
+    """The upstream answered without any bars for the symbol (unknown, delisted or no trading in the period)"""
+
+
+# yfinance's answers for symbols it has no data for; older releases raise plain Exceptions
+YF_MISSING_ERRORS = tuple(
+    getattr(yf_exceptions, name) for name in ('YFTickerMissingError', 'YFInvalidPeriodError')
+    if yf_exceptions is not None and hasattr(yf_exceptions, name)
+)
+YF_MISSING_MESSAGES = ('delisted', 'no data found', "data doesn't exist", 'no price data found', 'no timezone found')
+
+
+class LiveSource:
+    name = 'live'
+
+    @property
+    def available(self) -> bool:
+        return yf is not None
+
+    @property
+    def feeds_available(self) -> bool:
+        return feedparser is not None
+
+    def history(self, symbol: str, period: str, interval: str, timeout: float) -> pd.DataFrame:
+        # Without raise_errors yfinance logs throttling and network errors and returns an empty frame
+        try:
+            return yf.Ticker(symbol).history(period=period, interval=interval, timeout=timeout, raise_errors=True)
+        except YF_MISSING_ERRORS as e:
+            raise NoBarsReturned(str(e)) from e
+        except Exception as e:
+            if type(e) is Exception and any(m in str(e).lower() for m in YF_MISSING_MESSAGES):
+                raise NoBarsReturned(str(e)) from e
+            raise
+
+    def download(self, symbols: List[str], period: str, timeout: float) -> pd.DataFrame:
+        return yf.download(symbols, period=period, group_by='ticker', auto_adjust=True, actions=True,
+                           threads=True, progress=False, timeout=timeout)
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        return yf.Ticker(symbol).info or {}
+
+    def feed(self, url: str, etag: Optional[str], modified: Optional[str], timeout: float,
+             symbol: Optional[str] = None):
+        """
+        Download and parse one feed, raising on failure so the breaker can count it.
+        Returns (feed or None when the server answered 304 Not Modified, etag, last-modified).
+        """
+        if feedparser is None:
+            raise RuntimeError("feedparser not installed")
+        if httpx is not None:
+            headers = {}
+            if etag:
+                headers['If-None-Match'] = etag
+            if modified:
+                headers['If-Modified-Since'] = modified
+            response = httpx.get(url, timeout=timeout, follow_redirects=True, headers=headers)
+            if response.status_code == 304:
+                return None, etag, modified
+            response.raise_for_status()
+            return (feedparser.parse(response.content), response.headers.get('etag'),
+                    response.headers.get('last-modified'))
+
+        feed = feedparser.parse(url, etag=etag, modified=modified)
+        if feed.get('status') == 304:
+            return None, etag, modified
+        if feed.get('bozo') and not feed.entries:
+            raise feed.get('bozo_exception') or ValueError(f"Unparseable feed: {url}")
+        return feed, feed.get('etag'), feed.get('modified')
+
+
+class Recording:
+    """
+    Responses on disk, one file each:
+      history/<SYMBOL>_<period>_<interval>.npz   int64 UTC ns index + float64 columns
+      info/<SYMBOL>.json                         .info dict
+      feeds/<hash of url>.json                   parsed entries + etag/modified
+    Batch downloads are stored per symbol as 1d history, so a recorded batch can be
+    replayed one symbol at a time and the other way round.
+    """
+
+    FEED_FIELDS = ('title', 'link', 'published')
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, kind: str, name: str) -> str:
+        return os.path.join(self.root, kind, name.replace('/', '_'))
+
+    def _write(self, path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp)
+        os.replace(tmp, path)
+
+    def _history_path(self, symbol: str, period: str, interval: str) -> str:
+        return self._path('history', f"{symbol}_{period}_{interval}.npz")
+
+    def save_history(self, symbol: str, period: str, interval: str, df: pd.DataFrame):
+        index = pd.DatetimeIndex(df.index)
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        arrays = {f"col_{i}": df[c].to_numpy(dtype=np.float64) for i, c in enumerate(columns)}
+        meta = json.dumps({'columns': columns, 'tz': tz, 'index_name': df.index.name})
+
+        def write(tmp):
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, index=index.as_unit('ns').asi8, meta=np.array(meta), **arrays)
+        self._write(self._history_path(symbol, period, interval), write)
+
+    def load_history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        path = self._history_path(symbol, period, interval)
+        try:
+            data = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            raise RecordingNotFound(f"No recorded {interval} history for {symbol} ({period})")
+        with data:
+            meta = json.loads(str(data['meta']))
+            index = pd.to_datetime(data['index'], utc=meta['tz'] is not None)
+            if meta['tz'] is not None:
+                index = index.tz_convert(meta['tz'])
+            index.name = meta['index_name']
+            return pd.DataFrame({c: data[f"col_{i}"] for i, c in enumerate(meta['columns'])}, index=index)
+
+    def save_info(self, symbol: str, info: Dict[str, Any]):
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump(info, f, default=str)
+        self._write(self._path('info', f"{symbol}.json"), write)
+
+    def load_info(self, symbol: str) -> Dict[str, Any]:
+        try:
+            with open(self._path('info', f"{symbol}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RecordingNotFound(f"No recorded info for {symbol}")
+
+    @staticmethod
+    def _feed_name(url: str) -> str:
+        return hashlib.blake2b(url.encode(), digest_size=12).hexdigest() + '.json'
+
+    def save_feed(self, url: str, feed, etag: Optional[str], modified: Optional[str]):
+        entries = [{k: e.get(k, '') for k in self.FEED_FIELDS} for e in feed.entries]
+
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump({'url': url, 'etag': etag, 'modified': modified, 'entries': entries}, f)
+        self._write(self._path('feeds', self._feed_name(url)), write)
+
+    def load_feed(self, url: str) -> Dict[str, Any]:
+        try:
+            with open(self._path('feeds', self._feed_name(url))) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RecordingNotFound(f"No recorded feed for {url}")
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {}
+        for kind in ('history', 'info', 'feeds'):
+            try:
+                counts[kind] = len(os.listdir(os.path.join(self.root, kind)))
+            except OSError:
+                counts[kind] = 0
+        return {'dir': self.root, **counts}
+
+
+class RecordingSource(LiveSource):
+    """Live responses, also written to the recording (a failed write never fails the call)"""
+
+    name = 'record'
+
+    def __init__(self, recording: Recording):
+        self.recording = recording
+        self.recorded = 0
+
+    def _save(self, save, *args):
+        try:
+            save(*args)
+            self.recorded += 1
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not record response: {e}")
+
+    def history(self, symbol, period, interval, timeout):
+        df = super().history(symbol, period, interval, timeout)
+        if not df.empty:
+            self._save(self.recording.save_history, symbol, period, interval, df)
+        return df
+
+    def download(self, symbols, period, timeout):
+        raw = super().download(symbols, period, timeout)
+        for symbol in set(raw.columns.get_level_values(0)):
+            df = raw[symbol].dropna(how='all')
+            if not df.empty:
+                self._save(self.recording.save_history, symbol, period, DAILY, df)
+        return raw
+
+    def info(self, symbol):
+        info = super().info(symbol)
+        if info:
+            self._save(self.recording.save_info, symbol, info)
+        return info
+
+    def feed(self, url, etag, modified, timeout, symbol=None):
+        feed, etag, modified = super().feed(url, etag, modified, timeout)
+        if feed is not None:
+            self._save(self.recording.save_feed, url, feed, etag, modified)
+        return feed, etag, modified
+
+
+class ReplaySource:
+    name = 'replay'
+    available = True
+    feeds_available = True
+
+    def __init__(self, recording: Recording):
+        self.recording = recording
+
+    def history(self, symbol, period, interval, timeout):
+        return self.recording.load_history(symbol, period, interval)
+
+    def download(self, symbols, period, timeout):
+        # Symbols without a recording are left out, as yfinance leaves out failed tickers
+        frames = {}
+        for symbol in symbols:
+            try:
+                frames[symbol] = self.recording.load_history(symbol, period, DAILY)
+            except RecordingNotFound:
+                continue
+        if not frames:
+            raise RecordingNotFound(f"No recorded history for any of {len(symbols)} symbols ({period})")
+        return pd.concat(frames, axis=1)
+
+    def info(self, symbol):
+        return self.recording.load_info(symbol)
+
+    def feed(self, url, etag, modified, timeout, symbol=None):
+        recorded = self.recording.load_feed(url)
+        if etag and etag == recorded['etag']:
+            return None, etag, modified
+        return SimpleNamespace(entries=recorded['entries']), recorded['etag'], recorded['modified']
+
+
+class SyntheticMarket:
+    """
+    Geometric random walks, one per symbol and interval, with drift and volatility
+    drawn from a seed derived from the symbol; prices pass through the symbol's base
+    price at ANCHOR, so recent bars stay near realistic levels. A bar is a function of
+    its timestamp alone: returns come in blocks of BLOCK bars, each generated from its
+    own seed and rescaled to a block total drawn from a per-series sequence, so any
+    window (and an incremental refresh of it) sees the same bars.
+    """
+
+    ORIGIN = pd.Timestamp('2015-01-01', tz='UTC')
+    ANCHOR = pd.Timestamp('2025-01-01', tz='UTC')
+    BLOCK = 1024
+    MAX_DAYS = 3650
+    BASE_PRICES = {
+        'BTC': 65000, 'ETH': 3500, 'SOL': 180,
+        'AAPL': 180, 'GOOGL': 140, 'MSFT': 420, 'TSLA': 250,
+        'SPY': 550, 'QQQ': 480, '^VIX': 16,         # macro benchmark and volatility index
+    }
+    SECTORS = ('Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical',
+               'Industrials', 'Communication Services', 'Utilities')
+    HEADLINES = (
+        ("{s} Shows Strong Momentum as Bulls Take Control", 1),
+        ("Analysts Upgrade {s} Price Target Following Earnings Beat", 1),
+        ("Institutional Investors Increase {s} Holdings", 1),
+        ("{s} Rallies After Record Quarterly Revenue", 1),
+        ("{s} Faces Headwinds Amid Market Uncertainty", -1),
+        ("{s} Shares Slump as Guidance Disappoints", -1),
+        ("Regulators Open Probe Into {s} Accounting", -1),
+        ("Technical Analysis: {s} Trading Near Key Support Levels", 0),
+        ("{s} to Present at Industry Conference Next Week", 0),
+        ("What Options Traders Expect From {s} This Month", 0),
+    )
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def _seed(self, *parts) -> int:
+        digest = hashlib.blake2b('|'.join(map(str, (self.seed,) + parts)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def params(self, symbol: str) -> Tuple[float, float, float]:
+        """(base price, daily drift, daily volatility) for a symbol"""
+        rng = np.random.default_rng(self._seed(symbol, 'params'))
+        base = self.BASE_PRICES.get(symbol.split('-')[0], float(np.exp(rng.uniform(np.log(5), np.log(500)))))
+        return base, float(rng.normal(0.0002, 0.0003)), float(rng.uniform(0.008, 0.03))
+
+    def _block_totals(self, symbol: str, seconds: int, n_blocks: int, mu: float, sigma: float) -> np.ndarray:
+        # One draw per block since ORIGIN (a few thousand even for 1m bars); a longer
+        # sequence from the same seed starts with the same values
+        rng = np.random.default_rng(self._seed(symbol, seconds, 'blocks'))
+        return rng.normal(mu * self.BLOCK, sigma * np.sqrt(self.BLOCK), n_blocks)
+
+    def bars(self, symbol: str, interval: str = DAILY, n_bars: Optional[int] = None,
+             period: Optional[str] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        yfinance-shaped OHLCV frame (UTC DatetimeIndex named Date/Datetime) of the
+        bars ending at `end` (default now); length from n_bars, else from period
+        """
+        seconds = interval_seconds(interval)
+        end = end or pd.Timestamp.now(tz='UTC')
+        last = int((end - self.ORIGIN).total_seconds() // seconds) - 1        # last completed bar
+        if n_bars is None:
+            days = min(period_days(period or '2y'), self.MAX_DAYS)
+            n_bars = max(1, int(days * 86400 // seconds))
+        first = max(0, last - n_bars + 1)
+        if last < first:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+        base, mu_day, sigma_day = self.params(symbol)
+        scale = seconds / 86400
+        mu, sigma = mu_day * scale, sigma_day * np.sqrt(scale)
+        b0, b1 = first // self.BLOCK, last // self.BLOCK
+        anchor = int((self.ANCHOR - self.ORIGIN).total_seconds() // seconds) // self.BLOCK
+        totals = self._block_totals(symbol, seconds, max(b1, anchor) + 1, mu, sigma)
+        level = np.log(base) + totals[:b0].sum() - totals[:anchor].sum()
+
+        returns, wicks, volumes = [], [], []
+        for b in range(b0, b1 + 1):
+            rng = np.random.default_rng(self._seed(symbol, seconds, b))
+            r = rng.normal(mu, sigma, self.BLOCK)
+            returns.append(r - r.mean() + totals[b] / self.BLOCK)
+            wicks.append(np.abs(rng.normal(0, sigma * 0.5, (2, self.BLOCK))))
+            volumes.append(rng.lognormal(np.log(2e7 * max(scale, 1 / 390)), 0.4, self.BLOCK))
+        lo, hi = first - b0 * self.BLOCK, last - b0 * self.BLOCK + 1
+        log_close = level + np.cumsum(np.concatenate(returns))
+        close = np.exp(log_close[lo:hi])
+        opens = np.exp(np.concatenate(([level], log_close[:-1]))[lo:hi])
+        wick = np.concatenate(wicks, axis=1)[:, lo:hi]
+        index = self.ORIGIN + pd.to_timedelta(np.arange(first, last + 1) * seconds, unit='s')
+        return pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, close) * (1 + wick[0]),
+            'Low': np.minimum(opens, close) * (1 - wick[1]),
+            'Close': close,
+            'Volume': np.concatenate(volumes)[lo:hi].round(),
+        }, index=pd.DatetimeIndex(index, name='Date' if interval == DAILY else 'Datetime'))
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        rng = np.random.default_rng(self._seed(symbol, 'info'))
+        base, _, _ = self.params(symbol)
+        pe = float(rng.uniform(8, 60))
+        return {
+            'symbol': symbol,
+            'longName': f"{symbol} Synthetic Corp.",
+            'sector': self.SECTORS[int(rng.integers(len(self.SECTORS)))],
+            'industry': 'Synthetic',
+            'currentPrice': round(base, 2),
+            'marketCap': int(base * rng.uniform(1e7, 5e9)),
+            'trailingPE': round(pe, 2),
+            'forwardPE': round(pe * rng.uniform(0.7, 1.1), 2),
+            'earningsGrowth': round(float(rng.normal(0.08, 0.15)), 3),
+            'revenueGrowth': round(float(rng.normal(0.06, 0.1)), 3),
+            'profitMargins': round(float(rng.uniform(-0.05, 0.35)), 3),
+            'debtToEquity': round(float(rng.uniform(0, 200)), 1),
+            'dividendYield': round(float(rng.uniform(0, 0.04)), 4),
+        }
+
+    def headlines(self, symbol: str, n: int = 10, bucket: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Headlines for one hour (`bucket`, default now); the same hour always gets the same news"""
+        bucket = int(time.time() // 3600) if bucket is None else bucket
+        rng = np.random.default_rng(self._seed(symbol, 'news', bucket))
+        published = format_datetime(datetime.fromtimestamp(bucket * 3600, tz=timezone.utc))
+        picks = rng.choice(len(self.HEADLINES), size=min(n, len(self.HEADLINES)), replace=False)
+        return [{
+            'title': f"{self.HEADLINES[i][0].format(s=symbol)} ({bucket % 1000}-{j})",
+            'link': f"https://example.com/synthetic/{symbol}/{bucket}/{j}",
+            'published': published,
+        } for j, i in enumerate(picks)]
+
+
+class SyntheticSource:
+    name = 'synthetic'
+    available = True
+    feeds_available = True
+
+    def __init__(self, market: SyntheticMarket):
+        self.market = market
+
+    def history(self, symbol, period, interval, timeout):
+        return self.market.bars(symbol, interval, period=period)
+
+    def download(self, symbols, period, timeout):
+        return pd.concat({s: self.market.bars(s, DAILY, period=period) for s in symbols}, axis=1)
+
+    def info(self, symbol):
+        return self.market.info(symbol)
+
+    def feed(self, url, etag, modified, timeout, symbol=None):
+        # The hour bucket doubles as the etag, so conditional polls get "not modified"
+        bucket = int(time.time() // 3600)
+        if etag == f'"{bucket}"':
+            return None, etag, modified
+        entries = self.market.headlines(symbol or url, bucket=bucket)
+        return SimpleNamespace(entries=entries), f'"{bucket}"', None
+
+
+class MarketDataProvider:
+    """The configured source plus injected latency and errors (replay and synthetic modes only)"""
+
+    def __init__(self, source, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0):
+        self.source = source
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)         # own generator: never the process-wide one
+        self._rng_lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.injected_errors = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'MarketDataProvider':
+        mode = os.getenv('MARKET_DATA_MODE', 'live').lower()
+        if mode not in MODES:
+            logger.warning(f"Unknown MARKET_DATA_MODE '{mode}', using live")
+            mode = 'live'
+        seed = int(os.getenv('MARKET_DATA_SEED', '0'))
+        root = os.getenv('MARKET_DATA_DIR', os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'market_data'))
+        source = {
+            'live': lambda: LiveSource(),
+            'record': lambda: RecordingSource(Recording(root)),
+            'replay': lambda: ReplaySource(Recording(root)),
+            'synthetic': lambda: SyntheticSource(SyntheticMarket(seed)),
+        }[mode]()
+        if mode != 'live':
+            logger.info(f"Market data mode: {mode}")
+        return cls(
+            source,
+            latency_ms=float(os.getenv('MARKET_DATA_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('MARKET_DATA_LATENCY_JITTER_MS', '0')),
+            error_rate=float(os.getenv('MARKET_DATA_ERROR_RATE', '0')),
+            seed=seed,
+        )
+
+    @property
+    def mode(self) -> str:
+        return self.source.name
+
+    @property
+    def available(self) -> bool:
+        """Bars and .info can be fetched (live mode needs yfinance)"""
+        return self.source.available
+
+    @property
+    def feeds_available(self) -> bool:
+        return self.source.feeds_available
+
+    def _call(self, kind: str, fn, *args):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        if self.source.name in ('replay', 'synthetic'):
+            with self._rng_lock:
+                delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.latency_ms else 0.0
+                fail = self._rng.random() < self.error_rate
+            if delay:
+                time.sleep(delay / 1000)
+            if fail:
+                self.injected_errors += 1
+                raise InjectedUpstreamError(f"Injected {kind} failure ({self.source.name} mode)")
+        try:
+            return fn(*args)
+        except RecordingNotFound:
+            self.misses += 1
+            raise
+
+    def history(self, symbol: str, period: str, interval: str = DAILY, timeout: float = 10.0) -> pd.DataFrame:
+        """Bars for one symbol; raises NoBarsReturned when there are none, which breakers do not count"""
+        df = self._call('history', self.source.history, symbol, period, interval, timeout)
+        if df is None or df.empty:
+            raise NoBarsReturned(f"No {interval} bars for {symbol} ({period})")
+        return df
+
+    def download(self, symbols: List[str], period: str, timeout: float = 10.0) -> pd.DataFrame:
+        return self._call('download', self.source.download, symbols, period, timeout)
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        return self._call('info', self.source.info, symbol)
+
+    def feed(self, url: str, etag: Optional[str] = None, modified: Optional[str] = None, timeout: float = 5.0,
+             symbol: Optional[str] = None):
+        """(parsed feed or None if not modified, etag, last-modified); `symbol` names the feed for synthetic news"""
+        return self._call('feed', self.source.feed, url, etag, modified, timeout, symbol)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'mode': self.mode,
+            'calls': dict(self.calls),
+            'latency_ms': self.latency_ms,
+            'error_rate': self.error_rate,
+            'injected_errors': self.injected_errors,
+            'replay_misses': self.misses,
+        }
+        if isinstance(self.source, RecordingSource):
+            stats['recorded'] = self.source.recorded
+        return stats
+
+
+# Global market data provider instance
+market_data = MarketDataProvider.from_env()
+# Shared with the mock fallbacks, which no longer give every symbol the same series
+synthetic_market = SyntheticMarket(int(os.getenv('MARKET_DATA_SEED', '0')))
@@ -0,0 +1,190 @@
+"""
+Vectorized risk engine over cached bar history
+VaR/CVaR (historical + parametric), drawdown, realized volatility and beta
+"""
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import NormalDist
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from .price_predictor import predictor
+
+logger = logging.getLogger(__name__)
+
+
+def bar_days(df: pd.DataFrame) -> np.ndarray:
+    """Bar dates as timezone-naive datetime64[D], for aligning series across symbols"""
+    dates = df['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_localize(None)
+    return dates.to_numpy().astype('datetime64[D]')
+
+
+@dataclass
+class RiskState:
+    """Per-symbol running state, extended in place as new bars arrive"""
+    days: np.ndarray                  # bar dates as datetime64[D]
+    closes: np.ndarray
+    returns: np.ndarray               # simple returns, len(closes) - 1
+    cum_ret: np.ndarray               # prefix sums of returns (leading 0)
+    cum_ret_sq: np.ndarray            # prefix sums of squared returns
+    peak: float
+    max_drawdown: float
+
+
+class RiskEngine:
+    """Computes risk figures per symbol; rolling sums are kept incrementally"""
+
+    VOL_WINDOWS = (7, 30, 90)
+    VAR_WINDOW = 252
+    CONFIDENCE_LEVELS = (0.95, 0.99)
+    DEFAULT_BENCHMARK = 'SPY'
+    CRYPTO_BENCHMARK = 'BTC-USD'
+
+    def __init__(self):
+        self._states: Dict[str, RiskState] = {}
+
+    def update(self, symbol: str, df: pd.DataFrame) -> RiskState:
+        """Fold new bars into the symbol's state, rebuilding only if history diverged"""
+        days = bar_days(df)
+        closes = df['close'].to_numpy(dtype=float)
+        state = self._states.get(symbol)
+
+        if state is not None and len(state.days):
+            if days[-1] == state.days[-1] and np.isclose(closes[-1], state.closes[-1]):
+                return state
+
+            # Append only the bars after the last one we have, if the overlap agrees
+            pos = np.searchsorted(days, state.days[-1])
+            if (pos < len(days) - 1 and days[pos] == state.days[-1]
+                    and np.isclose(closes[pos], state.closes[-1])):
+                self._append(state, days[pos + 1:], closes[pos + 1:])
+                return state
+
+        state = self._build(days, closes)
+        self._states[symbol] = state
+        return state
+
+    def _build(self, days: np.ndarray, closes: np.ndarray) -> RiskState:
+        returns = closes[1:] / closes[:-1] - 1
+        peaks = np.maximum.accumulate(closes)
+        drawdowns = closes / peaks - 1
+        return RiskState(
+            days=days,
+            closes=closes,
+            returns=returns,
+            cum_ret=np.concatenate(([0.0], np.cumsum(returns))),
+            cum_ret_sq=np.concatenate(([0.0], np.cumsum(returns ** 2))),
+            peak=float(peaks[-1]) if len(peaks) else 0.0,
+            max_drawdown=float(drawdowns.min()) if len(drawdowns) else 0.0,
+        )
+
+    def _append(self, state: RiskState, days: np.ndarray, closes: np.ndarray):
+        prev = np.concatenate(([state.closes[-1]], closes))
+        returns = prev[1:] / prev[:-1] - 1
+        peaks = np.maximum.accumulate(np.concatenate(([state.peak], closes)))[1:]
+
+        state.days = np.concatenate((state.days, days))
+        state.closes = np.concatenate((state.closes, closes))
+        state.returns = np.concatenate((state.returns, returns))
+        state.cum_ret = np.concatenate((state.cum_ret, state.cum_ret[-1] + np.cumsum(returns)))
+        state.cum_ret_sq = np.concatenate((state.cum_ret_sq, state.cum_ret_sq[-1] + np.cumsum(returns ** 2)))
+        state.peak = float(peaks[-1])
+        state.max_drawdown = min(state.max_drawdown, float((closes / peaks - 1).min()))
+
+    @staticmethod
+    def _window_moments(state: RiskState, window: int) -> Tuple[float, float]:
+        """Mean and sample std of the last `window` returns in O(1) from prefix sums"""
+        n = min(window, len(state.returns))
+        if n < 2:
+            return 0.0, 0.0
+        s1 = state.cum_ret[-1] - state.cum_ret[-1 - n]
+        s2 = state.cum_ret_sq[-1] - state.cum_ret_sq[-1 - n]
+        mean = s1 / n
+        var = max((s2 - n * mean ** 2) / (n - 1), 0.0)
+        return float(mean), float(np.sqrt(var))
+
+    def _var_cvar(self, state: RiskState) -> Dict[str, Dict[str, float]]:
+        tail = state.returns[-self.VAR_WINDOW:]
+        mean, std = self._window_moments(state, self.VAR_WINDOW)
+        alphas = np.array([1 - c for c in self.CONFIDENCE_LEVELS])
+
+        var, cvar = {}, {}
+        if len(tail):
+            hist_q = np.quantile(tail, alphas)
+            # CVaR: mean of returns at or below each quantile, all levels at once
+            below = tail[None, :] <= hist_q[:, None]
+            hist_es = (tail[None, :] * below).sum(axis=1) / np.maximum(below.sum(axis=1), 1)
+        else:
+            hist_q = hist_es = np.zeros_like(alphas)
+
+        for i, (conf, alpha) in enumerate(zip(self.CONFIDENCE_LEVELS, alphas)):
+            label = str(int(conf * 100))
+            z = NormalDist().inv_cdf(alpha)
+            var[f'historical_{label}'] = round(float(-hist_q[i]) * 100, 2)
+            cvar[f'historical_{label}'] = round(float(-hist_es[i]) * 100, 2)
+            var[f'parametric_{label}'] = round(-(mean + z * std) * 100, 2)
+            cvar[f'parametric_{label}'] = round(-(mean - std * NormalDist().pdf(z) / alpha) * 100, 2)
+        return {'var': var, 'cvar': cvar}
+
+    def _beta(self, state: RiskState, bench: RiskState) -> Tuple[Optional[float], Optional[float]]:
+        """Beta and correlation on return days both series share (last VAR_WINDOW)"""
+        _, idx_a, idx_b = np.intersect1d(state.days[1:], bench.days[1:], return_indices=True)
+        idx_a, idx_b = idx_a[-self.VAR_WINDOW:], idx_b[-self.VAR_WINDOW:]
+        if len(idx_a) < 20:
+            return None, None
+        a, b = state.returns[idx_a], bench.returns[idx_b]
+        cov = np.cov(a, b)
+        if cov[1, 1] <= 0:
+            return None, None
+        beta = cov[0, 1] / cov[1, 1]
+        corr = cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1]) if cov[0, 0] > 0 else 0.0
+        return round(float(beta), 3), round(float(corr), 3)
+
+    def analyze(self, symbol: str, benchmark: Optional[str] = None) -> Dict[str, Any]:
+        """Full risk report for a symbol, from the predictor's cached bars"""
+        normalized = predictor.normalize_symbol(symbol)
+        is_crypto = normalized.endswith('-USD')
+        benchmark = predictor.normalize_symbol(benchmark) if benchmark else (
+            self.CRYPTO_BENCHMARK if is_crypto else self.DEFAULT_BENCHMARK)
+        periods_per_year = 365 if is_crypto else 252
+
+        df = predictor.fetch_data(normalized)
+        if df is None or len(df) < 3:
+            raise ValueError(f"Insufficient history for {symbol}")
+        state = self.update(normalized, df)
+
+        volatility = {}
+        for window in self.VOL_WINDOWS:
+            _, std = self._window_moments(state, window)
+            volatility[f'{window}d'] = round(std * np.sqrt(periods_per_year) * 100, 2)
+
+        beta = correlation = None
+        if benchmark == normalized:
+            beta, correlation = 1.0, 1.0
+        else:
+            bench_df = predictor.fetch_data(benchmark)
+            if bench_df is not None and len(bench_df) > 2:
+                beta, correlation = self._beta(state, self.update(benchmark, bench_df))
+
+        return {
+            'symbol': str(symbol),
+            'benchmark': benchmark,
+            'observations': int(len(state.returns)),
+            'volatility': volatility,
+            **self._var_cvar(state),
+            'max_drawdown': round(-state.max_drawdown * 100, 2),
+            'current_drawdown': round(-(state.closes[-1] / state.peak - 1) * 100, 2),
+            'beta': beta,
+            'correlation': correlation,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# Global risk engine instance
+risk_engine = RiskEngine()
@@ -0,0 +1,235 @@
+"""
+Stock/crypto screener over the latest indicator row of every symbol
+Columnar in-memory table + safe vectorized filter/sort expressions
+"""
+import os
+import ast
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable
+import logging
+
+from .price_predictor import predictor
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_UNIVERSE = (
+    'AAPL,MSFT,GOOGL,AMZN,META,NVDA,TSLA,AMD,NFLX,INTC,ORCL,CRM,ADBE,JPM,BAC,GS,V,MA,'
+    'WMT,KO,PEP,DIS,NKE,XOM,CVX,PFE,JNJ,UNH,SPY,QQQ,BTC,ETH,SOL'
+)
+
+
+class ScreenerTable:
+    """One float64 array per column, one row per symbol; rows are updated in place"""
+
+    COLUMNS = (
+        'close', 'volume', 'returns', 'rsi', 'macd', 'macd_signal', 'macd_hist',
+        'ma_7', 'ma_14', 'ma_30', 'ma_50', 'ma_ratio_7', 'ma_ratio_30',
+        'bb_position', 'volatility_7', 'volatility_30', 'atr', 'volume_ratio',
+    )
+
+    def __init__(self, capacity: int = 256):
+        self._lock = threading.Lock()
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.data = {c: np.full(capacity, np.nan) for c in self.COLUMNS}
+        self.updated_at = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _grow(self):
+        capacity = len(self.updated_at) * 2
+        for c in self.COLUMNS:
+            self.data[c] = np.concatenate((self.data[c], np.full(capacity - len(self.data[c]), np.nan)))
+        self.updated_at = np.concatenate((self.updated_at, np.zeros(capacity - len(self.updated_at))))
+
+    def upsert(self, symbol: str, row: pd.Series):
+        """Write the latest indicator row for a symbol (O(columns))"""
+        with self._lock:
+            i = self.index.get(symbol)
+            if i is None:
+                if len(self.symbols) == len(self.updated_at):
+                    self._grow()
+                i = len(self.symbols)
+                self.symbols.append(symbol)
+                self.index[symbol] = i
+            for c in self.COLUMNS:
+                value = row.get(c, np.nan)
+                self.data[c][i] = float(value) if value is not None else np.nan
+            self.updated_at[i] = time.time()
+
+    def snapshot(self):
+        """Consistent view of the live rows (arrays are sliced, not copied)"""
+        with self._lock:
+            n = len(self.symbols)
+            return list(self.symbols), {c: a[:n] for c, a in self.data.items()}, self.updated_at[:n].copy()
+
+
+_ALLOWED_BINOPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_ALLOWED_CMPOPS = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+                   ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal}
+
+
+@lru_cache(maxsize=256)
+def compile_filter(expression: str) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """
+    Compile e.g. "rsi < 30 and close > ma_30" into a function of the column
+    arrays. Only column names, numbers, + - * /, comparisons and
+    and/or/not are accepted; anything else raises ValueError.
+    """
+    try:
+        tree = ast.parse(expression, mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter expression: {e.msg}")
+
+    def build(node):
+        if isinstance(node, ast.BoolOp):
+            parts = [build(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda cols: combine.reduce([p(cols) for p in parts])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = build(node.operand)
+            return lambda cols: np.logical_not(inner(cols))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            inner = build(node.operand)
+            return lambda cols: np.negative(inner(cols))
+        if isinstance(node, ast.Compare):
+            # Chained comparisons: a < b < c  ->  (a < b) & (b < c)
+            operands = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = []
+            for op in node.ops:
+                if type(op) not in _ALLOWED_CMPOPS:
+                    raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+                ops.append(_ALLOWED_CMPOPS[type(op)])
+
+            def compare(cols):
+                values = [o(cols) for o in operands]
+                with np.errstate(invalid='ignore'):
+                    return np.logical_and.reduce([op(values[k], values[k + 1]) for k, op in enumerate(ops)])
+            return compare
+        if isinstance(node, ast.BinOp) and type(node.op) in _ALLOWED_BINOPS:
+            left, right, op = build(node.left), build(node.right), _ALLOWED_BINOPS[type(node.op)]
+
+            def binop(cols):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    return op(left(cols), right(cols))
+            return binop
+        if isinstance(node, ast.Name):
+            if node.id not in ScreenerTable.COLUMNS:
+                raise ValueError(f"Unknown column: {node.id}")
+            name = node.id
+            return lambda cols: cols[name]
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda cols: value
+        raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
+    fn = build(tree)
+
+    def evaluate(cols: Dict[str, np.ndarray]) -> np.ndarray:
+        n = len(next(iter(cols.values())))
+        return np.broadcast_to(np.asarray(fn(cols), dtype=bool), (n,))
+    return evaluate
+
+
+class Screener:
+    """Keeps the table fresh for a symbol universe and answers filter/sort queries"""
+
+    MAX_AGE = float(os.getenv('SCREENER_MAX_AGE', '300'))
+    MAX_LIMIT = 1000
+
+    def __init__(self, universe: Optional[List[str]] = None):
+        self.table = ScreenerTable()
+        self.universe = universe or [
+            s.strip().upper() for s in os.getenv('SCREENER_UNIVERSE', DEFAULT_UNIVERSE).split(',') if s.strip()
+        ]
+        self._refresh_lock = threading.Lock()
+        self.last_refresh: Optional[float] = None
+        # Every feature computation the predictor does also refreshes its row
+        predictor.add_feature_listener(self.on_features)
+
+    def on_features(self, symbol: str, df_features: pd.DataFrame):
+        if df_features is None or df_features.empty:
+            return
+        self.table.upsert(predictor.normalize_symbol(symbol), df_features.iloc[-1])
+
+    def refresh(self, symbols: Optional[List[str]] = None) -> int:
+        """
+        Recompute rows for symbols (default: the universe); bars come from the shared cache.
+        Symbols whose download failed keep their previous row rather than one built from fallback bars.
+        """
+        symbols = symbols or self.universe
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0  # a refresh is already running
+        try:
+            frames = predictor.fetch_many(symbols, period="2y")
+            for symbol, df in frames.items():
+                if df is not None and len(df) > 0 and not df.attrs.get('fallback'):
+                    self.on_features(symbol, predictor.get_features(symbol, df))
+            self.last_refresh = time.time()
+            return len(frames)
+        finally:
+            self._refresh_lock.release()
+
+    def is_stale(self) -> bool:
+        return self.last_refresh is None or time.time() - self.last_refresh > self.MAX_AGE
+
+    @staticmethod
+    def _sort_order(sort: str, cols: Dict[str, np.ndarray], candidates: np.ndarray) -> np.ndarray:
+        """'-rsi,volume' -> rsi descending, then volume ascending; NaNs sort last"""
+        keys = []
+        for part in reversed([p.strip() for p in sort.split(',') if p.strip()]):
+            descending = part.startswith('-')
+            name = part.lstrip('+-')
+            if name not in ScreenerTable.COLUMNS:
+                raise ValueError(f"Unknown sort column: {name}")
+            values = cols[name][candidates]
+            values = np.where(np.isnan(values), np.inf, -values if descending else values)
+            keys.append(values)
+        return candidates[np.lexsort(keys)] if keys else candidates
+
+    def screen(self, filter_expr: Optional[str] = None, sort: Optional[str] = None,
+               limit: int = 50, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Evaluate filter and sort over all rows with NumPy, return the top `limit` rows"""
+        started = time.perf_counter()
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        columns = columns or list(ScreenerTable.COLUMNS)
+        unknown = [c for c in columns if c not in ScreenerTable.COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+        symbols, cols, updated_at = self.table.snapshot()
+        if filter_expr:
+            mask = compile_filter(filter_expr.strip())(cols) if symbols else np.zeros(0, dtype=bool)
+            candidates = np.flatnonzero(mask)
+        else:
+            candidates = np.arange(len(symbols))
+        if sort:
+            candidates = self._sort_order(sort, cols, candidates)
+
+        results = []
+        for i in candidates[:limit]:
+            row = {'symbol': symbols[i]}
+            for c in columns:
+                value = cols[c][i]
+                row[c] = None if np.isnan(value) else round(float(value), 4)
+            results.append(row)
+
+        return {
+            'count': int(len(candidates)),
+            'universe_size': len(symbols),
+            'results': results,
+            'oldest_row_age_seconds': round(time.time() - float(updated_at.min()), 1) if len(updated_at) else None,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# Global screener instance
+screener = Screener()
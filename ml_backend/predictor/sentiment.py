@@ -3,15 +3,17 @@ Sentiment Analysis for Financial News
 Uses keyword-based and optional transformer models
 """
 import os
-import re
-from typing import Dict, List, Any
+import time
+import sqlite3
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import logging
 
-try:
-    import feedparser
-except ImportError:
-    feedparser = None
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from .providers import market_data, synthetic_market
+from .keyword_scorer import KeywordScorer
+from .sentiment_model import model_sentiment
+from .article_store import ArticleStore, article_id
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,129 +22,258 @@ logger = logging.getLogger(__name__)
 class SentimentAnalyzer:
     """Analyze sentiment of financial news and text"""
     
-    # Keyword-based sentiment words
+    # Keyword-based sentiment words (base forms; inflections are matched by the scorer)
     POSITIVE_WORDS = {
         'surge', 'jump', 'rally', 'gain', 'rise', 'bull', 'bullish', 'growth',
         'profit', 'beat', 'exceed', 'outperform', 'buy', 'upgrade', 'strong',
         'positive', 'optimistic', 'recover', 'boom', 'soar', 'climb', 'advance',
-        'breakthrough', 'innovation', 'success', 'record', 'high', 'best'
+        'breakthrough', 'innovation', 'success', 'record', 'high', 'best',
+        'rebound', 'upbeat', 'surpass', 'recovery', 'momentum',
     }
     
     NEGATIVE_WORDS = {
         'crash', 'plunge', 'fall', 'drop', 'decline', 'bear', 'bearish', 'loss',
         'miss', 'fail', 'underperform', 'sell', 'downgrade', 'weak', 'negative',
         'pessimistic', 'recession', 'bust', 'sink', 'slide', 'retreat', 'warning',
-        'concern', 'risk', 'fear', 'uncertain', 'volatile', 'worst', 'low'
+        'concern', 'risk', 'fear', 'uncertain', 'volatile', 'worst', 'low',
+        'tumble', 'slump', 'plummet', 'downbeat', 'headwind', 'uncertainty', 'layoff', 'lawsuit',
     }
     
+    POSITIVE_PHRASES = [
+        'beat estimates', 'beat expectations', 'better than expected', 'raise guidance',
+        'raise price target', 'all time high', 'record high', 'short squeeze',
+    ]
+    
+    NEGATIVE_PHRASES = [
+        'miss estimates', 'miss expectations', 'worse than expected', 'cut guidance',
+        'lower guidance', 'cut price target', 'lower price target', 'profit warning',
+        'under pressure', '52 week low',
+    ]
+    
     # RSS feed sources (read from env, with defaults)
     NEWS_FEEDS = {
         'yahoo': os.getenv('YAHOO_RSS_URL', 'https://feeds.finance.yahoo.com/rss/2.0/headline?s={symbol}&region=US&lang=en-US'),
         'seeking_alpha': os.getenv('SEEKING_ALPHA_RSS_URL', 'https://seekingalpha.com/api/sa/combined/{symbol}.xml'),
     }
     
+    RSS_TIMEOUT = float(os.getenv('RSS_TIMEOUT', '5'))
+    ARTICLE_STORE_PATH = os.getenv(
+        'ARTICLE_STORE_PATH',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'articles.db'),
+    )
+    # Aggregates older than this trigger a feed fetch before being served
+    NEWS_REFRESH_SECONDS = float(os.getenv('NEWS_REFRESH_SECONDS', '300'))
+    
     def __init__(self):
         self.cache = {}
+        self.scorer = KeywordScorer(self.POSITIVE_WORDS, self.NEGATIVE_WORDS,
+                                    self.POSITIVE_PHRASES, self.NEGATIVE_PHRASES)
+        # Transformer backend; scores alongside the keywords when SENTIMENT_MODEL_DIR is set
+        self.model_scorer = model_sentiment
+        # Last non-empty article list per symbol, served while every feed is failing
+        self._last_good: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            self.store = ArticleStore(self.ARTICLE_STORE_PATH)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Article store disabled, cannot use {self.ARTICLE_STORE_PATH}: {e}")
+            self.store = None
+        # Set by the background news ingestor while it runs (predictor/news_ingestor.py)
+        self.ingestor = None
+    
+    @staticmethod
+    def news_symbol(symbol: str) -> str:
+        """Symbol as used by the RSS feeds and the article store (BTC-USD -> BTC)"""
+        return symbol.upper().replace('/', '').replace('-USD', '')
     
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """Analyze sentiment of a text string"""
-        if not text:
-            return {'score': 0, 'label': 'NEUTRAL', 'confidence': 0.5}
-        
-        text_lower = text.lower()
-        words = set(re.findall(r'\b\w+\b', text_lower))
-        
-        positive_count = len(words & self.POSITIVE_WORDS)
-        negative_count = len(words & self.NEGATIVE_WORDS)
-        total_sentiment_words = positive_count + negative_count
-        
-        if total_sentiment_words == 0:
-            return {'score': 0, 'label': 'NEUTRAL', 'confidence': 0.5}
-        
-        # Score from -1 (very negative) to +1 (very positive)
-        score = (positive_count - negative_count) / max(total_sentiment_words, 1)
-        
-        # Normalize confidence based on how many sentiment words found
-        confidence = min(0.5 + (total_sentiment_words * 0.1), 0.95)
-        
-        if score > 0.2:
-            label = 'POSITIVE'
-        elif score < -0.2:
-            label = 'NEGATIVE'
-        else:
-            label = 'NEUTRAL'
-        
-        return {
-            'score': round(score, 3),
-            'label': label,
-            'confidence': round(confidence, 3),
-            'positive_words': positive_count,
-            'negative_words': negative_count
-        }
+        return self.scorer.score(text)
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze many texts at once (same schema as analyze_text, in input order)"""
+        return self.scorer.score_batch(texts)
+    
+    def _score_articles(self, articles: List[Dict[str, Any]]):
+        """Add transformer scores (model_sentiment / model_score) to articles in one batched call"""
+        if not self.model_scorer.available or not articles:
+            return
+        try:
+            scores = self.model_scorer.score_batch([a['title'] for a in articles])
+        except Exception as e:
+            logger.warning(f"Transformer sentiment failed, keeping keyword scores: {e}")
+            return
+        for article, result in zip(articles, scores):
+            article['model_sentiment'] = result['label']
+            article['model_score'] = result['score']
     
     def fetch_news(self, symbol: str, max_items: int = 10) -> List[Dict[str, Any]]:
         """Fetch news articles for a symbol"""
-        if feedparser is None:
+        normalized_symbol = self.news_symbol(symbol)
+        
+        # With background ingestion running, requests only read the local store
+        if self.ingestor is not None and self.ingestor.running and self.store:
+            self.ingestor.touch(normalized_symbol)
+            articles = self.store.recent(normalized_symbol, max_items)
+            if not articles and self.ingestor.wait_first_poll(normalized_symbol):
+                articles = self.store.recent(normalized_symbol, max_items)
+            return articles or self._last_good.get(normalized_symbol, [])[:max_items] \
+                or self._generate_mock_news(symbol)
+        
+        if not market_data.feeds_available:
             logger.warning("feedparser not installed, using mock news")
             return self._generate_mock_news(symbol)
         
         articles = []
-        normalized_symbol = symbol.upper().replace('/', '').replace('-USD', '')
-        
-        for source, url_template in self.NEWS_FEEDS.items():
+        seen = set()
+        for source in self.NEWS_FEEDS:
             try:
-                url = url_template.format(symbol=normalized_symbol)
-                feed = feedparser.parse(url)
-                
-                for entry in feed.entries[:max_items]:
-                    title = entry.get('title', '')
-                    sentiment = self.analyze_text(title)
-                    
-                    articles.append({
-                        'title': title,
-                        'source': source.replace('_', ' ').title(),
-                        'link': entry.get('link', ''),
-                        'published': entry.get('published', ''),
-                        'sentiment': sentiment['label'],
-                        'sentiment_score': sentiment['score']
-                    })
+                polled, _, _ = self.poll_feed(normalized_symbol, source, max_items)
+            except CircuitOpenError as e:
+                logger.debug(f"Skipping {source}: {e}")
+                continue
             except Exception as e:
                 logger.warning(f"Failed to fetch from {source}: {e}")
+                continue
+            for article in polled or []:
+                if article['id'] not in seen:  # the same headline syndicated by another feed
+                    seen.add(article['id'])
+                    articles.append(article)
         
-        # If no articles found, return mock data
+        # If no articles found, fall back to the last good fetch, then mock data
         if not articles:
+            if normalized_symbol in self._last_good:
+                return self._last_good[normalized_symbol][:max_items]
             return self._generate_mock_news(symbol)
         
+        self.ingest_articles(normalized_symbol, articles)
+        for article in articles:
+            article.pop('id', None)
+        self._last_good[normalized_symbol] = articles
         return articles[:max_items]
     
-    def _generate_mock_news(self, symbol: str) -> List[Dict[str, Any]]:
-        """Generate mock news for testing"""
-        mock_headlines = [
-            (f"{symbol} Shows Strong Momentum as Bulls Take Control", 'POSITIVE'),
-            (f"Analysts Upgrade {symbol} Price Target Following Earnings Beat", 'POSITIVE'),
-            (f"{symbol} Faces Headwinds Amid Market Uncertainty", 'NEGATIVE'),
-            (f"Technical Analysis: {symbol} Trading Near Key Support Levels", 'NEUTRAL'),
-            (f"Institutional Investors Increase {symbol} Holdings", 'POSITIVE'),
-        ]
+    def poll_feed(self, symbol: str, source: str, max_items: int = 20, etag: Optional[str] = None,
+                  modified: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]:
+        """
+        One conditional download of a feed, through its circuit breaker.
+        Returns (unscored articles or None if unchanged since etag/modified, etag, modified).
+        """
+        if not market_data.feeds_available:
+            raise RuntimeError("feedparser not installed")
+        url = self.NEWS_FEEDS[source].format(symbol=symbol)
+        feed, etag, modified = get_breaker(f"rss_{source}", provider='rss').call(
+            market_data.feed, url, etag, modified, self.RSS_TIMEOUT, symbol
+        )
+        if feed is None:
+            return None, etag, modified
         
         articles = []
-        for i, (headline, sentiment) in enumerate(mock_headlines):
-            score = 0.5 if sentiment == 'POSITIVE' else (-0.5 if sentiment == 'NEGATIVE' else 0)
-            articles.append({
-                'title': headline,
-                'source': 'Market Analysis',
-                'link': f'https://example.com/news/{i}',
-                'published': datetime.now().isoformat(),
-                'sentiment': sentiment,
-                'sentiment_score': score
-            })
+        for entry in feed.entries[:max_items]:
+            title = entry.get('title', '')
+            if title:
+                articles.append({
+                    'id': article_id(title),
+                    'title': title,
+                    'source': source.replace('_', ' ').title(),
+                    'link': entry.get('link', ''),
+                    'published': entry.get('published', ''),
+                })
+        return articles, etag, modified
+    
+    def ingest_articles(self, symbol: str, articles: List[Dict[str, Any]]) -> int:
+        """
+        Reuse stored scores, score only unseen headlines (one batch) and ingest them.
+        Returns how many articles were new to the store.
+        """
+        known = self.store.known_ids(symbol, [a['id'] for a in articles]) if self.store else {}
+        new = []
+        for article in articles:
+            stored = known.get(article['id'])
+            if stored is None:
+                new.append(article)
+                continue
+            article['sentiment'] = stored['sentiment']
+            article['sentiment_score'] = stored['sentiment_score']
+            if stored['model_score'] is not None:
+                article['model_sentiment'] = stored['model_sentiment']
+                article['model_score'] = stored['model_score']
         
+        for article, sentiment in zip(new, self.analyze_batch([a['title'] for a in new])):
+            article['sentiment'] = sentiment['label']
+            article['sentiment_score'] = sentiment['score']
+        self._score_articles(new)
+        
+        if not self.store:
+            return len(new)
+        try:
+            # Known articles are ingested too, so the refresh time is recorded
+            return self.store.ingest(symbol, articles)
+        except sqlite3.Error as e:
+            logger.warning(f"Article ingest failed for {symbol}: {e}")
+            return 0
+    
+    def _generate_mock_news(self, symbol: str) -> List[Dict[str, Any]]:
+        """Synthetic headlines for this symbol and hour, keyword-scored"""
+        articles = synthetic_market.headlines(self.news_symbol(symbol), n=5)
+        for article, sentiment in zip(articles, self.analyze_batch([a['title'] for a in articles])):
+            article['source'] = 'Market Analysis'
+            article['sentiment'] = sentiment['label']
+            article['sentiment_score'] = sentiment['score']
         return articles
     
     def get_aggregate_sentiment(self, symbol: str) -> Dict[str, Any]:
-        """Get aggregate sentiment score for a symbol"""
-        articles = self.fetch_news(symbol)
+        """
+        Get aggregate sentiment score for a symbol: the exponentially time-decayed
+        mean over every stored article, read in O(1) from the article store
+        """
+        normalized_symbol = self.news_symbol(symbol)
+        background = self.ingestor is not None and self.ingestor.running
+        if background:
+            self.ingestor.touch(normalized_symbol)
+        aggregate = self.store.aggregate(normalized_symbol) if self.store else None
+        if aggregate is None or (not background and
+                                 time.time() - aggregate['last_ingest_ts'] > self.NEWS_REFRESH_SECONDS):
+            articles = self.fetch_news(symbol)
+            aggregate = self.store.aggregate(normalized_symbol) if self.store else None
+            if aggregate is None:
+                # Nothing stored (mock news or no store): flat mean over what we have
+                return self._aggregate_articles(symbol, articles)
         
+        score = aggregate['score']
+        count = aggregate['article_count']
+        return {
+            'symbol': symbol,
+            'overall_sentiment': self._overall_label(score),
+            'overall_score': round(score, 3),
+            'confidence': round(min(0.5 + aggregate['effective_count'] * 0.05, 0.9), 2),
+            'article_count': count,
+            'effective_article_count': round(aggregate['effective_count'], 2),
+            'positive_count': aggregate['positive_count'],
+            'negative_count': aggregate['negative_count'],
+            'neutral_count': aggregate['neutral_count'],
+            'model_score': round(aggregate['model_score'], 3) if aggregate['model_score'] is not None else None,
+            'half_life_hours': self.store.HALF_LIFE_HOURS,
+            'freshness_lag_seconds': self.freshness_lag(normalized_symbol, aggregate['last_ingest_ts']),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def freshness_lag(self, symbol: str, last_ingest_ts: Optional[float] = None) -> Optional[float]:
+        """Seconds since this symbol's feeds were last polled successfully"""
+        if self.ingestor is not None and self.ingestor.running:
+            return self.ingestor.freshness_lag(symbol)
+        if last_ingest_ts is None:
+            return None
+        return round(time.time() - last_ingest_ts, 1)
+    
+    @staticmethod
+    def _overall_label(score: float) -> str:
+        if score > 0.15:
+            return 'POSITIVE'
+        if score < -0.15:
+            return 'NEGATIVE'
+        return 'NEUTRAL'
+    
+    def _aggregate_articles(self, symbol: str, articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Flat mean over an article list"""
         if not articles:
             return {
                 'symbol': symbol,
@@ -154,23 +285,19 @@ class SentimentAnalyzer:
         
         scores = [a['sentiment_score'] for a in articles]
         avg_score = sum(scores) / len(scores)
-        
-        if avg_score > 0.15:
-            overall = 'POSITIVE'
-        elif avg_score < -0.15:
-            overall = 'NEGATIVE'
-        else:
-            overall = 'NEUTRAL'
+        model_scores = [a['model_score'] for a in articles if 'model_score' in a]
+        model_score = sum(model_scores) / len(model_scores) if model_scores else None
         
         return {
             'symbol': symbol,
-            'overall_sentiment': overall,
+            'overall_sentiment': self._overall_label(avg_score),
             'overall_score': round(avg_score, 3),
             'confidence': round(min(0.5 + len(articles) * 0.05, 0.9), 2),
             'article_count': len(articles),
             'positive_count': sum(1 for a in articles if a['sentiment'] == 'POSITIVE'),
             'negative_count': sum(1 for a in articles if a['sentiment'] == 'NEGATIVE'),
             'neutral_count': sum(1 for a in articles if a['sentiment'] == 'NEUTRAL'),
+            'model_score': round(model_score, 3) if model_score is not None else None,
             'timestamp': datetime.now().isoformat()
         }
 
@@ -0,0 +1,224 @@
+"""
+Transformer sentiment backend (e.g. an ONNX export of FinBERT) with dynamic micro-batching
+Loaded from a local directory; CPU inference through onnxruntime
+"""
+import os
+import json
+import queue
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import logging
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+
+class TransformerSentimentModel:
+    """
+    Expects in model_dir:
+      model_quantized.onnx or model.onnx   sequence-classification graph returning logits
+      tokenizer.json                       Hugging Face fast tokenizer
+      config.json (optional)               id2label, e.g. {"0": "positive", "1": "negative", "2": "neutral"}
+    """
+
+    MODEL_FILES = ('model_quantized.onnx', 'model.onnx')
+    MAX_LENGTH = int(os.getenv('SENTIMENT_MODEL_MAX_LENGTH', '64'))   # headlines are short
+
+    def __init__(self, model_dir: str):
+        if ort is None or Tokenizer is None:
+            raise RuntimeError("onnxruntime and tokenizers are required for the transformer backend")
+        model_path = next((os.path.join(model_dir, f) for f in self.MODEL_FILES
+                           if os.path.exists(os.path.join(model_dir, f))), None)
+        if model_path is None:
+            raise FileNotFoundError(f"No ONNX model in {model_dir}")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(os.getenv('SENTIMENT_MODEL_THREADS', '2'))
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(self.MAX_LENGTH)
+        self.tokenizer.enable_padding()
+
+        id2label = {0: 'positive', 1: 'negative', 2: 'neutral'}   # ProsusAI/finbert order
+        config_path = os.path.join(model_dir, 'config.json')
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                id2label = {int(k): v for k, v in json.load(f).get('id2label', id2label).items()}
+        self.labels = [id2label[i].upper() for i in sorted(id2label)]
+        self.pos_idx = next(i for i, l in enumerate(self.labels) if l.startswith('POS'))
+        self.neg_idx = next(i for i, l in enumerate(self.labels) if l.startswith('NEG'))
+        logger.info(f"Loaded sentiment model {model_path} with labels {self.labels}")
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """One forward pass over a batch; score = P(positive) - P(negative)"""
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        results = []
+        for p in probs:
+            top = int(p.argmax())
+            label = self.labels[top]
+            results.append({
+                'score': round(float(p[self.pos_idx] - p[self.neg_idx]), 3),
+                'label': label if label in ('POSITIVE', 'NEGATIVE') else 'NEUTRAL',
+                'confidence': round(float(p[top]), 3),
+            })
+        return results
+
+
+class MicroBatcher:
+    """
+    Combines texts submitted by concurrent callers into one model call.
+    A batch is flushed when it reaches max_batch texts or max_wait seconds after
+    its first text arrived. Works from threads and, via asyncio.wrap_future, coroutines.
+    """
+
+    def __init__(self, model: TransformerSentimentModel, max_batch: int = 32, max_wait: float = 0.01):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self._thread = threading.Thread(target=self._run, name='sentiment-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self.model.predict([text for text, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Sentiment model batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+            self.batches += 1
+            self.texts += len(batch)
+
+
+class ModelSentimentScorer:
+    """Cached, micro-batched front for the transformer model; unavailable without a model dir"""
+
+    MODEL_DIR = os.getenv('SENTIMENT_MODEL_DIR', '')
+    MAX_BATCH = int(os.getenv('SENTIMENT_MAX_BATCH', '32'))
+    MAX_WAIT_MS = float(os.getenv('SENTIMENT_MAX_WAIT_MS', '10'))
+    CACHE_MAX_ENTRIES = int(os.getenv('SENTIMENT_CACHE_MAX_ENTRIES', '50000'))
+    TIMEOUT = 10.0
+
+    def __init__(self, model_dir: Optional[str] = None):
+        self.batcher: Optional[MicroBatcher] = None
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        # Re-entrant: a done-callback may run inline while score_batch holds the lock
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        model_dir = model_dir if model_dir is not None else self.MODEL_DIR
+        if not model_dir:
+            return
+        try:
+            model = TransformerSentimentModel(model_dir)
+            self.batcher = MicroBatcher(model, self.MAX_BATCH, self.MAX_WAIT_MS / 1000)
+        except Exception as e:
+            logger.warning(f"Transformer sentiment unavailable, using keywords only: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self.batcher is not None
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(' '.join(text.lower().split()).encode()).hexdigest()
+
+    def score_batch(self, texts: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Model scores in input order, or None if no model is loaded; each headline is scored once"""
+        if self.batcher is None:
+            return None
+        keys = [self._key(t) for t in texts]
+        results: Dict[str, Dict[str, Any]] = {}
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in results or key in futures:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = cached
+                    continue
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self.batcher.submit(text)
+                    self._inflight[key] = future
+                    future.add_done_callback(lambda f, k=key: self._store(k, f))
+                    self.misses += 1
+                futures[key] = future
+            self.hits += len(texts) - len(futures)
+
+        for key, future in futures.items():
+            results[key] = future.result(timeout=self.TIMEOUT)
+        return [results[k] for k in keys]
+
+    def _store(self, key: str, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = future.result()
+                while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.batcher is None:
+            return {'available': False}
+        return {
+            'available': True,
+            'cache_entries': len(self._cache),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'batches': self.batcher.batches,
+            'avg_batch_size': round(self.batcher.texts / self.batcher.batches, 2) if self.batcher.batches else 0,
+        }
+
+
+# Global model scorer instance (inactive unless SENTIMENT_MODEL_DIR is set)
+model_sentiment = ModelSentimentScorer()
@@ -0,0 +1,136 @@
+"""
+Monte Carlo price-path simulation (GBM or bootstrapped historical returns)
+Vectorized over (paths x steps) chunks with an explicit np.random.Generator
+"""
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import logging
+
+from .price_predictor import predictor
+
+logger = logging.getLogger(__name__)
+
+
+class MonteCarloSimulator:
+    """Simulates price paths seeded from cached bars and the model's predicted drift"""
+
+    METHODS = ('gbm', 'bootstrap')
+    MAX_PATHS = 100_000
+    MAX_HORIZON = 365
+    CHUNK_ELEMENTS = 1_000_000        # paths x steps simulated at once (~8 MB of float64)
+    MAX_CHECKPOINTS = 30              # steps at which percentile bands are reported
+    RETURN_WINDOW = 252
+    PERCENTILES = (5, 25, 50, 75, 95)
+
+    def _checkpoints(self, horizon: int) -> np.ndarray:
+        """Step indices (1-based days) for the percentile bands, always including the horizon"""
+        if horizon <= self.MAX_CHECKPOINTS:
+            return np.arange(1, horizon + 1)
+        return np.unique(np.linspace(1, horizon, self.MAX_CHECKPOINTS).round().astype(int))
+
+    def simulate(self, symbol: str, horizon: int = 30, n_paths: int = 5000, method: str = 'gbm',
+                 targets: Optional[List[float]] = None, seed: Optional[int] = None,
+                 use_model_drift: bool = True) -> Dict[str, Any]:
+        """Simulate n_paths daily paths over horizon days and summarize their distribution"""
+        if method not in self.METHODS:
+            raise ValueError(f"method must be one of {', '.join(self.METHODS)}")
+        if not 1 <= horizon <= self.MAX_HORIZON:
+            raise ValueError(f"horizon must be between 1 and {self.MAX_HORIZON}")
+        if not 100 <= n_paths <= self.MAX_PATHS:
+            raise ValueError(f"paths must be between 100 and {self.MAX_PATHS}")
+
+        df = predictor.fetch_data(symbol)
+        if df is None or len(df) < 30:
+            raise ValueError(f"Insufficient history for {symbol}")
+
+        closes = df['close'].to_numpy(dtype=float)
+        log_returns = np.diff(np.log(closes))[-self.RETURN_WINDOW:]
+        log_returns = log_returns[np.isfinite(log_returns)]
+        current_price = float(closes[-1])
+        sigma = float(log_returns.std(ddof=1))
+
+        # Daily log drift chosen so the expected terminal price matches the target return
+        drift_source = 'historical'
+        expected_return = float(np.expm1(log_returns.mean() * horizon + 0.5 * sigma ** 2 * horizon))
+        if use_model_drift:
+            prediction = predictor.predict(symbol, horizon)
+            if not prediction.get('fallback'):
+                expected_return = prediction['predicted_change'] / 100
+                drift_source = 'model'
+        mu = np.log1p(expected_return) / horizon - 0.5 * sigma ** 2
+
+        if targets is None:
+            targets = [round(current_price * m, 2) for m in (0.9, 0.95, 1.05, 1.1)]
+        target_arr = np.asarray(targets, dtype=float)
+        log_targets = np.log(target_arr / current_price)
+
+        # Bootstrap resamples demeaned history, re-centered on the same drift
+        if method == 'bootstrap':
+            centered = log_returns - log_returns.mean()
+            shift = mu + 0.5 * sigma ** 2 - np.log(np.mean(np.exp(centered)))
+
+        rng = np.random.default_rng(seed)
+        checkpoints = self._checkpoints(horizon)
+        at_checkpoints = np.empty((n_paths, len(checkpoints)), dtype=np.float32)
+        touched_above = np.zeros(len(target_arr), dtype=np.int64)
+        touched_below = np.zeros(len(target_arr), dtype=np.int64)
+        chunk = max(1, self.CHUNK_ELEMENTS // horizon)
+
+        for start in range(0, n_paths, chunk):
+            m = min(chunk, n_paths - start)
+            if method == 'gbm':
+                steps = mu + sigma * rng.standard_normal((m, horizon))
+            else:
+                steps = rng.choice(centered, size=(m, horizon), replace=True) + shift
+            np.cumsum(steps, axis=1, out=steps)
+
+            at_checkpoints[start:start + m] = steps[:, checkpoints - 1]
+            path_max = steps.max(axis=1)
+            path_min = steps.min(axis=1)
+            touched_above += (path_max[:, None] >= log_targets[None, :]).sum(axis=0)
+            touched_below += (path_min[:, None] <= log_targets[None, :]).sum(axis=0)
+
+        bands_log = np.percentile(at_checkpoints, self.PERCENTILES, axis=0)
+        bands = current_price * np.exp(bands_log)
+        terminal_log = at_checkpoints[:, -1].astype(float)
+        terminal = current_price * np.exp(terminal_log)
+        terminal_pct = dict(zip(self.PERCENTILES, np.percentile(terminal, self.PERCENTILES)))
+
+        target_stats = []
+        for i, target in enumerate(target_arr):
+            above = target >= current_price
+            target_stats.append({
+                'target': round(float(target), 2),
+                'prob_above_at_horizon': round(float((terminal >= target).mean()), 4),
+                'prob_below_at_horizon': round(float((terminal < target).mean()), 4),
+                'prob_touch': round(float((touched_above[i] if above else touched_below[i]) / n_paths), 4),
+            })
+
+        return {
+            'symbol': str(symbol),
+            'method': method,
+            'horizon_days': int(horizon),
+            'paths': int(n_paths),
+            'seed': seed,
+            'current_price': round(current_price, 2),
+            'drift_source': drift_source,
+            'expected_return': round(expected_return * 100, 2),
+            'annualized_volatility': round(sigma * np.sqrt(252) * 100, 2),
+            'bands': {
+                'days': checkpoints.tolist(),
+                **{f'p{p}': np.round(bands[k], 2).tolist() for k, p in enumerate(self.PERCENTILES)},
+            },
+            'terminal': {
+                'mean': round(float(terminal.mean()), 2),
+                **{f'p{p}': round(float(v), 2) for p, v in terminal_pct.items()},
+                'prob_profit': round(float((terminal > current_price).mean()), 4),
+                'var_95': round(float(-np.expm1(np.percentile(terminal_log, 5))) * 100, 2),
+            },
+            'targets': target_stats,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+# Global simulator instance
+monte_carlo = MonteCarloSimulator()
@@ -0,0 +1,232 @@
+"""
+Admission control for the API
+Each route belongs to a cost class with its own concurrency limit and bounded wait
+queue, under one process-wide in-flight cap. Freed slots go to queued requests by
+class priority, so cheap routes overtake expensive ones. A request whose class
+queue is full is shed immediately, with Retry-After estimated from recent service
+times. Health checks, static files and websockets bypass admission.
+"""
+import os
+import math
+import time
+import asyncio
+import itertools
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from starlette.responses import JSONResponse
+
+from utils.profiling import record_stage
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class CostClass:
+    """Limits and counters for one class; settings are overridable with ADMISSION_<NAME>_<SETTING>"""
+
+    def __init__(self, name: str, priority: int, concurrency: int, queue: int, queue_timeout: float,
+                 shed_status: int, metrics_window: int = 512):
+        env = f"ADMISSION_{name.upper()}_"
+        self.name = name
+        self.priority = priority                # lower is served first
+        self.concurrency = int(os.getenv(env + 'CONCURRENCY', concurrency))
+        self.queue = int(os.getenv(env + 'QUEUE', queue))
+        self.queue_timeout = float(os.getenv(env + 'QUEUE_TIMEOUT', queue_timeout))
+        self.shed_status = shed_status
+
+        self.inflight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.queue_times: deque = deque(maxlen=metrics_window)
+        self.service_times: deque = deque(maxlen=metrics_window)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: backlog x mean service time / concurrency"""
+        mean = sum(self.service_times) / len(self.service_times) if self.service_times else 1.0
+        backlog = self.inflight + self.queued + 1
+        return min(60, max(1, math.ceil(mean * backlog / max(self.concurrency, 1))))
+
+    def stats(self) -> Dict[str, Any]:
+        def pct(samples, q):
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1) if ordered else 0.0
+
+        return {
+            'priority': self.priority,
+            'concurrency': self.concurrency,
+            'queue_limit': self.queue,
+            'inflight': self.inflight,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'shed': self.shed,
+            'queue_timeouts': self.timed_out,
+            'queue_ms_p50': pct(self.queue_times, 0.5),
+            'queue_ms_p95': pct(self.queue_times, 0.95),
+            'service_ms_p50': pct(self.service_times, 0.5),
+            'service_ms_p95': pct(self.service_times, 0.95),
+        }
+
+
+# Longest prefix first where prefixes overlap (/agent/predict-multi before /agent/predict)
+ROUTE_CLASSES: List[Tuple[str, str]] = [
+    ('/agent/predict-multi/', 'heavy'),     # three model fits per request
+    ('/agent/predict-batch', 'heavy'),
+    ('/agent/analyze-batch', 'heavy'),
+    ('/agent/analyze/', 'standard'),
+    ('/agent/predict', 'standard'),
+    ('/agent/risk/', 'standard'),
+    ('/agent/portfolio-risk', 'standard'),
+    ('/agent/simulate/', 'standard'),
+    ('/agent/screen', 'standard'),
+    ('/agent/current-price', 'light'),
+    ('/agent/history', 'light'),
+    ('/agent/profile/', 'light'),
+    ('/agent/news', 'light'),
+    ('/agent/sentiment/', 'light'),
+]
+
+
+class AdmissionController:
+    """Lives on the event loop (not thread-safe); one per process"""
+
+    MAX_INFLIGHT = int(os.getenv('ADMISSION_MAX_INFLIGHT', '48'))
+
+    def __init__(self, classes: List[CostClass], routes: List[Tuple[str, str]]):
+        self.classes = {c.name: c for c in classes}
+        self.routes = [(prefix, self.classes[name]) for prefix, name in routes]
+        self.inflight = 0
+        self._waiters: List[list] = []      # [priority, seq, future, class], kept sorted
+        self._seq = itertools.count()
+
+    def classify(self, method: str, path: str) -> Optional[CostClass]:
+        if method == 'OPTIONS':
+            return None
+        for prefix, cost_class in self.routes:
+            if path.startswith(prefix):
+                return cost_class
+        return None
+
+    def _can_run(self, cost_class: CostClass) -> bool:
+        return cost_class.inflight < cost_class.concurrency and self.inflight < self.MAX_INFLIGHT
+
+    def _grant(self, cost_class: CostClass):
+        cost_class.inflight += 1
+        cost_class.admitted += 1
+        self.inflight += 1
+
+    async def acquire(self, cost_class: CostClass) -> float:
+        """Wait for a slot; returns the queue time or raises AdmissionRejected"""
+        # Waiters are woken as soon as a slot frees, so none of them could take this one
+        if self._can_run(cost_class):
+            self._grant(cost_class)
+            cost_class.queue_times.append(0.0)
+            return 0.0
+        if cost_class.queued >= cost_class.queue:
+            cost_class.shed += 1
+            logger.debug(f"Shedding {cost_class.name} request: {cost_class.inflight} in flight, {cost_class.queued} queued")
+            raise AdmissionRejected(cost_class.shed_status, cost_class.retry_after(),
+                                    f"Server busy: too many concurrent {cost_class.name} requests")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [cost_class.priority, next(self._seq), future, cost_class]
+        self._waiters.append(entry)
+        self._waiters.sort(key=lambda e: (e[0], e[1]))
+        cost_class.queued += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=cost_class.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot granted in the meantime
+            if future.done():
+                self.release(cost_class, None)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+                self._waiters.remove(entry)
+            cost_class.queued -= 1
+        waited = time.monotonic() - queued_at
+        cost_class.queue_times.append(waited)
+        if future.cancelled():
+            cost_class.timed_out += 1
+            raise AdmissionRejected(503, cost_class.retry_after(),
+                                    f"Server busy: {cost_class.name} request queued for {waited:.1f}s")
+        return waited
+
+    def release(self, cost_class: CostClass, service_time: Optional[float]):
+        cost_class.inflight -= 1
+        self.inflight -= 1
+        if service_time is not None:
+            cost_class.service_times.append(service_time)
+        # Serve waiters by priority; a blocked class does not hold up the ones behind it
+        for entry in list(self._waiters):
+            waiting_class = entry[3]
+            if self._can_run(waiting_class):
+                self._waiters.remove(entry)
+                self._grant(waiting_class)
+                entry[2].set_result(None)
+            elif self.inflight >= self.MAX_INFLIGHT:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_inflight': self.MAX_INFLIGHT,
+            'inflight': self.inflight,
+            'queued': len(self._waiters),
+            'classes': {name: c.stats() for name, c in self.classes.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware, so streaming responses and websockets pass through untouched"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        cost_class = self.controller.classify(scope['method'], scope['path'])
+        if cost_class is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            waited = await self.controller.acquire(cost_class)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status, content={'detail': e.detail},
+                headers={'Retry-After': str(e.retry_after), 'X-Cost-Class': cost_class.name},
+            )
+            return await response(scope, receive, send)
+        if waited:
+            record_stage(f"admission.queue:{cost_class.name}", waited)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cost_class, time.monotonic() - started)
+
+
+# Global admission controller instance
+admission_controller = AdmissionController(
+    [
+        CostClass('light', priority=0, concurrency=32, queue=128, queue_timeout=5.0, shed_status=503),
+        CostClass('standard', priority=1, concurrency=8, queue=32, queue_timeout=10.0, shed_status=503),
+        # Expensive requests are shed as soon as their slots are taken
+        CostClass('heavy', priority=2, concurrency=2, queue=0, queue_timeout=0.0, shed_status=429),
+    ],
+    ROUTE_CLASSES,
+)
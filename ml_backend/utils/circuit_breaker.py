@@ -0,0 +1,190 @@
+"""
+Circuit breakers for upstream data providers (yfinance, RSS feeds)
+Trips after consecutive failures so callers fail fast to cached data
+"""
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional
+
+from utils.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class NoDataError(LookupError):
+    """The upstream answered but has no data for this request (e.g. an unknown symbol); never counted or retried"""
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+# Defaults per provider family, overridable with CB_<NAME>_<SETTING> env vars
+PROVIDER_DEFAULTS = {
+    'yfinance': {
+        'failure_threshold': 3,
+        'recovery_timeout': 30.0,
+        'max_retries': 1,
+        'retry_backoff': 0.5,
+    },
+    'rss': {
+        'failure_threshold': 3,
+        'recovery_timeout': 60.0,
+        'max_retries': 0,
+        'retry_backoff': 0.0,
+    },
+}
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe -> closed"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 30.0,
+                 max_retries: int = 1, retry_backoff: float = 0.5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        # Counters for /agent/health
+        self.total_calls = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def _acquire(self) -> bool:
+        """Admit a call; returns True when it is the half-open probe"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                self.total_calls += 1
+                return False
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.total_calls += 1
+                return True
+            self.total_rejected += 1
+            retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.total_failures += 1
+            self.last_error = str(error)
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._consecutive_failures} failures: {error}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Run func through the breaker with bounded retries; raises CircuitOpenError when open"""
+        is_probe = self._acquire()
+
+        # A half-open probe gets exactly one attempt
+        attempts = 1 if is_probe else 1 + self.max_retries
+        for attempt in range(attempts):
+            try:
+                result = func(*args, **kwargs)
+            except (DeadlineExceeded, NoDataError):
+                # The caller ran out of time or asked for something that does not exist, and the
+                # upstream is not at fault: count nothing, free the probe slot
+                if is_probe:
+                    with self._lock:
+                        self._probe_in_flight = False
+                raise
+            except Exception as e:
+                self.record_failure(e)
+                if attempt + 1 >= attempts or self.state == self.OPEN:
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt))
+                continue
+            self.record_success()
+            return result
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_after = 0.0
+            if state == self.OPEN:
+                retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+                'retry_after': round(retry_after, 1),
+                'total_calls': self.total_calls,
+                'total_failures': self.total_failures,
+                'total_rejected': self.total_rejected,
+                'last_error': self.last_error,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def _setting(name: str, key: str, default):
+    value = os.getenv(f"CB_{name.upper()}_{key.upper()}")
+    if value is None:
+        return default
+    return type(default)(value)
+
+
+def get_breaker(name: str, provider: Optional[str] = None) -> CircuitBreaker:
+    """Get (or create) the breaker for a provider, configured from env"""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            defaults = PROVIDER_DEFAULTS.get(provider or name, PROVIDER_DEFAULTS['yfinance'])
+            config = {key: _setting(name, key, value) for key, value in defaults.items()}
+            breaker = CircuitBreaker(name, **config)
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every breaker's state for health reporting"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.get_state() for b in breakers}
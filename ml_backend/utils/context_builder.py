@@ -2,21 +2,34 @@ from typing import Dict, Any
 import asyncio
 import logging
 
+from utils.deadline import current_deadline, detached, within_deadline
+from utils.profiling import stage
+
 logger = logging.getLogger(__name__)
 
+AGENT_RESERVE_SECONDS = 0.1
+
 # Import predictor and sentiment analyzer
 try:
     from predictor.price_predictor import predictor
     from predictor.sentiment import sentiment_analyzer
+    from predictor.risk import risk_engine
+    from predictor.fundamentals import fundamentals_provider
+    from predictor.macro import macro_provider
 except ImportError:
     predictor = None
     sentiment_analyzer = None
+    risk_engine = None
+    fundamentals_provider = None
+    macro_provider = None
 
 
 async def build_context(ticker: str) -> Dict[str, Any]:
     """
     Fetch all data needed for agents using real market data
     Falls back to mock data if dependencies unavailable
+    Sections are fetched concurrently, each bounded by the request deadline; a section
+    that does not finish in time stays empty and is reported as cut short.
     """
     context = {
         'sentiment_scores': {},
@@ -30,59 +43,74 @@ async def build_context(ticker: str) -> Dict[str, Any]:
     # Normalize ticker
     normalized = ticker.upper().replace('/', '')
     
-    try:
-        # Get prediction data
-        if predictor:
-            pred = predictor.predict(normalized, horizon=7)
-            context['prediction'] = pred
-            
-            # Extract technicals from prediction
-            if 'technicals' in pred:
-                context['technicals'] = {
-                    'rsi': pred['technicals'].get('rsi', 50),
-                    'macd': pred['technicals'].get('macd', 0),
-                    'macd_signal': pred['technicals'].get('macd_signal', 0),
-                    'moving_avg': pred['technicals'].get('ma_30', 0),
-                    'current_price': pred.get('current_price', 0),
-                    'ma_7': pred['technicals'].get('ma_7', 0),
-                    'ma_30': pred['technicals'].get('ma_30', 0),
-                    'volatility': pred['technicals'].get('volatility_7d', 2.5),
-                    'bb_position': pred['technicals'].get('bb_position', 0.5)
-                }
-            
-            # Add risk metrics
-            context['risk'] = {
-                'volatility': pred['technicals'].get('volatility_7d', 2.5) if 'technicals' in pred else 2.5,
-                'max_drawdown': 15.0,  # Would need historical calculation
-                'value_at_risk': pred['technicals'].get('volatility_7d', 2.5) * 2 if 'technicals' in pred else 5.0
-            }
+    async def prediction():
+        pred = await asyncio.to_thread(predictor.predict, normalized, 7)
+        context['prediction'] = pred
         
-        # Get sentiment data
-        if sentiment_analyzer:
-            sentiment = sentiment_analyzer.get_aggregate_sentiment(normalized)
-            context['sentiment_scores'] = {
-                'overall': sentiment.get('overall_score', 0),
-                'label': sentiment.get('overall_sentiment', 'NEUTRAL'),
-                'news_count': sentiment.get('article_count', 0),
-                'positive_ratio': sentiment.get('positive_count', 0) / max(sentiment.get('article_count', 1), 1)
+        # Extract technicals from prediction
+        if 'technicals' in pred:
+            context['technicals'] = {
+                'rsi': pred['technicals'].get('rsi', 50),
+                'macd': pred['technicals'].get('macd', 0),
+                'macd_signal': pred['technicals'].get('macd_signal', 0),
+                'moving_avg': pred['technicals'].get('ma_30', 0),
+                'current_price': pred.get('current_price', 0),
+                'ma_7': pred['technicals'].get('ma_7', 0),
+                'ma_30': pred['technicals'].get('ma_30', 0),
+                'volatility': pred['technicals'].get('volatility_7d', 2.5),
+                'bb_position': pred['technicals'].get('bb_position', 0.5)
             }
-        
-        # Add fundamentals (mock for now - would need external API)
-        context['fundamentals'] = {
-            'pe_ratio': 18.5,
-            'earnings_growth': 12.3,
-            'insider_trades': 5,
-            'market_cap': 'Large'
+    
+    async def risk():
+        # Same cached bars the prediction uses (concurrent downloads are deduplicated)
+        result = await asyncio.to_thread(risk_engine.analyze, normalized)
+        context['risk'] = {
+            'volatility': result['volatility']['30d'],
+            'max_drawdown': result['max_drawdown'],
+            'value_at_risk': result['var']['historical_95'],
+            'cvar': result['cvar']['historical_95'],
+            'beta': result['beta'],
         }
-        
-        # Add macro data (mock - would need FRED API or similar)
-        context['macro'] = {
-            'interest_rate': 4.5,
-            'inflation': 3.2,
-            'market_regime': 'neutral',
-            'vix': 15.5
+    
+    async def sentiment():
+        # Off the event loop, so concurrent requests share transformer micro-batches
+        result = await asyncio.to_thread(sentiment_analyzer.get_aggregate_sentiment, normalized)
+        context['sentiment_scores'] = {
+            'overall': result.get('overall_score', 0),
+            'label': result.get('overall_sentiment', 'NEUTRAL'),
+            'news_count': result.get('article_count', 0),
+            'positive_ratio': result.get('positive_count', 0) / max(result.get('article_count', 1), 1),
+            # Per-source scores read by the sentiment agent; finbert only when a model is loaded
+            'news': result.get('overall_score', 0),
         }
-        
+        if result.get('model_score') is not None:
+            context['sentiment_scores']['finbert'] = result['model_score']
+    
+    async def fundamentals():
+        # Daily .info cache (the same entry /agent/profile serves); a fill outlives the deadline
+        symbol = predictor.normalize_symbol(normalized) if predictor else normalized
+        context['fundamentals'] = await asyncio.to_thread(detached(fundamentals_provider.get_fundamentals), symbol)
+    
+    async def macro():
+        # Computed once per day, shared by every ticker
+        context['macro'] = await asyncio.to_thread(detached(macro_provider.context))
+    
+    sections = {
+        'prediction': prediction if predictor else None,
+        'risk': risk if predictor and risk_engine else None,
+        'sentiment': sentiment if sentiment_analyzer else None,
+        'fundamentals': fundamentals if fundamentals_provider else None,
+        'macro': macro if macro_provider else None,
+    }
+    # Part of the budget is kept back for the agents and serialization
+    deadline = current_deadline()
+    reserve = min(AGENT_RESERVE_SECONDS, deadline.budget * 0.1) if deadline else 0.0
+    async def timed(name, fetch):
+        with stage(f"context.{name}"):
+            await within_deadline(name, fetch(), reserve=reserve)
+
+    try:
+        await asyncio.gather(*(timed(name, fetch) for name, fetch in sections.items() if fetch))
     except Exception as e:
         logger.error(f"Error building context for {ticker}: {e}")
         # Return default mock data on error
@@ -98,7 +126,8 @@ def _get_mock_context() -> Dict[str, Any]:
             'overall': 0.35,
             'label': 'POSITIVE',
             'news_count': 5,
-            'positive_ratio': 0.6
+            'positive_ratio': 0.6,
+            'news': 0.35
         },
         'fundamentals': {
             'pe_ratio': 18.5,
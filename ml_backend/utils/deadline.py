@@ -0,0 +1,120 @@
+"""
+Request-scoped deadlines
+A route sets one Deadline per request (X-Request-Timeout header or the route's
+default). Everything the request calls reads it through a contextvar, which
+asyncio.to_thread copies into worker threads. Awaits are bounded by the time left,
+and synchronous code checks it at safe points (the outbound queue, model
+training). Components that were skipped or abandoned are recorded as cut short.
+"""
+import os
+import time
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_DEADLINE_SECONDS = float(os.getenv('MAX_REQUEST_DEADLINE_SECONDS', '30'))
+MIN_DEADLINE_SECONDS = 0.1
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time; not a failure of the upstream being called"""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+        self.cut_short: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def cut(self, component: str):
+        if component not in self.cut_short:
+            self.cut_short.append(component)
+
+    def check(self, component: str):
+        """Cooperative cancellation point for synchronous work"""
+        if self.expired:
+            self.cut(component)
+            raise DeadlineExceeded(f"Deadline of {self.budget:.2f}s exceeded in {component}")
+
+    def report(self) -> dict:
+        return {
+            'budget_ms': round(self.budget * 1000),
+            'elapsed_ms': round((time.monotonic() - self.started) * 1000, 1),
+            'cut_short': list(self.cut_short),
+        }
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar('request_deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_deadline(component: str):
+    """Raise DeadlineExceeded if the current request is out of time (no-op outside requests)"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(component)
+
+
+def parse_timeout(header: Optional[str], default: float) -> float:
+    """Budget in seconds from an X-Request-Timeout value, clamped to sane bounds"""
+    try:
+        seconds = float(header) if header else default
+    except ValueError:
+        raise ValueError(f"X-Request-Timeout must be a number of seconds, got '{header}'")
+    return min(max(seconds, MIN_DEADLINE_SECONDS), MAX_DEADLINE_SECONDS)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the block under a new deadline (None clears it, e.g. for shared background work)"""
+    deadline = Deadline(seconds) if seconds is not None else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def detached(fn: Callable) -> Callable:
+    """
+    fn run without the request's deadline: for shared caches (fundamentals, macro)
+    whose fill should complete for the next request even if this one stops waiting
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with deadline_scope(None):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+async def within_deadline(component: str, awaitable: Awaitable, default: Any = None,
+                          reserve: float = 0.0) -> Any:
+    """
+    Await with the time left minus `reserve` (kept for the work that follows); on
+    expiry the component is recorded as cut short and `default` returned
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(0.0, deadline.remaining() - reserve))
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        deadline.cut(component)
+        logger.info(f"{component} cut short by the {deadline.budget:.2f}s request deadline")
+        return default
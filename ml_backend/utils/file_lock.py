@@ -0,0 +1,64 @@
+"""
+Advisory cross-process file locks (fcntl.flock) for caches shared by uvicorn workers
+"""
+import os
+import time
+from typing import Optional
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks degrade to no-ops
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """
+    Exclusive lock on `path`, held for the duration of a `with` block.
+    flock locks belong to an open file description, so they also exclude
+    other threads of the same process that open the lock file themselves.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+        self.acquired = False
+
+    def acquire(self) -> bool:
+        """Block until the lock is held or `timeout` seconds pass; returns whether it is held"""
+        if fcntl is None:
+            self.acquired = True
+            return True
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.acquired = True
+                return True
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for lock {self.path}")
+                    os.close(self._fd)
+                    self._fd = None
+                    return False
+                time.sleep(self.POLL_INTERVAL)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,263 @@
+"""
+On-demand profiling and slow-request sampling
+SamplingProfiler walks every thread's stack at a fixed interval for a bounded time
+and aggregates collapsed stacks (flamegraph.pl / speedscope input). Nothing runs
+between profiles. Each request gets a RequestTrace that `stage()` blocks and
+`@traced` functions append timings to, across asyncio.to_thread. Requests slower
+than SLOW_REQUEST_MS are kept, with their stages, in a bounded ring buffer. With the
+sampler off, a stage costs one contextvar lookup.
+"""
+import os
+import sys
+import time
+import threading
+import functools
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))        # 0 disables the sampler
+SLOW_REQUEST_BUFFER = int(os.getenv('SLOW_REQUEST_BUFFER', '100'))
+MAX_STAGES_PER_REQUEST = 256
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Leaf frames of threads parked with nothing to do (event loop select, idle pool workers)
+IDLE_FRAMES = {
+    ('select', 'selectors.py'), ('_worker', 'thread.py'), ('wait', 'threading.py'),
+    ('_wait_for_tstate_lock', 'threading.py'), ('accept', 'socket.py'),
+}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    """Wall-clock sampler over all threads; one profile at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles_run = 0
+
+    @staticmethod
+    def _label(code) -> str:
+        path = code.co_filename
+        if path.startswith(_APP_ROOT):
+            path = os.path.relpath(path, _APP_ROOT)
+        else:
+            path = os.path.basename(path)
+        return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+    def _collapse(self, frame, thread_name: str) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name)
+        return ';'.join(reversed(labels))
+
+    @staticmethod
+    def _idle(frame) -> bool:
+        code = frame.f_code
+        return (code.co_name, os.path.basename(code.co_filename)) in IDLE_FRAMES
+
+    def run(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+        """Sample for `seconds` (blocks the calling thread, which is excluded)"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+            interval = max(interval, 0.001)
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            idle = 0
+            started = time.monotonic()
+            stop = started + seconds
+            while time.monotonic() < stop:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if not include_idle and self._idle(frame):
+                        idle += 1
+                    else:
+                        stacks[self._collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+                samples += 1
+                time.sleep(interval)
+            self.profiles_run += 1
+            return {
+                'duration_s': round(time.monotonic() - started, 3),
+                'interval_ms': interval * 1000,
+                'samples': samples,
+                'idle_samples': idle,
+                'stacks': stacks,
+            }
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(profile: Dict[str, Any]) -> str:
+        """Brendan Gregg's collapsed format: `root;...;leaf count` per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in profile['stacks'].most_common())
+
+    @staticmethod
+    def summary(profile: Dict[str, Any], top: int = 30) -> Dict[str, Any]:
+        """Stacks plus self/total sample counts per function"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in profile['stacks'].items():
+            frames = stack.split(';')[1:]
+            if frames:
+                self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        return {
+            'duration_s': profile['duration_s'],
+            'interval_ms': profile['interval_ms'],
+            'samples': profile['samples'],
+            'idle_samples': profile['idle_samples'],
+            'top_self': [{'function': f, 'samples': n} for f, n in self_counts.most_common(top)],
+            'top_total': [{'function': f, 'samples': n} for f, n in total_counts.most_common(top)],
+            'stacks': [{'stack': s.split(';'), 'count': n} for s, n in profile['stacks'].most_common()],
+        }
+
+
+class RequestTrace:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []      # appended from worker threads too (atomic)
+
+    def record(self, name: str, started: float, duration: float):
+        if len(self.stages) < MAX_STAGES_PER_REQUEST:
+            self.stages.append({
+                'stage': name,
+                'start_ms': round((started - self.started) * 1000, 2),
+                'duration_ms': round(duration * 1000, 2),
+                'thread': threading.current_thread().name,
+            })
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar('request_trace', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a stage of the current request (no-op outside a sampled request)"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, started, time.perf_counter() - started)
+
+
+def record_stage(name: str, duration: float):
+    """Record an already-measured stage that ended now"""
+    trace = _trace.get()
+    if trace is not None:
+        trace.record(name, time.perf_counter() - duration, duration)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of `stage` for synchronous functions"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class SlowRequestSampler:
+    """Ring buffer of the most recent requests over the threshold"""
+
+    EXCLUDED_PREFIXES = ('/debug/',)        # a profile is slow by design
+
+    def __init__(self, threshold_ms: float, capacity: int):
+        self.threshold_ms = threshold_ms
+        self.requests: deque = deque(maxlen=capacity)
+        self.seen = 0
+        self.captured = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def observe(self, trace: RequestTrace, status: int):
+        self.seen += 1
+        elapsed_ms = (time.perf_counter() - trace.started) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        self.captured += 1
+        stages = sorted(trace.stages, key=lambda s: s['start_ms'])
+        self.requests.append({
+            'method': trace.method,
+            'path': trace.path,
+            'status': status,
+            'duration_ms': round(elapsed_ms, 1),
+            'at': datetime.now().isoformat(),
+            'stages': stages,
+        })
+        logger.info(f"Slow request: {trace.method} {trace.path} took {elapsed_ms:.0f} ms")
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        newest_first = list(reversed(self.requests))
+        return newest_first[:limit] if limit else newest_first
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'requests_seen': self.seen,
+            'captured': self.captured,
+            'buffered': len(self.requests),
+        }
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware that opens a RequestTrace per HTTP request"""
+
+    def __init__(self, app, sampler: Optional[SlowRequestSampler] = None):
+        self.app = app
+        self.sampler = sampler or slow_request_sampler
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or not self.sampler.enabled
+                or scope['path'].startswith(self.sampler.EXCLUDED_PREFIXES)):
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace(scope['method'], scope['path'])
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        token = _trace.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            self.sampler.observe(trace, status)
+
+
+# Global profiler and sampler instances
+profiler = SamplingProfiler()
+slow_request_sampler = SlowRequestSampler(SLOW_REQUEST_MS, SLOW_REQUEST_BUFFER)
@@ -0,0 +1,186 @@
+"""
+Shared outbound scheduler for market-data requests
+Token-bucket rate limit, priority classes and in-flight request deduplication
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from enum import IntEnum
+from typing import Dict, Any, Callable, Hashable, Optional
+
+from utils.deadline import DeadlineExceeded, current_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0   # /current-price, profile lookups
+    STANDARD = 1      # predictions, history, analysis
+    BACKGROUND = 2    # model (re)training, warm-up, bulk refresh
+
+
+class _LeaderGaveUp(Exception):
+    """Handed to followers when a deduplicated request's leader hit its own deadline"""
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (guarded by the scheduler)"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> float:
+        """Take a token if available; otherwise return seconds until one is"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class OutboundScheduler:
+    """
+    Serializes outbound calls through one token bucket.
+    Waiters are ordered by (priority, arrival); only the head of the queue
+    may take a token, so interactive calls overtake queued background ones.
+    Identical requests (same key) issued while one is pending share its result;
+    a circuit breaker passed to submit only sees the leader's attempts, each of which
+    waits for its own token.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, metrics_window: int = 512):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self._cond = threading.Condition()
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._inflight: Dict[Hashable, Future] = {}
+
+        self._queue_times = {p: deque(maxlen=metrics_window) for p in Priority}
+        self._counts = {p: 0 for p in Priority}
+        self._deduplicated = 0
+        self._errors = 0
+
+    def submit(self, key: Hashable, func: Callable, *args, priority: Priority = Priority.STANDARD,
+               breaker: Optional[Any] = None, **kwargs):
+        """
+        Run func(*args, **kwargs) when rate limit and priority allow; blocks the caller.
+        With a breaker, the shared call runs (and retries) through breaker.call.
+        """
+        while True:
+            with self._cond:
+                pending = self._inflight.get(key)
+                if pending is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    break
+                self._deduplicated += 1
+
+            deadline = current_deadline()
+            try:
+                return pending.result(timeout=deadline.remaining() if deadline else None)
+            except FutureTimeout:
+                deadline.cut(f"{self.name} request")
+                raise DeadlineExceeded(f"Deadline exceeded waiting for a shared {self.name} request")
+            except _LeaderGaveUp:
+                continue   # the leader ran out of its own time; try again, possibly as the new leader
+
+        try:
+            if breaker is not None:
+                result = breaker.call(self._run, priority, func, *args, **kwargs)
+            else:
+                result = self._run(priority, func, *args, **kwargs)
+        except DeadlineExceeded:
+            # Only this caller is out of time: the followers must not inherit its deadline
+            with self._cond:
+                del self._inflight[key]
+            future.set_exception(_LeaderGaveUp())
+            raise
+        except BaseException as e:
+            with self._cond:
+                self._errors += 1
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._cond:
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+    def _run(self, priority: Priority, func: Callable, *args, **kwargs):
+        self._wait_turn(priority)
+        return func(*args, **kwargs)
+
+    def _wait_turn(self, priority: Priority):
+        entry = (int(priority), next(self._seq))
+        queued_at = time.monotonic()
+        # A request with a deadline leaves the queue when it runs out of time
+        deadline = current_deadline()
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    if deadline is not None:
+                        deadline.check(f"{self.name} queue")
+                    if self._queue[0] == entry:
+                        wait = self.bucket.try_acquire()
+                        if wait == 0:
+                            heapq.heappop(self._queue)
+                            break
+                        self._cond.wait(min(wait, deadline.remaining()) if deadline else wait)
+                    else:
+                        self._cond.wait(deadline.remaining() if deadline else None)
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                raise
+            finally:
+                self._cond.notify_all()
+
+            self._counts[priority] += 1
+            self._queue_times[priority].append(time.monotonic() - queued_at)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue-time metrics per priority class (milliseconds)"""
+        with self._cond:
+            by_priority = {}
+            for p in Priority:
+                samples = sorted(self._queue_times[p])
+                n = len(samples)
+                by_priority[p.name.lower()] = {
+                    'requests': self._counts[p],
+                    'queue_ms_p50': round(samples[n // 2] * 1000, 1) if n else 0.0,
+                    'queue_ms_p95': round(samples[min(n - 1, int(n * 0.95))] * 1000, 1) if n else 0.0,
+                    'queue_ms_max': round(samples[-1] * 1000, 1) if n else 0.0,
+                }
+            return {
+                'rate_per_sec': self.bucket.rate,
+                'burst': self.bucket.capacity,
+                'queued': len(self._queue),
+                'in_flight': len(self._inflight),
+                'deduplicated': self._deduplicated,
+                'errors': self._errors,
+                'priorities': by_priority,
+            }
+
+
+# Global scheduler shared by every yfinance call in the process
+market_data_scheduler = OutboundScheduler(
+    'yfinance',
+    rate=float(os.getenv('YFINANCE_RATE_LIMIT', '2')),
+    burst=int(os.getenv('YFINANCE_BURST', '5')),
+)
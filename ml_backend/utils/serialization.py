@@ -0,0 +1,58 @@
+"""
+Fast JSON responses
+orjson encodes dicts, datetimes and NumPy scalars/arrays natively, so routes can
+return model output without converting every field to a Python float first.
+Without orjson the stdlib encoder is used with the same type conversions, and
+NaN and infinity are written as null there too.
+"""
+import json
+import math
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles natively"""
+    if type(obj).__module__ == 'numpy':            # scalars and arrays; numpy itself loads lazily
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):          # pandas Timestamps included
+        return obj.isoformat()
+    if hasattr(obj, 'model_dump'):                  # pydantic models
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj: Any) -> Any:
+    """Non-finite floats -> None, as orjson writes them (stdlib fallback only)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON; NaN and infinity become null"""
+    if orjson is not None:
+        options = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(content, default=_default, option=options)
+    return json.dumps(_finite(content), default=lambda obj: _finite(_default(obj)), ensure_ascii=False,
+                      allow_nan=False, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """Drop-in JSONResponse that encodes with `dumps`; the app's default response class"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,74 @@
+"""
+Symbol-affinity sharding: a consistent hash ring mapping symbols to worker shards
+Kept free of pandas/model imports so the dispatcher process stays light
+"""
+import os
+import json
+import bisect
+import hashlib
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0'))
+
+# /agent/<route>/{symbol} endpoints; other endpoints carry the symbol in ?symbol=
+SYMBOL_PATH_ROUTES = {'analyze', 'predict', 'predict-multi', 'risk', 'simulate', 'sentiment', 'profile'}
+
+
+def shard_key(symbol: str) -> str:
+    """
+    Collapse spellings of one instrument (btc, BTC/USD, BTC-USD, BTCUSD) to one key.
+    Only placement depends on this, so a rare collision just co-locates two symbols.
+    """
+    key = symbol.strip().upper().replace('/', '').replace('-', '')
+    if len(key) > 3 and key.endswith('USD'):
+        key = key[:-3]
+    return key
+
+
+def _hash(value: str) -> int:
+    # Stable across processes, unlike the salted built-in hash()
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing with virtual nodes: adding a shard moves ~1/N of the symbols"""
+
+    def __init__(self, shards: int, vnodes: int = 64):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.shards = shards
+        points = sorted((_hash(f"shard-{s}-{v}"), s) for s in range(shards) for v in range(vnodes))
+        self._points = [p for p, _ in points]
+        self._owners = [s for _, s in points]
+
+    def shard_for(self, key: str) -> int:
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[i]
+
+    def split(self, symbols: List[str]) -> Dict[int, List[int]]:
+        """Group input positions by owning shard, so results can be merged back in order"""
+        groups: Dict[int, List[int]] = {}
+        for i, symbol in enumerate(symbols):
+            groups.setdefault(self.shard_for(shard_key(symbol)), []).append(i)
+        return groups
+
+
+def request_symbol(path: str, query: str, body: bytes = b'') -> Optional[str]:
+    """The symbol a request is about, if any: path segment, ?symbol= or a JSON body field"""
+    parts = [p for p in path.split('/') if p]
+    if len(parts) == 3 and parts[0] == 'agent' and parts[1] in SYMBOL_PATH_ROUTES:
+        return parts[2]
+    symbol = parse_qs(query).get('symbol')
+    if symbol:
+        return symbol[0]
+    if body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(payload, dict) and isinstance(payload.get('symbol'), str):
+            return payload['symbol']
+    return None
+
@@ -0,0 +1,138 @@
+"""
+Startup phases: bind first, import and warm up in the background
+main.py imports only FastAPI and light utilities, so the server binds and answers
+/health at once. The lifespan then imports the ML/data stack (pandas, LightGBM,
+yfinance, every predictor global) in a worker thread, mounts the /agent routes,
+and warms bars, features and models for WARMUP_SYMBOLS. Until the routes are
+mounted other paths get 503 with Retry-After; /ready turns 200 once warm-up ends.
+"""
+import os
+import time
+import asyncio
+import importlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import logging
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.monotonic()          # main.py imports this before building the app
+
+WARMUP_SYMBOLS = [s.strip().upper() for s in os.getenv('WARMUP_SYMBOLS', 'AAPL').split(',') if s.strip()]
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '120'))
+
+STARTING, IMPORTING, WARMING, READY, FAILED = 'starting', 'importing', 'warming', 'ready', 'failed'
+
+
+class StartupState:
+    def __init__(self):
+        self.phase = STARTING
+        self.started_at = datetime.now().isoformat()
+        self.import_times: Dict[str, float] = {}
+        self.routes_mounted_after: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[str] = None
+
+    @staticmethod
+    def uptime() -> float:
+        return time.monotonic() - PROCESS_STARTED
+
+    @property
+    def routes_mounted(self) -> bool:
+        return self.routes_mounted_after is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == READY
+
+    def import_modules(self, names: Iterable[str]):
+        """
+        Import in order, recording each module's own cost (dependencies already loaded are
+        free). A missing optional dependency is logged; its dependents fall back on their own.
+        """
+        self.phase = IMPORTING
+        for name in names:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning(f"{name} unavailable: {e}")
+            self.import_times[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"Imported {', '.join(f'{n} {t:.2f}s' for n, t in self.import_times.items())}")
+
+    def mark_routes_mounted(self):
+        self.routes_mounted_after = round(self.uptime(), 3)
+
+    def fail(self, error: Exception):
+        self.phase = FAILED
+        self.error = f"{type(error).__name__}: {error}"
+        logger.error(f"Startup failed: {self.error}")
+
+    async def warm_up(self, symbols: List[str], warm: Callable[[str], Any], timeout: float = WARMUP_TIMEOUT):
+        """
+        Run warm(symbol) in a worker thread per symbol, in order; a failure is recorded and
+        skipped, and symbols left when the timeout runs out are marked skipped
+        """
+        self.phase = WARMING
+        self.warmup = {s: {'status': 'pending'} for s in symbols}
+        stop = time.monotonic() + timeout
+        for symbol in symbols:
+            remaining = stop - time.monotonic()
+            if remaining <= 0:
+                self.warmup[symbol]['status'] = 'skipped'
+                continue
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.to_thread(warm, symbol), timeout=remaining)
+                self.warmup[symbol] = {'status': 'ok'}
+            except asyncio.TimeoutError:
+                self.warmup[symbol] = {'status': 'skipped'}
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {symbol}: {e}")
+                self.warmup[symbol] = {'status': 'failed', 'error': str(e)}
+            self.warmup[symbol]['seconds'] = round(time.perf_counter() - started, 3)
+        self.phase = READY
+        self.ready_after = round(self.uptime(), 3)
+        logger.info(f"Ready after {self.ready_after:.2f}s (routes mounted after {self.routes_mounted_after}s)")
+
+    def report(self) -> Dict[str, Any]:
+        done = sum(1 for w in self.warmup.values() if w['status'] != 'pending')
+        return {
+            'phase': self.phase,
+            'started_at': self.started_at,
+            'uptime_s': round(self.uptime(), 3),
+            'import_times_s': dict(self.import_times),
+            'routes_mounted_after_s': self.routes_mounted_after,
+            'ready_after_s': self.ready_after,
+            'warmup': {'done': done, 'total': len(self.warmup), 'symbols': self.warmup},
+            'error': self.error,
+        }
+
+
+class StartupGateMiddleware:
+    """503 + Retry-After for routes that are not mounted yet (instead of a misleading 404)"""
+
+    OPEN_PATHS = ('/health', '/ready', '/static/', '/debug/')
+
+    def __init__(self, app, state: Optional[StartupState] = None):
+        self.app = app
+        self.state = state or startup_state
+
+    async def __call__(self, scope, receive, send):
+        if (self.state.routes_mounted or scope['type'] not in ('http', 'websocket')
+                or scope['path'] == '/' or scope['path'].startswith(self.OPEN_PATHS)):
+            return await self.app(scope, receive, send)
+        if scope['type'] == 'websocket':
+            # Close before accepting; the client reconnects after warm-up
+            return await send({'type': 'websocket.close', 'code': 1013})
+        detail = 'Service is starting up' if self.state.phase != FAILED else 'Service failed to start'
+        response = JSONResponse(status_code=503, content={'detail': detail, 'phase': self.state.phase},
+                                headers={'Retry-After': '5'})
+        await response(scope, receive, send)
+
+
+# Global startup state instance
+startup_state = StartupState()
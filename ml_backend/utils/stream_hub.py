@@ -0,0 +1,194 @@
+"""
+Server-push hub for /agent/stream
+One refresh loop per subscribed symbol computes each channel (price, prediction,
+sentiment) once and fans the result out to every subscriber. Messages are state
+snapshots, so a slow consumer's outbox keeps only the newest message per
+(symbol, channel): memory stays bounded and it skips to the latest values.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StreamLimitError(Exception):
+    """A subscription would exceed a per-connection or server-wide limit"""
+
+
+class Channel:
+    """A producer run every `interval` seconds; `key` picks the fields that define a change"""
+
+    def __init__(self, name: str, interval: float, produce: Callable[[str], Dict[str, Any]],
+                 key: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.name = name
+        self.interval = interval
+        self.produce = produce
+        self.key = key or (lambda data: data)
+
+
+class StreamConnection:
+    """Per-client subscriptions plus a conflating outbox drained by the client's sender task"""
+
+    def __init__(self, max_symbols: int, channels: Set[str]):
+        self.max_symbols = max_symbols
+        self.channels = channels
+        self.symbols: Set[str] = set()
+        self._outbox: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.conflated = 0
+
+    def offer(self, message: Dict[str, Any]):
+        key = (message['symbol'], message['type'])
+        if key in self._outbox:
+            self.conflated += 1          # the client has not read the previous value yet
+            del self._outbox[key]
+        self._outbox[key] = message
+        self._ready.set()
+
+    def send_error(self, detail: str):
+        # One error slot: a client spamming bad requests cannot grow the outbox
+        self._outbox[('', 'error')] = {'type': 'error', 'detail': detail}
+        self._ready.set()
+
+    async def next_message(self) -> Dict[str, Any]:
+        while not self._outbox:
+            self._ready.clear()
+            await self._ready.wait()
+        _, message = self._outbox.popitem(last=False)
+        return message
+
+
+class SymbolStream:
+    """Subscribers and the latest message per channel for one symbol"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set[StreamConnection] = set()
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self.keys: Dict[str, Any] = {}
+        self.tasks: List[asyncio.Task] = []
+
+
+class StreamHub:
+    """Per-symbol refresh loops with fan-out; lives on the event loop (not thread-safe)"""
+
+    MAX_SYMBOLS_PER_CONNECTION = int(os.getenv('STREAM_MAX_SYMBOLS_PER_CONNECTION', '20'))
+    MAX_SYMBOLS = int(os.getenv('STREAM_MAX_SYMBOLS', '200'))
+    MAX_CONNECTIONS = int(os.getenv('STREAM_MAX_CONNECTIONS', '1000'))
+    SEND_TIMEOUT = float(os.getenv('STREAM_SEND_TIMEOUT', '10'))
+
+    def __init__(self):
+        self.channels: Dict[str, Channel] = {}
+        self._streams: Dict[str, SymbolStream] = {}
+        self._connections: Set[StreamConnection] = set()
+        self.computations = 0
+        self.messages_fanned_out = 0
+        self.slow_disconnects = 0
+
+    def register(self, name: str, interval: float, produce: Callable[[str], Dict[str, Any]],
+                 key: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.channels[name] = Channel(name, interval, produce, key)
+
+    def connect(self, channels: Optional[List[str]] = None) -> StreamConnection:
+        if len(self._connections) >= self.MAX_CONNECTIONS:
+            raise StreamLimitError(f"Server stream limit of {self.MAX_CONNECTIONS} connections reached")
+        unknown = set(channels or ()) - set(self.channels)
+        if unknown:
+            raise ValueError(f"Unknown channels: {', '.join(sorted(unknown))}")
+        conn = StreamConnection(self.MAX_SYMBOLS_PER_CONNECTION, set(channels or self.channels))
+        self._connections.add(conn)
+        return conn
+
+    def disconnect(self, conn: StreamConnection):
+        self._connections.discard(conn)
+        for symbol in list(conn.symbols):
+            self.unsubscribe(conn, symbol)
+
+    def subscribe(self, conn: StreamConnection, symbol: str):
+        symbol = symbol.strip().upper()
+        if not symbol or symbol in conn.symbols:
+            return
+        if len(conn.symbols) >= conn.max_symbols:
+            raise StreamLimitError(f"At most {conn.max_symbols} symbols per connection")
+        stream = self._streams.get(symbol)
+        if stream is None:
+            if len(self._streams) >= self.MAX_SYMBOLS:
+                raise StreamLimitError(f"Server is streaming its limit of {self.MAX_SYMBOLS} symbols")
+            stream = self._streams[symbol] = SymbolStream(symbol)
+            # One loop per channel, so a slow prediction never delays price ticks
+            stream.tasks = [asyncio.create_task(self._run(stream, channel), name=f'stream-{symbol}-{name}')
+                            for name, channel in self.channels.items()]
+        stream.subscribers.add(conn)
+        conn.symbols.add(symbol)
+        # Late joiners get the current state immediately instead of waiting for the next change
+        for name, message in stream.latest.items():
+            if name in conn.channels:
+                conn.offer(message)
+
+    def unsubscribe(self, conn: StreamConnection, symbol: str):
+        symbol = symbol.strip().upper()
+        conn.symbols.discard(symbol)
+        stream = self._streams.get(symbol)
+        if stream is None:
+            return
+        stream.subscribers.discard(conn)
+        if not stream.subscribers:
+            for task in stream.tasks:
+                task.cancel()
+            del self._streams[symbol]
+
+    async def _run(self, stream: SymbolStream, channel: Channel):
+        while True:
+            # Skip channels nobody on this symbol asked for
+            if any(channel.name in c.channels for c in stream.subscribers):
+                await self._refresh(stream, channel)
+            await asyncio.sleep(channel.interval)
+
+    async def _refresh(self, stream: SymbolStream, channel: Channel):
+        try:
+            data = await asyncio.to_thread(channel.produce, stream.symbol)
+        except Exception as e:
+            logger.warning(f"Stream {channel.name} refresh failed for {stream.symbol}: {e}")
+            return
+        self.computations += 1
+        key = channel.key(data)
+        if channel.name in stream.keys and stream.keys[channel.name] == key:
+            return                              # unchanged: nothing to push
+        stream.keys[channel.name] = key
+        message = {'type': channel.name, 'symbol': stream.symbol, 'data': data, 'ts': time.time()}
+        stream.latest[channel.name] = message
+        for conn in stream.subscribers:
+            if channel.name in conn.channels:
+                conn.offer(message)
+                self.messages_fanned_out += 1
+
+    async def pump(self, conn: StreamConnection, send: Callable[[Dict[str, Any]], Any]):
+        """Send queued messages until the client goes away or stalls for SEND_TIMEOUT"""
+        while True:
+            message = await conn.next_message()
+            try:
+                await asyncio.wait_for(send(message), timeout=self.SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.slow_disconnects += 1
+                raise
+            conn.sent += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'connections': len(self._connections),
+            'symbols': len(self._streams),
+            'subscriptions': sum(len(s.subscribers) for s in self._streams.values()),
+            'computations': self.computations,
+            'messages_fanned_out': self.messages_fanned_out,
+            'conflated': sum(c.conflated for c in self._connections),
+            'slow_disconnects': self.slow_disconnects,
+        }
+
+
+# Global stream hub instance (channels are registered by api/routes.py)
+stream_hub = StreamHub()